@@ -0,0 +1,276 @@
+"""
+An asyncio event loop that runs in small steps on the GUI thread, and the tasks on it
+
+The loop never runs by itself. Its owner calls run_once() from a timer, which runs whatever is
+ready and comes back. Tasks started from the editor keep going between runs without a thread of
+their own, so they can touch the GUI or the DCC like any other code run from a tab.
+
+It's only the current event loop while it runs and inside activated(), so a host application
+with an asyncio loop of its own keeps finding that one everywhere else.
+"""
+import asyncio
+import collections
+import contextlib
+import selectors
+import sys
+import time
+import traceback
+import warnings
+import weakref
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class TaskInfo(object):
+    def __init__(self, origin="", report_errors=True):
+        self.origin = origin  # tab the task was started from
+        self.report_errors = report_errors  # False when something is already waiting for the result
+        self.started = time.time()
+        self.finished = None
+
+
+def _get_current_loop():
+    """
+    :return: loop set as the current one, None if there isn't one. Unlike asyncio.get_event_loop()
+             this never makes a new loop.
+    """
+    policy = asyncio.get_event_loop_policy()
+    local = getattr(policy, "_local", None)  # the default policies keep it there
+    if local is not None:
+        return getattr(local, "_loop", None)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            return policy.get_event_loop()
+    except RuntimeError:
+        return None
+
+
+def get_task_state(task):
+    if not task.done():
+        return RUNNING
+    if task.cancelled():
+        return CANCELLED
+    return FAILED if task.exception() is not None else DONE
+
+
+def get_task_name(task):
+    name = (task.get_name() if hasattr(task, "get_name") else None) or "Task"  # python 3.8+
+    coroutine = task.get_coro() if hasattr(task, "get_coro") else getattr(task, "_coro", None)
+    coroutine_name = getattr(coroutine, "__qualname__", None) or type(coroutine).__name__
+    return "{} ({})".format(name, coroutine_name)
+
+
+def get_task_location(task):
+    """
+    :return: "file:line" the task is waiting at, empty if it isn't waiting
+    """
+    if task.done():
+        return ""
+    stack = task.get_stack()
+    if not stack:
+        return ""
+    frame = stack[-1]  # innermost
+    return "{}:{}".format(frame.f_code.co_filename, frame.f_lineno)
+
+
+class EventLoopDriver(object):
+    """
+    :param time_budget: seconds run_once() goes on for while there are callbacks ready to run
+    :param history_size: how many finished tasks are kept to look at
+    :param on_error: called with the text of exceptions nobody handled, eg. a background task that failed.
+                     Written to stderr if not given.
+    """
+
+    def __init__(self, time_budget=0.01, history_size=50, on_error=None):
+        self.time_budget = time_budget
+        self.on_error = on_error
+        self.origin = ""  # given to tasks that get created while it's set, see started_from()
+        self.task_infos = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary[asyncio.Task, TaskInfo]
+        self.finished_tasks = collections.deque(maxlen=history_size)
+
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_task_factory(self._create_task)
+        self.loop.set_exception_handler(self._handle_exception)
+
+    # -------------------------------------------------------------------
+    # running
+    def run_once(self):
+        """
+        Run what's ready, including i/o that has come in, then return
+        """
+        if self.loop.is_running() or self.loop.is_closed():
+            return  # something in a task processed events and got back here
+        deadline = time.perf_counter() + self.time_budget
+        with self.activated():
+            while True:
+                self.loop.call_soon(self.loop.stop)
+                self.loop.run_forever()  # one iteration, the stop is already waiting
+                if not self.has_ready_callbacks() or time.perf_counter() > deadline:
+                    break
+
+    def has_ready_callbacks(self):
+        return bool(getattr(self.loop, "_ready", None))
+
+    def get_next_timeout(self):
+        """
+        :return: seconds until the next timer is due, 0 if callbacks are ready to run. None if no timer is
+                 scheduled, then only i/o or another thread can give the loop something to do.
+        """
+        if self.has_ready_callbacks():
+            return 0.0
+        scheduled = getattr(self.loop, "_scheduled", None)
+        if not scheduled:
+            return None
+        # a heap, cancelled timers stay in it until the loop gets to them
+        handle = scheduled[0]
+        if handle.cancelled():
+            handles = [handle for handle in scheduled if not handle.cancelled()]
+            if not handles:
+                return None
+            handle = min(handles, key=lambda handle: handle.when())
+        return max(0.0, handle.when() - self.loop.time())
+
+    def is_due(self):
+        """
+        :return: whether run_once() has something to run now: ready callbacks, a timer that's due or i/o
+                 that came in. Cheap enough to check from a timer before deciding to run it.
+        """
+        if self.loop.is_closed():
+            return False
+        timeout = self.get_next_timeout()
+        if timeout is not None and timeout <= getattr(self.loop, "_clock_resolution", 0.0):
+            return True
+        selector = getattr(self.loop, "_selector", None)
+        if not isinstance(selector, selectors.BaseSelector):
+            return True  # eg. the proactor on windows, there's no looking without taking the events
+        return bool(selector.select(0))  # level triggered, the loop still gets the events afterwards
+
+    def has_work(self):
+        """
+        :return: whether run_once() still needs to be called
+        """
+        if self.loop.is_closed():
+            return False
+        return bool(asyncio.all_tasks(self.loop) or self.has_ready_callbacks() or
+                    getattr(self.loop, "_scheduled", None))
+
+    @contextlib.contextmanager
+    def activated(self):
+        """
+        Make the loop the current one, so asyncio.get_event_loop() and asyncio.ensure_future() in a
+        script find it. Whatever was current before is put back afterwards.
+        """
+        previous_loop = _get_current_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            yield self.loop
+        finally:
+            asyncio.set_event_loop(previous_loop)
+
+    @contextlib.contextmanager
+    def started_from(self, origin):
+        """
+        Tasks created in here remember they came from origin
+        """
+        previous_origin = self.origin
+        self.origin = origin
+        try:
+            yield
+        finally:
+            self.origin = previous_origin
+
+    def create_run_task(self, coroutine):
+        """
+        Task for the code of a run, its errors are left to whoever waits for it
+        """
+        task = self.loop.create_task(coroutine)
+        self.get_info(task).report_errors = False
+        return task
+
+    # -------------------------------------------------------------------
+    # tasks
+    def _create_task(self, loop, coroutine, **kwargs):
+        task = asyncio.Task(coroutine, loop=loop, **kwargs)
+
+        # tasks started by other tasks come from the same place
+        origin = self.origin
+        current_task = asyncio.current_task(loop) if loop.is_running() else None
+        if current_task is not None and current_task in self.task_infos:
+            origin = self.task_infos[current_task].origin
+
+        self.task_infos[task] = TaskInfo(origin)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        info = self.task_infos.get(task)
+        if info is None:
+            return
+        info.finished = time.time()
+        self.finished_tasks.append(task)
+        if not info.report_errors or task.cancelled():
+            return
+
+        exception = task.exception()  # also stops asyncio from complaining about it later
+        if exception is not None:
+            text = "".join(traceback.format_exception(type(exception), exception, exception.__traceback__))
+            self._report("{} failed:\n{}".format(get_task_name(task), text))
+
+    def get_tasks(self):
+        """
+        :return: [asyncio.Task] running ones first, then finished ones, newest first
+        """
+        running = sorted(asyncio.all_tasks(self.loop), key=lambda t: -self.get_info(t).started)
+        finished = [task for task in reversed(self.finished_tasks) if task not in running]
+        return running + finished
+
+    def get_info(self, task):
+        """
+        :rtype: TaskInfo
+        """
+        info = self.task_infos.get(task)
+        if info is None:  # made before the factory was set, or by another loop's factory
+            info = self.task_infos[task] = TaskInfo()
+        return info
+
+    def clear_finished(self):
+        self.finished_tasks.clear()
+
+    def cancel_all(self):
+        for task in asyncio.all_tasks(self.loop):
+            task.cancel()
+
+    def close(self, timeout=1.0):
+        """
+        Cancel everything, give the tasks a moment to clean up and close the loop
+        """
+        if self.loop.is_closed():
+            return
+        self.cancel_all()
+        deadline = time.monotonic() + timeout
+        while asyncio.all_tasks(self.loop) and time.monotonic() < deadline:
+            self.run_once()
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        self.loop.close()
+
+    # -------------------------------------------------------------------
+    # errors
+    def _handle_exception(self, loop, context):
+        message = context.get("message") or "Unhandled exception in event loop"
+        exception = context.get("exception")
+        if exception is not None:
+            message += "\n" + "".join(traceback.format_exception(type(exception), exception,
+                                                                 exception.__traceback__))
+        self._report(message)
+
+    def _report(self, text):
+        if not text.endswith("\n"):
+            text += "\n"
+        if self.on_error is not None:
+            self.on_error(text)
+        else:
+            sys.stderr.write(text)
@@ -0,0 +1,298 @@
+"""
+Run one script once per file, several files at a time
+
+Every item runs in its own process of the external python interpreter, so a crash or a
+leak in one file doesn't affect the others (or the DCC the editor lives in).
+The script gets the file it should work on as `batch_file_path` (and sys.argv[1]),
+and can hand something back to the summary by assigning `batch_result`.
+"""
+import datetime
+import fnmatch
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+_bootstrap = """
+import json, runpy, sys
+script_path, file_path, result_path = sys.argv[1:4]
+sys.argv = [script_path, file_path]
+namespace = runpy.run_path(script_path, init_globals={"batch_file_path": file_path}, run_name="__main__")
+with open(result_path, "w") as fh:
+    json.dump(namespace.get("batch_result"), fh, default=repr)
+"""
+
+
+def collect_files(paths, patterns="*", recursive=True):
+    """
+    Expand folders into the files inside them
+
+    :param paths: files and folders
+    :param patterns: ';' separated fnmatch patterns, eg. "*.ma;*.mb"
+    :param recursive: look in sub folders too
+    :return: sorted list of file paths
+    """
+    patterns = [p.strip() for p in patterns.split(";") if p.strip()] or ["*"]
+
+    def matches(file_name):
+        return any(fnmatch.fnmatch(file_name, pattern) for pattern in patterns)
+
+    file_paths = set()
+    for path in paths:
+        if os.path.isfile(path):
+            file_paths.add(path)
+            continue
+
+        for root, dir_names, file_names in os.walk(path):
+            file_paths.update(os.path.join(root, f).replace("\\", "/") for f in file_names if matches(f))
+            if not recursive:
+                break
+
+    return sorted(file_paths)
+
+
+class BatchItem(object):
+    def __init__(self, index, file_path):
+        self.index = index
+        self.file_path = file_path
+        self.status = PENDING
+        self.duration = 0.0
+        self.output = ""
+        self.exit_code = None
+        self.result = None
+        self.attempts = 0
+
+    def to_dict(self):
+        return {
+            "file_path": self.file_path,
+            "status": self.status,
+            "duration": self.duration,
+            "exit_code": self.exit_code,
+            "attempts": self.attempts,
+            "result": self.result,
+            "output": self.output,
+        }
+
+
+class BatchRun(object):
+    """
+    :param script_text: script to run for every file
+    :param file_paths:
+    :param python_executable:
+    :param worker_count: how many files to process at the same time
+    :param on_item_changed: called with the BatchItem whenever its status changes. Called from worker threads.
+    :param on_finished: called once nothing is pending or running anymore. Called from a worker thread.
+    :param summary_dir: folder the summary gets written to whenever the batch finishes, None to not write one
+    """
+
+    def __init__(self, script_text, file_paths, python_executable, worker_count=None,
+                 on_item_changed=None, on_finished=None, name="batch", summary_dir=None):
+        self.script_text = script_text
+        self.python_executable = python_executable
+        self.worker_count = max(1, worker_count or os.cpu_count() or 1)
+        self.on_item_changed = on_item_changed
+        self.on_finished = on_finished
+        self.name = name
+        self.summary_dir = summary_dir
+        self.summary_path = None  # written by the first finish, retries update the same file
+
+        self.items = [BatchItem(i, file_path) for i, file_path in enumerate(file_paths)]
+        self.start_time = None
+        self.end_time = None
+
+        self._temp_dir = None  # script and result files of the items, only there while something runs
+        self._executor = None
+        self._processes = dict()  # item index: Popen
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._cancelled = False
+
+    def start(self, items=None):
+        """
+        :param items: only (re)run these items, defaults to everything
+        """
+        items = self.items if items is None else items
+        if not items:
+            return
+
+        with self._lock:
+            if self._temp_dir is None:
+                self._temp_dir = tempfile.mkdtemp(prefix="live_script_batch_")
+                with open(os.path.join(self._temp_dir, "batch_script.py"), "w") as fh:
+                    fh.write(self.script_text)
+            self._outstanding += len(items)
+
+        self._cancelled = False
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.worker_count, thread_name_prefix="BatchRun")
+
+        for item in items:
+            item.status = PENDING
+            self._notify(item)
+            self._executor.submit(self._run_item, item)
+
+    def retry_failed(self):
+        self.start([item for item in self.items if item.status in (FAILED, CANCELLED)])
+
+    def cancel(self):
+        self._cancelled = True
+        with self._lock:
+            processes = list(self._processes.values())
+        for process in processes:
+            process.kill()
+
+    def is_running(self):
+        return self._outstanding > 0
+
+    def counts(self):
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0, CANCELLED: 0}
+        for item in self.items:
+            counts[item.status] += 1
+        return counts
+
+    def _notify(self, item):
+        if self.on_item_changed is not None:
+            self.on_item_changed(item)
+
+    def _run_item(self, item):
+        temp_dir = None
+        try:
+            if self._cancelled:
+                item.status = CANCELLED
+                return
+            self._execute(item)
+        except Exception:
+            # nothing may leave an item running forever
+            item.output += traceback.format_exc()
+            item.status = FAILED
+        finally:
+            self._notify(item)
+            with self._lock:
+                self._outstanding -= 1
+                finished = self._outstanding == 0
+                if finished:
+                    temp_dir, self._temp_dir = self._temp_dir, None
+            if temp_dir is not None:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            if finished:
+                self._finished()
+
+    def _execute(self, item):
+        item.status = RUNNING
+        item.attempts += 1
+        item.result = None
+        item.output = ""
+        self._notify(item)
+
+        result_path = os.path.join(self._temp_dir, "result_{}.json".format(item.index))
+        try:
+            self._execute_process(item, result_path)
+        finally:
+            if os.path.exists(result_path):
+                os.remove(result_path)
+
+    def _execute_process(self, item, result_path):
+        script_path = os.path.join(self._temp_dir, "batch_script.py")
+        start_time = time.perf_counter()
+        try:
+            process = subprocess.Popen(
+                [self.python_executable, "-c", _bootstrap, script_path, item.file_path, result_path],
+                cwd=os.path.dirname(item.file_path) or None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+                errors="replace",
+            )
+        except OSError as e:
+            item.output = "Failed to start {}: {}".format(self.python_executable, e)
+            item.status = FAILED
+            return
+        with self._lock:
+            self._processes[item.index] = process
+        if self._cancelled:
+            process.kill()  # started while cancel() was going through the processes
+        try:
+            item.output, _ = process.communicate()
+        finally:
+            with self._lock:
+                self._processes.pop(item.index, None)
+
+        item.duration = time.perf_counter() - start_time
+        item.exit_code = process.returncode
+
+        if os.path.exists(result_path):
+            try:
+                with open(result_path, "r") as fh:
+                    item.result = json.load(fh)
+            except (IOError, OSError, ValueError) as e:
+                item.output += "\nFailed to read batch_result: {}\n".format(e)
+                item.status = FAILED
+                return
+
+        if self._cancelled and item.exit_code != 0:
+            item.status = CANCELLED
+        else:
+            item.status = DONE if item.exit_code == 0 else FAILED
+
+    def _finished(self):
+        self.end_time = time.perf_counter()
+        if self.summary_dir:
+            try:
+                if self.summary_path is None:
+                    os.makedirs(self.summary_dir, exist_ok=True)
+                    file_name = "{}_{}.json".format(re.sub(r"[^\w.-]+", "_", self.name).strip("_"),
+                                                    datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f"))
+                    self.summary_path = os.path.join(self.summary_dir, file_name)
+                self.write_summary(self.summary_path)
+            except (IOError, OSError) as e:
+                log.warning("Failed to write batch summary to {}: {}".format(self.summary_dir, e))
+        if self.on_finished is not None:
+            self.on_finished()
+
+    def get_total_duration(self):
+        """
+        :return: seconds from the last start until everything finished, or until now if it's still running
+        """
+        if self.start_time is None:
+            return 0.0
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+    def write_summary(self, file_path):
+        summary = {
+            "name": self.name,
+            "time": datetime.datetime.now().isoformat(),
+            "python_executable": self.python_executable,
+            "worker_count": self.worker_count,
+            "counts": self.counts(),
+            "total_duration": self.get_total_duration(),  # wall clock, items overlap
+            "items": [item.to_dict() for item in self.items],
+        }
+        with open(file_path, "w") as fh:
+            json.dump(summary, fh, indent=2, default=repr)
+        return file_path
+
+    def shutdown(self):
+        """
+        Cancel whatever is left, the workers finish up and clean the temp files in the background
+        """
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
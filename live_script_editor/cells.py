@@ -0,0 +1,116 @@
+"""
+'# %%' cells in a script, and which of them changed since they last ran
+
+Cells are remembered by a hash of their content, so moving a cell around or editing
+a different one doesn't make it dirty. That way expensive setup cells only run again
+when they actually changed.
+"""
+import hashlib
+import re
+import time
+
+_cell_marker_re = re.compile(r"^#\s*%%(.*)$")
+
+NOT_RUN = "not run"
+DONE = "done"
+FAILED = "failed"
+CHANGED = "changed"
+
+
+class Cell(object):
+    def __init__(self, index, start_line, end_line, text, title="", has_marker=True):
+        self.index = index
+        self.start_line = start_line  # 0 based, same as QTextBlock.blockNumber()
+        self.end_line = end_line  # exclusive
+        self.text = text
+        self.title = title
+        self.has_marker = has_marker  # False for code before the first marker
+        self.content_hash = get_content_hash(text)
+
+    def __repr__(self):
+        return "Cell({} lines {}-{} {!r})".format(self.index, self.start_line + 1, self.end_line, self.title)
+
+
+class CellRun(object):
+    def __init__(self, success, duration):
+        self.success = success
+        self.duration = duration
+        self.timestamp = time.time()
+
+
+def get_content_hash(text):
+    # whitespace at the end of the cell doesn't change what it does
+    return hashlib.sha1(text.rstrip().encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def split_cells(text):
+    """
+    :param text: full script
+    :return: list of Cell. Code before the first marker is a cell too, if there is any.
+    """
+    lines = text.split("\n")
+    starts = []  # [(line, title, has_marker)]
+    for i, line in enumerate(lines):
+        match = _cell_marker_re.match(line)
+        if match:
+            starts.append((i, match.group(1).strip(), True))
+
+    if not starts or (starts[0][0] != 0 and any(line.strip() for line in lines[:starts[0][0]])):
+        starts.insert(0, (0, "", False))
+
+    cells = []
+    for index, (start_line, title, has_marker) in enumerate(starts):
+        end_line = starts[index + 1][0] if index + 1 < len(starts) else len(lines)
+        cells.append(Cell(index, start_line, end_line, "\n".join(lines[start_line:end_line]), title, has_marker))
+    return cells
+
+
+def get_cell_at_line(cells, line):
+    if not cells:
+        return None
+    for cell in cells:
+        if line < cell.end_line:
+            return cell  # blank lines before the first marker go with the first cell
+    return cells[-1]
+
+
+class CellTracker(object):
+    """
+    Remembers how the cells of one script went the last time they ran
+    """
+
+    def __init__(self):
+        self.runs = dict()  # content hash: CellRun of the last time a cell with that content ran
+        self.last_runs = dict()  # cell index: CellRun, to still show something for cells that changed since
+
+    def record(self, cell, success, duration):
+        run = CellRun(success, duration)
+        self.runs[cell.content_hash] = run
+        self.last_runs[cell.index] = run
+
+    def get_state(self, cell):
+        """
+        :return: (state, CellRun or None)
+        """
+        run = self.runs.get(cell.content_hash)
+        if run is not None:
+            return (DONE if run.success else FAILED), run
+
+        run = self.last_runs.get(cell.index)
+        if run is not None:
+            return CHANGED, run
+        return NOT_RUN, None
+
+    def is_dirty(self, cell):
+        run = self.runs.get(cell.content_hash)
+        return run is None or not run.success
+
+    def get_dirty_cells(self, cells):
+        return [cell for cell in cells if self.is_dirty(cell)]
+
+    def clear(self):
+        """
+        Forget everything, eg. when the namespace the cells ran in got reset
+        """
+        self.runs.clear()
+        self.last_runs.clear()
@@ -0,0 +1,554 @@
+"""
+Small command port that lets the editor execute code in another running python host (DCC or plain python)
+
+Only uses the standard library so it can be imported from any host application:
+
+    from live_script_editor import command_port
+    command_port.start_server()
+
+Or as a stand-in host from the command line:
+
+    python -m live_script_editor.command_port --address 127.0.0.1:7720
+
+Messages are length-prefixed json frames. A request gets any number of streamed
+'stdout' / 'stderr' frames back, followed by a single 'done' frame.
+
+Every frame header carries a digest of a shared token, frames with any other token close the
+connection. Without one given, both sides use the token from the LIVE_SCRIPT_EDITOR_TOKEN
+environment variable, or else from a file in the user's home folder that only they can read.
+So other users on the same machine can't run code in the host.
+"""
+import argparse
+import builtins
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager, redirect_stdout, redirect_stderr
+
+from live_script_editor import namespaces
+from live_script_editor import result_renderer
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7720
+
+header_struct = struct.Struct("!32sI")  # token digest, payload size
+max_frame_size = 64 * 1024 * 1024  # anything bigger than this is most likely garbage on the socket
+
+obj_name_re = re.compile(r"[\w]+\.", re.IGNORECASE)
+
+_client_timeout = object()  # marker for 'use the timeout the client was created with'
+
+token_env_var = "LIVE_SCRIPT_EDITOR_TOKEN"
+token_file_path = os.path.join(os.path.expanduser("~"), ".live_script_editor", "command_port_token")
+
+
+class CommandPortError(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------------
+# Token
+
+def get_default_token():
+    """
+    :return: token from the environment, or from the token file, which gets made on first use
+    """
+    token = os.environ.get(token_env_var)
+    if token:
+        return token
+
+    try:
+        with open(token_file_path, "r") as fp:
+            token = fp.read().strip()
+        if token:
+            return token
+    except (IOError, OSError):
+        pass
+
+    os.makedirs(os.path.dirname(token_file_path), mode=0o700, exist_ok=True)
+    token = os.urandom(32).hex()
+    try:
+        fd = os.open(token_file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # another process got there first
+        with open(token_file_path, "r") as fp:
+            return fp.read().strip()
+    with os.fdopen(fd, "w") as fp:
+        fp.write(token)
+    return token
+
+
+def get_token_digest(token):
+    """
+    :return: what goes in the frame header, same size whatever the token
+    """
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+# ---------------------------------------------------------------------------------
+# Framing
+
+def send_message(sock, message, token_digest):
+    payload = json.dumps(message).encode("utf-8")
+    sock.sendall(header_struct.pack(token_digest, len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data.extend(chunk)
+    return bytes(data)
+
+
+def recv_message(sock, token_digest):
+    """
+    Read one frame from the socket
+
+    :param sock:
+    :param token_digest: from get_token_digest(), frames with another one raise a CommandPortError
+    :return: decoded message, or None if the other side closed the connection
+    """
+    header = _recv_exact(sock, header_struct.size)
+    if header is None:
+        return None
+
+    frame_digest, size = header_struct.unpack(header)
+    if not hmac.compare_digest(frame_digest, token_digest):
+        raise CommandPortError("Frame with a wrong token")
+    if size > max_frame_size:
+        raise CommandPortError("Frame of {} bytes exceeds max frame size".format(size))
+
+    payload = _recv_exact(sock, size)
+    if payload is None:
+        return None
+    return json.loads(payload.decode("utf-8"))
+
+
+def parse_address(address):
+    """
+    Convert "host:port", "port" or a socket file path to something socket.connect understands
+    """
+    if isinstance(address, (tuple, list)):
+        return tuple(address)
+
+    address = str(address).strip()
+    if address.isdigit():
+        return DEFAULT_HOST, int(address)
+
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and host and "/" not in host and "\\" not in host:
+        return host, int(port)
+
+    return address  # unix socket path
+
+
+def format_address(address):
+    if isinstance(address, tuple):
+        return "{}:{}".format(*address)
+    return address
+
+
+def _create_connection(address, timeout):
+    if isinstance(address, tuple):
+        sock = socket.create_connection(address, timeout=timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    else:
+        if not hasattr(socket, "AF_UNIX"):
+            raise CommandPortError("Unix sockets are not supported on this platform")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(address)
+    return sock
+
+
+# ---------------------------------------------------------------------------------
+# Server side
+
+def get_completions(namespace, text):
+    """
+    Same idea as PythonObjectCompleter.complete_text, but run against the namespace of the host
+
+    :param namespace:
+    :param text: line of text that is being completed
+    :return: list of names
+    """
+    found_obj_names = obj_name_re.findall(text)
+    if not found_obj_names:
+        completion_list = list(namespace)
+        completion_list.extend(dir(builtins))
+        return completion_list
+
+    selected_obj_full_name = "".join(found_obj_names).rstrip(".")
+    selected_obj_base = selected_obj_full_name.split(".")[0]
+    if selected_obj_base not in namespace:
+        return []
+
+    try:
+        return dir(eval(selected_obj_full_name, namespace))
+    except Exception:
+        return []
+
+
+class _StreamWriter(object):
+    """
+    File-like object that sends everything written to it back to the client, one line at a time
+    """
+
+    def __init__(self, connection, request_id, stream):
+        self.connection = connection
+        self.request_id = request_id
+        self.stream = stream
+        self._buffer = ""
+
+    def write(self, text):
+        self._buffer += text
+        if "\n" in self._buffer:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        text, self._buffer = self._buffer, ""
+        self.connection.send({"id": self.request_id, "type": self.stream, "data": text})
+
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+
+    def setup(self):
+        if self.request.family != getattr(socket, "AF_UNIX", None):
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._send_lock = threading.Lock()
+
+    def send(self, message):
+        with self._send_lock:
+            send_message(self.request, message, self.server.port.token_digest)
+
+    def handle(self):
+        while True:
+            try:
+                message = recv_message(self.request, self.server.port.token_digest)
+            except CommandPortError as e:
+                log.warning("Command port connection from {} refused: {}".format(self.client_address, e))
+                return
+            except (OSError, ValueError) as e:
+                log.debug("Command port connection dropped: {}".format(e))
+                return
+
+            if message is None:
+                return
+
+            try:
+                self.server.port.handle_message(self, message)
+            except OSError:
+                return  # client went away mid-reply
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:
+    _UnixServer = None
+
+
+class CommandPortServer(object):
+    """
+    Executes code sent from the editor in this host's namespace
+
+    :param address: (host, port) tuple, "host:port" string or unix socket path
+    :param namespace: dict the code gets executed in, defaults to __main__
+    :param executor: callable that takes a function and runs it on the host's main thread and returns the result.
+                     Most DCCs want this, eg. maya.utils.executeInMainThreadWithResult
+    :param token: clients need the same one, defaults to get_default_token()
+    """
+
+    def __init__(self, address=None, namespace=None, executor=None, token=None):
+        self.address = parse_address(address or DEFAULT_PORT)
+        self.token_digest = get_token_digest(token or get_default_token())
+
+        if namespace is None:
+            namespace = sys.modules["__main__"].__dict__
+        self.namespace = namespace
+        self.executor = executor
+
+        self._interpreter = namespaces.ScriptInterpreter(self.namespace)
+        self._result_renderer = result_renderer.ResultRenderer(lambda text: sys.stdout.write(text + "\n"))
+        self._exec_lock = threading.Lock()  # stdout redirection is process wide, so only one run at a time
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        if isinstance(self.address, tuple):
+            self._server = _TCPServer(self.address, _ConnectionHandler)
+            self.address = self._server.server_address[:2]  # resolves port 0
+        else:
+            if _UnixServer is None:
+                raise CommandPortError("Unix sockets are not supported on this platform")
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            self._server = _UnixServer(self.address, _ConnectionHandler)
+
+        self._server.port = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="CommandPortServer", daemon=True)
+        self._thread.start()
+        log.info("Command port listening on {}".format(format_address(self.address)))
+        return self
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        if not isinstance(self.address, tuple) and os.path.exists(self.address):
+            os.remove(self.address)
+        self._server = None
+        self._thread = None
+
+    def is_running(self):
+        return self._server is not None
+
+    def handle_message(self, connection, message):
+        request_id = message.get("id")
+        try:
+            self._handle_message(connection, request_id, message)
+        except OSError:
+            raise  # the client went away, nobody to reply to
+        except Exception as e:
+            # eg. the executor failed to get the call onto the host's main thread, the client still waits for a reply
+            log.warning("Command port request failed: {}".format(e))
+            connection.send({"id": request_id, "type": "done", "ok": False,
+                             "error": "{}: {}".format(type(e).__name__, e)})
+
+    def _handle_message(self, connection, request_id, message):
+        request_type = message.get("type")
+
+        if request_type == "ping":
+            connection.send({"id": request_id, "type": "done", "ok": True, "pid": os.getpid()})
+
+        elif request_type == "execute":
+            reply = self._call_on_host(self._execute, connection, request_id, message.get("code", ""))
+            connection.send(reply)
+
+        elif request_type == "complete":
+            completions = self._call_on_host(get_completions, self.namespace, message.get("text", ""))
+            connection.send({"id": request_id, "type": "done", "ok": True, "completions": completions})
+
+        else:
+            connection.send({"id": request_id, "type": "done", "ok": False,
+                             "error": "Unknown request type: {}".format(request_type)})
+
+    def _call_on_host(self, func, *args):
+        if self.executor is None:
+            return func(*args)
+        return self.executor(lambda: func(*args))
+
+    def _execute(self, connection, request_id, source):
+        stdout = _StreamWriter(connection, request_id, "stdout")
+        stderr = _StreamWriter(connection, request_id, "stderr")
+
+        with self._exec_lock:
+            start_time = time.perf_counter()
+            try:
+                with redirect_stdout(stdout), redirect_stderr(stderr), self._result_renderer.installed():
+                    ok = self._interpreter.run(source)
+            except BaseException:  # SystemExit and friends shouldn't take down the host
+                stderr.write(traceback.format_exc())
+                ok = False
+            duration = time.perf_counter() - start_time
+
+        stdout.flush()
+        stderr.flush()
+        return {"id": request_id, "type": "done", "ok": ok, "duration": duration}
+
+
+_active_server = None
+
+
+def start_server(address=None, namespace=None, executor=None, token=None):
+    """
+    Start the command port in a background thread. Safe to call multiple times.
+    """
+    global _active_server
+    if _active_server is not None and _active_server.is_running():
+        return _active_server
+    _active_server = CommandPortServer(address, namespace=namespace, executor=executor, token=token).start()
+    return _active_server
+
+
+def stop_server():
+    global _active_server
+    if _active_server is not None:
+        _active_server.stop()
+        _active_server = None
+
+
+# ---------------------------------------------------------------------------------
+# Client side
+
+class CommandPortClient(object):
+    """
+    One persistent connection to a command port
+
+    :param token: same as the server's, defaults to get_default_token()
+    """
+
+    def __init__(self, address, timeout=10.0, token=None):
+        self.address = parse_address(address)
+        self.timeout = timeout
+        self.token_digest = get_token_digest(token or get_default_token())
+        self._sock = None
+        self._request_count = 0
+
+    def connect(self):
+        if self._sock is None:
+            self._sock = _create_connection(self.address, self.timeout)
+        return self
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+    def is_connected(self):
+        return self._sock is not None
+
+    def request(self, message, on_output=None, timeout=_client_timeout):
+        """
+        Send a request and block until the 'done' frame arrives
+
+        :param message:
+        :param on_output: called with (stream, text) for every streamed output frame
+        :param timeout: seconds to wait for the reply, None waits forever
+        :return: the 'done' message
+        """
+        self.connect()
+        self._request_count += 1
+        message = dict(message, id=self._request_count)
+
+        try:
+            self._sock.settimeout(self.timeout if timeout is _client_timeout else timeout)
+            send_message(self._sock, message, self.token_digest)
+            while True:
+                reply = recv_message(self._sock, self.token_digest)
+                if reply is None:
+                    raise CommandPortError("Connection to {} closed".format(format_address(self.address)))
+
+                if reply.get("type") == "done":
+                    return reply
+
+                if on_output is not None:
+                    on_output(reply.get("type"), reply.get("data", ""))
+        except BaseException:
+            self.close()  # connection state is unknown, don't let it go back into a pool
+            raise
+
+    def execute(self, source, on_output=None, timeout=_client_timeout):
+        return self.request({"type": "execute", "code": source}, on_output=on_output, timeout=timeout)
+
+    def complete(self, text, timeout=_client_timeout):
+        return self.request({"type": "complete", "text": text}, timeout=timeout).get("completions", [])
+
+    def ping(self):
+        """
+        :return: round trip time in seconds
+        """
+        start_time = time.perf_counter()
+        self.request({"type": "ping"})
+        return time.perf_counter() - start_time
+
+
+class ConnectionPool(object):
+    """
+    Keeps a few idle connections to one host around so requests don't pay for the connect
+    """
+
+    def __init__(self, address, max_idle=4, timeout=10.0, token=None):
+        self.address = parse_address(address)
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.token = token
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return format_address(self.address)
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            client = self._idle.pop() if self._idle else None
+
+        if client is None:
+            client = CommandPortClient(self.address, timeout=self.timeout, token=self.token).connect()
+
+        try:
+            yield client
+        finally:
+            with self._lock:
+                if client.is_connected() and len(self._idle) < self.max_idle:
+                    self._idle.append(client)
+                else:
+                    client.close()
+
+    def execute(self, source, on_output=None, timeout=_client_timeout):
+        with self.connection() as client:
+            return client.execute(source, on_output=on_output, timeout=timeout)
+
+    def complete(self, text, timeout=_client_timeout):
+        with self.connection() as client:
+            return client.complete(text, timeout=timeout)
+
+    def ping(self):
+        with self.connection() as client:
+            return client.ping()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for client in idle:
+            client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in python host for the Live Script Editor")
+    parser.add_argument("--address", default=str(DEFAULT_PORT), help="host:port, port or unix socket path")
+    parser.add_argument("--token", help="clients need the same one, defaults to ${} or {}".format(
+        token_env_var, token_file_path))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = CommandPortServer(args.address, token=args.token).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
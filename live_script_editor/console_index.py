@@ -0,0 +1,115 @@
+"""
+Index of every line written to the console, so it can be filtered without going through the QTextDocument
+
+Lines are bucketed by stream as they come in and runs are contiguous line ranges,
+so filtering on stream and/or run only touches the matching lines. A regex only
+has to look at the lines that made it through those filters.
+"""
+import bisect
+import itertools
+import re
+
+INPUT = 0
+OUTPUT = 1
+ERROR = 2
+
+stream_names = {
+    INPUT: "Input",
+    OUTPUT: "Output",
+    ERROR: "Error",
+}
+
+
+class ConsoleLineIndex(object):
+    def __init__(self):
+        self.generation = 0  # goes up on every clear, line numbers from before don't mean anything after it
+        self.clear()
+
+    def clear(self):
+        self.generation += 1
+        self.lines = []
+        self.line_streams = bytearray()
+        self.stream_lines = {stream: [] for stream in stream_names}  # stream: sorted line numbers
+        self.run_starts = [0]  # first line of every run, run 0 is whatever got written before the first run
+        self._pattern_matches = None  # (pattern, lines searched so far, matching line numbers) of the last regex
+
+    def __len__(self):
+        return len(self.lines)
+
+    @property
+    def current_run_id(self):
+        return len(self.run_starts) - 1
+
+    def start_run(self):
+        """
+        :return: id of the new run
+        """
+        if self.run_starts[-1] == len(self.lines) and len(self.run_starts) > 1:
+            return self.current_run_id  # previous run didn't write anything, reuse it
+        self.run_starts.append(len(self.lines))
+        return self.current_run_id
+
+    def add(self, text, stream):
+        first_line = len(self.lines)
+        new_lines = text.split("\n")
+        self.lines.extend(new_lines)
+        self.line_streams.extend(bytes([stream]) * len(new_lines))
+        self.stream_lines[stream].extend(range(first_line, first_line + len(new_lines)))
+
+    def get_run_range(self, run_id):
+        start = self.run_starts[run_id]
+        end = self.run_starts[run_id + 1] if run_id + 1 < len(self.run_starts) else len(self.lines)
+        return start, end
+
+    def get_run_id(self, line_number):
+        return bisect.bisect_right(self.run_starts, line_number) - 1
+
+    def filter(self, streams=None, run_id=None, pattern=None, start_line=0):
+        """
+        :param streams: only these streams, None for all of them
+        :param run_id: only lines written during this run
+        :param pattern: regex string or compiled pattern that has to match somewhere on the line
+        :param start_line: only lines from this one on, eg. the ones added since the last time
+        :return: sequence of matching line numbers
+        """
+        start, end = (0, len(self.lines)) if run_id is None else self.get_run_range(run_id)
+        start = max(start, start_line)
+
+        if streams is None or set(streams) >= set(stream_names):
+            line_numbers = range(start, end)
+        else:
+            line_numbers = []
+            for stream in streams:
+                stream_lines = self.stream_lines[stream]
+                line_numbers.extend(stream_lines[bisect.bisect_left(stream_lines, start):
+                                                 bisect.bisect_left(stream_lines, end)])
+            if len(streams) > 1:
+                line_numbers.sort()
+
+        if pattern:
+            if isinstance(pattern, str):
+                pattern = re.compile(pattern)
+            if isinstance(line_numbers, range):
+                matches = self.get_pattern_matches(pattern)
+                line_numbers = matches[bisect.bisect_left(matches, start):bisect.bisect_left(matches, end)]
+            else:
+                search = pattern.search
+                lines = self.lines
+                line_numbers = [i for i in line_numbers if search(lines[i])]
+
+        return line_numbers
+
+    def get_pattern_matches(self, pattern):
+        """
+        All lines matching the regex. Remembers the result of the last pattern, so while
+        the same filter stays active only new lines have to be searched.
+        """
+        if self._pattern_matches is not None and self._pattern_matches[0] == pattern:
+            _, searched, matches = self._pattern_matches
+        else:
+            searched, matches = 0, []
+
+        new_lines = self.lines[searched:]
+        matches.extend(itertools.compress(range(searched, len(self.lines)), map(pattern.search, new_lines)))
+        self._pattern_matches = (pattern, len(self.lines), matches)
+        return matches
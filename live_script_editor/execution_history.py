@@ -0,0 +1,237 @@
+"""
+Every snippet that gets run, stored in a local sqlite database with a full text index
+
+Writes go through a queue to a writer thread that commits them in batches,
+so recording a run never waits on the disk. Searches include the runs that
+are still waiting to be written, so nothing has to wait for the writer either.
+They read through a connection of their own and only look at rows up to the last
+batch that left the pending list, which keeps a run from showing up twice.
+"""
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+_schema = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL,
+    tab_name TEXT,
+    file_path TEXT,
+    timestamp REAL NOT NULL,
+    duration REAL,
+    success INTEGER
+);
+"""
+
+_fts_schema = """
+CREATE VIRTUAL TABLE IF NOT EXISTS runs_fts USING fts5(
+    code, tab_name, file_path, content='runs', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS runs_fts_insert AFTER INSERT ON runs BEGIN
+    INSERT INTO runs_fts (rowid, code, tab_name, file_path) VALUES (new.id, new.code, new.tab_name, new.file_path);
+END;
+CREATE TRIGGER IF NOT EXISTS runs_fts_delete AFTER DELETE ON runs BEGIN
+    INSERT INTO runs_fts (runs_fts, rowid, code, tab_name, file_path)
+    VALUES ('delete', old.id, old.code, old.tab_name, old.file_path);
+END;
+"""
+
+_token_re = re.compile(r"\w+", re.UNICODE)
+
+
+class HistoryEntry(object):
+    def __init__(self, entry_id, code, tab_name, file_path, timestamp, duration, success):
+        self.id = entry_id
+        self.code = code
+        self.tab_name = tab_name
+        self.file_path = file_path
+        self.timestamp = timestamp
+        self.duration = duration
+        self.success = bool(success)
+
+    @property
+    def first_line(self):
+        for line in self.code.splitlines():
+            if line.strip():
+                return line.strip()
+        return ""
+
+
+def _matches_tokens(entry, tokens, prefix_only):
+    """
+    Same rules as the database search, for runs that haven't been written yet
+    """
+    entry_text = "\n".join([entry.code, entry.tab_name or "", entry.file_path or ""]).lower()
+    if not prefix_only:
+        return all(token in entry_text for token in tokens)
+    entry_tokens = _token_re.findall(entry_text)
+    return all(any(entry_token.startswith(token) for entry_token in entry_tokens) for token in tokens)
+
+
+def build_fts_query(text):
+    """
+    Turn what the user typed into an fts5 query where every word has to match the start of a token
+    """
+    return " ".join('"{}"*'.format(token) for token in _token_re.findall(text))
+
+
+class ExecutionHistory(object):
+    """
+    :param db_path: sqlite file, gets created if it doesn't exist
+    :param batch_interval: seconds the writer waits to collect more runs before committing
+    """
+
+    def __init__(self, db_path, batch_interval=0.5):
+        self.db_path = db_path
+        self.batch_interval = batch_interval
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self._read_connection = self._connect()
+        self._read_connection.executescript(_schema)
+        try:
+            self._read_connection.executescript(_fts_schema)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            log.warning("sqlite was built without fts5, history search falls back to LIKE")
+            self.has_fts = False
+        self._read_connection.commit()
+
+        self._queue = queue.Queue()
+        self._pending = []  # runs recorded but not written yet, in the order they were recorded
+        # last id searches look at, rows after it are still in _pending as far as they're concerned
+        self._written_id = self._read_connection.execute("SELECT COALESCE(MAX(id), 0) FROM runs").fetchone()[0]
+        self._pending_lock = threading.Lock()  # guards _pending and _written_id, never held for any disk access
+        self._writer = threading.Thread(target=self._write_loop, name="ExecutionHistoryWriter", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")  # readers don't block on the writer thread
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def record(self, code, tab_name="", file_path="", duration=None, success=True, timestamp=None):
+        """
+        Queue a run to be written. Returns immediately.
+        """
+        row = (code, tab_name, file_path or "", timestamp or time.time(), duration, int(bool(success)))
+        self._pending.append(row)
+        self._queue.put(row)
+
+    def _write_loop(self):
+        connection = self._connect()
+        running = True
+        while running:
+            batch = [self._queue.get()]
+
+            # give it a moment so a burst of runs ends up in one transaction
+            deadline = time.monotonic() + self.batch_interval
+            while batch[-1] is not None:  # unless it's closing, that shouldn't wait
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            if None in batch:  # close() was called
+                running = False
+                batch = [b for b in batch if b is not None]
+
+            if batch:
+                written_id = None
+                try:
+                    with connection:
+                        connection.executemany(
+                            "INSERT INTO runs (code, tab_name, file_path, timestamp, duration, success) "
+                            "VALUES (?, ?, ?, ?, ?, ?)", batch)
+                        written_id = connection.execute("SELECT MAX(id) FROM runs").fetchone()[0]
+                except sqlite3.Error as e:
+                    log.warning("Failed to write execution history: {}".format(e))
+                with self._pending_lock:
+                    del self._pending[:len(batch)]
+                    if written_id is not None:
+                        self._written_id = written_id
+
+            for _ in batch:
+                self._queue.task_done()
+        self._queue.task_done()
+        connection.close()
+
+    def flush(self):
+        """
+        Block until everything recorded so far has been written
+        """
+        self._queue.join()
+
+    def search(self, text="", limit=200):
+        """
+        :param text: words to look for in the code, tab name or file path. Empty gives the latest runs.
+        :param limit:
+        :return: list of HistoryEntry, newest first. Runs that haven't been written yet have no id.
+        """
+        with self._pending_lock:
+            pending_rows = list(self._pending)
+            written_id = self._written_id
+
+        tokens = [token.lower() for token in _token_re.findall(text)]
+        pending_entries = [HistoryEntry(None, *row) for row in reversed(pending_rows)]
+        pending_entries = [entry for entry in pending_entries
+                           if _matches_tokens(entry, tokens, self.has_fts)][:limit]
+        return pending_entries + self._search(text, limit - len(pending_entries), written_id)
+
+    def _search(self, text, limit, written_id):
+        if limit <= 0:
+            return []
+        columns = "runs.id, runs.code, runs.tab_name, runs.file_path, runs.timestamp, runs.duration, runs.success"
+        fts_query = build_fts_query(text)
+
+        if not fts_query:
+            rows = self._read_connection.execute(
+                "SELECT {} FROM runs WHERE runs.id <= ? ORDER BY runs.id DESC LIMIT ?".format(columns),
+                (written_id, limit))
+        elif self.has_fts:
+            # ids go up with time, and fts5 can walk rowids backwards without sorting all the matches
+            rows = self._read_connection.execute(
+                "SELECT {} FROM (SELECT rowid FROM runs_fts WHERE runs_fts MATCH ? AND rowid <= ? "
+                "ORDER BY rowid DESC LIMIT ?) AS matches JOIN runs ON runs.id = matches.rowid "
+                "ORDER BY runs.id DESC".format(columns),
+                (fts_query, written_id, limit))
+        else:
+            where = " AND ".join(["(runs.code LIKE ? OR runs.tab_name LIKE ? OR runs.file_path LIKE ?)"] *
+                                 len(_token_re.findall(text)))
+            params = []
+            for token in _token_re.findall(text):
+                params.extend(["%{}%".format(token)] * 3)
+            rows = self._read_connection.execute(
+                "SELECT {} FROM runs WHERE {} AND runs.id <= ? ORDER BY runs.id DESC LIMIT ?".format(columns, where),
+                params + [written_id, limit])
+
+        return [HistoryEntry(*row) for row in rows]
+
+    def count(self):
+        with self._pending_lock:
+            pending_count = len(self._pending)
+            written_id = self._written_id
+        return self._read_connection.execute(
+            "SELECT COUNT(*) FROM runs WHERE id <= ?", (written_id,)).fetchone()[0] + pending_count
+
+    def clear(self):
+        self.flush()
+        with self._read_connection:
+            self._read_connection.execute("DELETE FROM runs")  # the delete trigger keeps the fts index in sync
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        self._read_connection.close()
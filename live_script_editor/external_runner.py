@@ -0,0 +1,180 @@
+"""
+Run scripts in a separate python interpreter without blocking the editor
+"""
+import os
+import sys
+import tempfile
+import time
+
+from Qt import QtCore
+
+
+def get_default_python_executable():
+    """
+    In a DCC sys.executable is the DCC itself, so only use it when it looks like a plain python
+    """
+    executable_name = os.path.basename(sys.executable).lower()
+    if executable_name.startswith("python"):
+        return sys.executable
+    return "python"
+
+
+class ExternalScriptRun(QtCore.QObject):
+    """
+    One script running in an external interpreter
+
+    Output is split into lines as it arrives and handed out in batches on a timer,
+    so a script spamming prints can't flood the GUI thread. Once max_pending_lines are waiting,
+    nothing more is read until the next flush makes room, the rest waits in the process' buffers.
+    No output gets lost, a script that prints faster than the console can keep up just shows it later.
+    """
+    lines_received = QtCore.Signal(str, list)  # stream ("stdout" / "stderr"), lines
+    started = QtCore.Signal()
+    finished = QtCore.Signal(int, float)  # exit code, duration in seconds
+
+    flush_interval = 30  # ms
+    max_lines_per_flush = 500
+    max_pending_lines = 20000
+    read_size = 64 * 1024  # bytes read at a time, so a single read can't go far past max_pending_lines
+
+    def __init__(self, script_path=None, script_text=None, python_executable=None, working_dir=None, parent=None):
+        super(ExternalScriptRun, self).__init__(parent)
+        self.script_path = script_path
+        self.script_text = script_text
+        self.python_executable = python_executable or get_default_python_executable()
+        self.working_dir = working_dir
+
+        self.name = None
+        self.set_script_path(script_path)
+        self.start_time = None
+        self.exit_code = None
+        self._temp_script_path = None
+
+        self._partial = {"stdout": "", "stderr": ""}
+        self._pending = []  # [(stream, line)]
+
+        self.process = QtCore.QProcess(self)
+        self.process.readyReadStandardOutput.connect(self._read_stdout)
+        self.process.readyReadStandardError.connect(self._read_stderr)
+        self.process.finished.connect(self._process_finished)
+        self.process.errorOccurred.connect(self._process_error)
+
+        self._flush_timer = QtCore.QTimer(self)
+        self._flush_timer.setInterval(self.flush_interval)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def set_script_path(self, script_path):
+        """
+        :param script_path: the name and the default working directory come from it
+        """
+        self.script_path = script_path
+        self.name = os.path.basename(script_path) if script_path else "Python"
+
+    def is_running(self):
+        return self.process.state() != QtCore.QProcess.NotRunning
+
+    def start(self):
+        if self.is_running():
+            return
+
+        script_path = self.script_path
+        if self.script_text is not None:
+            # run what's in the editor, not what's saved on disk
+            fd, self._temp_script_path = tempfile.mkstemp(prefix="live_script_", suffix="_" + self.name)
+            with os.fdopen(fd, "w") as fh:
+                fh.write(self.script_text)
+            script_path = self._temp_script_path
+
+        working_dir = self.working_dir
+        if not working_dir and self.script_path:
+            working_dir = os.path.dirname(self.script_path)
+        self.process.setWorkingDirectory(working_dir or "")  # empty for the editor's, a re-run may have lost its path
+
+        environment = QtCore.QProcessEnvironment.systemEnvironment()
+        environment.insert("PYTHONUNBUFFERED", "1")
+        self.process.setProcessEnvironment(environment)
+
+        self._partial = {"stdout": "", "stderr": ""}
+        self._pending = []
+        self.exit_code = None
+        self.start_time = time.perf_counter()
+
+        self.process.start(self.python_executable, ["-u", script_path])
+        self._flush_timer.start()
+        self.started.emit()
+
+    def kill(self):
+        if self.is_running():
+            self.process.kill()
+
+    def update_script_text(self, script_text):
+        self.script_text = script_text
+
+    def _remove_temp_script(self):
+        if self._temp_script_path and os.path.exists(self._temp_script_path):
+            os.remove(self._temp_script_path)
+        self._temp_script_path = None
+
+    def _read_stdout(self):
+        self._read("stdout", QtCore.QProcess.StandardOutput)
+
+    def _read_stderr(self):
+        self._read("stderr", QtCore.QProcess.StandardError)
+
+    def _read(self, stream, channel):
+        while len(self._pending) < self.max_pending_lines:  # otherwise flush() comes back for it
+            self.process.setReadChannel(channel)
+            data = bytes(self.process.read(self.read_size))
+            if not data:
+                return
+            text = self._partial[stream] + data.decode("utf-8", errors="replace")
+            lines = text.split("\n")
+            self._partial[stream] = lines.pop()  # last bit doesn't have a line ending yet
+            self._pending.extend((stream, line.rstrip("\r")) for line in lines)
+
+    def _has_unread_output(self):
+        for channel in (QtCore.QProcess.StandardOutput, QtCore.QProcess.StandardError):
+            self.process.setReadChannel(channel)
+            if self.process.bytesAvailable():
+                return True
+        return False
+
+    def flush(self):
+        batch = self._pending[:self.max_lines_per_flush]
+        del self._pending[:self.max_lines_per_flush]
+
+        # group consecutive lines of the same stream so the console gets as few writes as possible
+        current_stream = None
+        current_lines = []
+        for stream, line in batch:
+            if stream != current_stream and current_lines:
+                self.lines_received.emit(current_stream, current_lines)
+                current_lines = []
+            current_stream = stream
+            current_lines.append(line)
+        if current_lines:
+            self.lines_received.emit(current_stream, current_lines)
+
+        # what was left in the process while the pending lines were full
+        self._read_stdout()
+        self._read_stderr()
+
+        if self.exit_code is not None and not self._has_unread_output():
+            for stream, partial in self._partial.items():
+                if partial:
+                    self._pending.append((stream, partial))
+            self._partial = {"stdout": "", "stderr": ""}
+
+        # only report that we're done once all the output has made it out
+        if self.exit_code is not None and not self._pending and not self._has_unread_output():
+            self._flush_timer.stop()
+            self._remove_temp_script()
+            self.finished.emit(self.exit_code, time.perf_counter() - self.start_time)
+
+    def _process_finished(self, exit_code, exit_status=None):
+        self.exit_code = exit_code  # flush() reads what's left and finishes up
+
+    def _process_error(self, error):
+        if error == QtCore.QProcess.FailedToStart:
+            self._pending.append(("stderr", "Failed to start: {}".format(self.python_executable)))
+            self.exit_code = -1
@@ -0,0 +1,174 @@
+"""
+Hit counts and time per line for code run from a tab
+
+On python 3.12+ this uses sys.monitoring, where code from other files gets its events
+switched off after the first one so it runs at (nearly) full speed. Older versions
+fall back to sys.settrace, only handing out a line tracer to frames of the timed code.
+
+Time is per line of the timed code only: a line that calls a function from the same script
+doesn't get the time of the lines in that function, a call into anything else counts towards
+the calling line. That way the times add up to the total and nested frames on the same line
+(comprehensions, recursion) don't get counted twice.
+"""
+import collections
+import contextlib
+import linecache
+import sys
+import time
+
+_monitoring = getattr(sys, "monitoring", None)  # python 3.12+
+
+
+class LineTimings(object):
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.hits = collections.Counter()  # line number (1 based): hit count
+        self.times = collections.defaultdict(float)  # line number: seconds
+        self.duration = 0.0
+
+    @property
+    def max_time(self):
+        return max(self.times.values()) if self.times else 0.0
+
+    def __str__(self):
+        if not self.times:
+            return "No lines timed"
+        hottest_line = max(self.times, key=self.times.get)
+        return "Timed {} lines in {:.1f}ms, hottest is line {} ({} hits, {:.1f}ms)".format(
+            len(self.hits), self.duration * 1000, hottest_line, self.hits[hottest_line],
+            self.times[hottest_line] * 1000)
+
+
+def register_source(file_name, source):
+    """
+    Put the source in linecache, so tracebacks can show lines of code that doesn't come from a file
+    """
+    lines = [line + "\n" for line in source.split("\n")]
+    linecache.cache[file_name] = (len(source), None, lines, file_name)
+
+
+class LineTimer(object):
+    """
+    Time every line of code objects compiled with file_name
+
+    timer = LineTimer("<my script>")
+    with timer.running():
+        exec(compile(source, "<my script>", "exec"))
+    print(timer.timings)
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.timings = LineTimings(file_name)
+        self._line = None  # line that is running right now
+        self._line_start = 0.0
+        self._stack = []  # lines of the calling frames
+        self._tool_id = None
+
+    @contextlib.contextmanager
+    def running(self):
+        self._stack = []
+        self._line = None
+        previous_trace = None
+        if _monitoring is not None:
+            self._start_monitoring()
+        else:
+            previous_trace = sys.gettrace()
+            sys.settrace(self._trace_call)
+
+        start_time = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.timings.duration += time.perf_counter() - start_time
+            if _monitoring is not None:
+                self._stop_monitoring()
+            else:
+                sys.settrace(previous_trace)
+
+    # -------------------------------------------------------------------
+    # bookkeeping, shared by both tracing mechanisms
+    def _enter_frame(self, now):
+        if self._line is not None:
+            self.timings.times[self._line] += now - self._line_start
+        self._stack.append(self._line)
+        self._line = None
+
+    def _leave_frame(self, now):
+        if self._line is not None:
+            self.timings.times[self._line] += now - self._line_start
+        self._line = self._stack.pop() if self._stack else None
+        self._line_start = now
+
+    def _next_line(self, line, now):
+        if self._line is not None:
+            self.timings.times[self._line] += now - self._line_start
+        self.timings.hits[line] += 1
+        self._line = line
+        self._line_start = now
+
+    # -------------------------------------------------------------------
+    # sys.monitoring, python 3.12+
+    def _start_monitoring(self):
+        events = _monitoring.events
+        for tool_id in [_monitoring.PROFILER_ID] + list(range(6)):
+            if _monitoring.get_tool(tool_id) is None:
+                break
+        else:
+            raise RuntimeError("No free sys.monitoring tool id for line timing")
+
+        _monitoring.use_tool_id(tool_id, "live_script_editor line timing")
+        self._tool_id = tool_id
+        _monitoring.register_callback(tool_id, events.LINE, self._monitor_line)
+        for event in (events.PY_START, events.PY_RESUME):
+            _monitoring.register_callback(tool_id, event, self._monitor_enter)
+        for event in (events.PY_RETURN, events.PY_YIELD):
+            _monitoring.register_callback(tool_id, event, self._monitor_leave)
+        _monitoring.register_callback(tool_id, events.PY_UNWIND, self._monitor_unwind)
+        _monitoring.set_events(tool_id, events.LINE | events.PY_START | events.PY_RESUME | events.PY_RETURN |
+                               events.PY_YIELD | events.PY_UNWIND)
+
+    def _stop_monitoring(self):
+        tool_id = self._tool_id
+        _monitoring.set_events(tool_id, 0)
+        for event in (_monitoring.events.LINE, _monitoring.events.PY_START, _monitoring.events.PY_RESUME,
+                      _monitoring.events.PY_RETURN, _monitoring.events.PY_YIELD, _monitoring.events.PY_UNWIND):
+            _monitoring.register_callback(tool_id, event, None)
+        _monitoring.free_tool_id(tool_id)
+        _monitoring.restart_events()  # switch the events that got disabled back on for whoever uses them next
+        self._tool_id = None
+
+    def _monitor_line(self, code, line):
+        if code.co_filename != self.file_name:
+            return _monitoring.DISABLE
+        self._next_line(line, time.perf_counter())
+
+    def _monitor_enter(self, code, offset):
+        if code.co_filename != self.file_name:
+            return _monitoring.DISABLE
+        self._enter_frame(time.perf_counter())
+
+    def _monitor_leave(self, code, offset, value):
+        if code.co_filename != self.file_name:
+            return _monitoring.DISABLE
+        self._leave_frame(time.perf_counter())
+
+    def _monitor_unwind(self, code, offset, exception):
+        # can't be disabled per code object, but only fires when an exception leaves a frame
+        if code.co_filename == self.file_name:
+            self._leave_frame(time.perf_counter())
+
+    # -------------------------------------------------------------------
+    # sys.settrace, older pythons
+    def _trace_call(self, frame, event, arg):
+        if frame.f_code.co_filename != self.file_name:
+            return None  # no line events for this frame
+        self._enter_frame(time.perf_counter())
+        return self._trace_frame
+
+    def _trace_frame(self, frame, event, arg):
+        if event == "line":
+            self._next_line(frame.f_lineno, time.perf_counter())
+        elif event == "return":  # also fires for yields and exceptions leaving the frame
+            self._leave_frame(time.perf_counter())
+        return self._trace_frame
@@ -1,23 +1,53 @@
 import builtins
-import code
 import datetime
+import hashlib
+import io
 import logging
+import math
 import os
 import re
+import reprlib
+import sqlite3
 import subprocess
 import sys
-from contextlib import redirect_stdout, redirect_stderr
-from typing import Callable
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 from Qt import QtCore, QtWidgets, QtGui
 
+from live_script_editor import async_tasks
+from live_script_editor import batch_runner
+from live_script_editor import cells
+from live_script_editor import command_port
+from live_script_editor import console_index
+from live_script_editor import execution_history
+from live_script_editor import external_runner
+from live_script_editor import line_timer
+from live_script_editor import memory_tracker
+from live_script_editor import module_reloader
+from live_script_editor import namespaces
+from live_script_editor import output_capture
 from live_script_editor import python_syntax_highlight
+from live_script_editor import result_renderer
+from live_script_editor import script_index
+from live_script_editor import syntax_checker
+from live_script_editor import text_diff
 
 logging.basicConfig(level=logging.INFO)
 log = logging.Logger(__name__)
 
 key_list = QtCore.Qt
 
+# one thread for all tabs, checks are cheap once the region cache is warm
+_syntax_check_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SyntaxChecker")
+
+# completions from remote hosts, so a slow or dead host doesn't freeze typing
+_remote_completion_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="RemoteCompletion")
+
+_not_run = object()  # marker for 'execute_script_text() refused to run the code'
+
 
 class LocalConstants:
     obj_name_re = re.compile(r"[\w]+\.", re.IGNORECASE)
@@ -40,6 +70,15 @@ lk = LocalConstants
 class ScriptEditorSettings(QtCore.QSettings):
     k_window_layout = "window/layout"
     k_folder_path = "script_tree/folder_path"
+    k_script_tree_file_patterns = "script_tree/file_patterns"
+    k_remote_hosts = "remote/hosts"
+    k_python_executable = "external/python_executable"
+    k_batch_worker_count = "batch/worker_count"
+    k_batch_file_patterns = "batch/file_patterns"
+    k_auto_reload_modules = "modules/auto_reload"
+    k_open_scripts = "tabs/open_scripts"
+    k_release_idle_tabs_minutes = "tabs/release_idle_minutes"
+    k_capture_native_output = "output/capture_native"
 
     def __init__(self):
         super(ScriptEditorSettings, self).__init__(
@@ -51,6 +90,8 @@ class ScriptEditorSettings(QtCore.QSettings):
 
 
 class ScriptConsoleOutputUI(QtWidgets.QPlainTextEdit):
+    lines_written = QtCore.Signal()
+
     def __init__(self, parent=None):
         super(ScriptConsoleOutputUI, self).__init__(parent=parent)
         self.setReadOnly(True)
@@ -65,27 +106,212 @@ class ScriptConsoleOutputUI(QtWidgets.QPlainTextEdit):
         self.error_format = QtGui.QTextCharFormat(self.input_format)
         self.error_format.setForeground(QtGui.QBrush(QtGui.QColor(255, 100, 100)))
 
+        self.stream_formats = {
+            console_index.INPUT: self.input_format,
+            console_index.OUTPUT: self.output_format,
+            console_index.ERROR: self.error_format,
+        }
+
+        self.line_index = console_index.ConsoleLineIndex()
+        self.extra_context_actions = list()  # added to the bottom of the right click menu
+
+    def contextMenuEvent(self, event):
+        menu = self.createStandardContextMenu()
+        if self.extra_context_actions:
+            menu.addSeparator()
+            for action in self.extra_context_actions:
+                menu.addAction(action)
+        menu.exec_(event.globalPos())
+
     def write(self, line):
         # overloaded stdout function
-        self.write_line_to_output(line, self.output_format)
+        self.write_line_to_output(line, self.output_format, console_index.OUTPUT)
 
     def write_input(self, line):
-        self.write_line_to_output(line, self.input_format)
+        self.write_line_to_output(line, self.input_format, console_index.INPUT)
 
     def write_error(self, line):
-        self.write_line_to_output(line, self.error_format)
+        self.write_line_to_output(line, self.error_format, console_index.ERROR)
 
-    def write_line_to_output(self, line, fmt=None):
+    def write_line_to_output(self, line, fmt=None, stream=console_index.OUTPUT):
         if fmt is not None:
             self.setCurrentCharFormat(fmt)
 
         if len(line) != 1 or ord(line[0]) != 10:  # ordinal 10 is Line feed or '\n'
-            self.appendPlainText(line.rstrip())
+            line = line.rstrip()
+            self.appendPlainText(line)
+            self.line_index.add(line, stream)
+            self.lines_written.emit()
         self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
 
+    def write_indexed_lines(self, line_numbers, line_index):
+        """
+        Write lines from a line index, in as few inserts as possible
+        """
+        cursor = QtGui.QTextCursor(self.document())
+        cursor.movePosition(QtGui.QTextCursor.End)
+        cursor.beginEditBlock()
+        if not self.document().isEmpty():
+            cursor.insertText("\n")  # goes after what's there already
+
+        lines = line_index.lines
+        line_streams = line_index.line_streams
+        group_stream = None
+        group_lines = []
+        for line_number in line_numbers:
+            stream = line_streams[line_number]
+            if stream != group_stream and group_lines:
+                cursor.insertText("\n".join(group_lines) + "\n", self.stream_formats[group_stream])
+                group_lines = []
+            group_stream = stream
+            group_lines.append(lines[line_number])
+        if group_lines:
+            cursor.insertText("\n".join(group_lines), self.stream_formats[group_stream])
+
+        cursor.endEditBlock()
+
+    def start_run(self):
+        return self.line_index.start_run()
+
+    def clear(self):
+        super(ScriptConsoleOutputUI, self).clear()
+        self.line_index.clear()
+
+
+class ScriptConsoleUI(QtWidgets.QWidget):
+    """
+    Console with a filter bar on top. Filtering is done on the console's line index
+    and the matches are shown in a second console that replaces the full one while a filter is active.
+    """
+    stream_filters = [
+        ("All", None),
+        ("Errors", [console_index.ERROR]),
+        ("Input", [console_index.INPUT]),
+        ("Output", [console_index.OUTPUT]),
+        ("Output + Errors", [console_index.OUTPUT, console_index.ERROR]),
+    ]
+    max_filtered_lines = 20000
+
+    def __init__(self, script_output, parent=None):
+        super(ScriptConsoleUI, self).__init__(parent)
+        self.script_output = script_output  # type: ScriptConsoleOutputUI
+
+        main_layout = QtWidgets.QVBoxLayout()
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.setSpacing(2)
+
+        filter_layout = QtWidgets.QHBoxLayout()
+        filter_layout.setContentsMargins(2, 2, 2, 0)
+        self.stream_combo_box = QtWidgets.QComboBox()
+        for filter_name, _ in self.stream_filters:
+            self.stream_combo_box.addItem(filter_name)
+        filter_layout.addWidget(self.stream_combo_box)
+
+        self.last_run_check_box = QtWidgets.QCheckBox("Last Run")
+        filter_layout.addWidget(self.last_run_check_box)
+
+        self.pattern_line_edit = QtWidgets.QLineEdit()
+        self.pattern_line_edit.setPlaceholderText("Filter (regex)")
+        self.pattern_line_edit.setClearButtonEnabled(True)
+        filter_layout.addWidget(self.pattern_line_edit)
+
+        self.match_count_label = QtWidgets.QLabel()
+        filter_layout.addWidget(self.match_count_label)
+        main_layout.addLayout(filter_layout)
+
+        self.filtered_output = ScriptConsoleOutputUI(self)
+        self.filtered_output.setFont(self.script_output.font())
+        self.filtered_output.setMaximumBlockCount(self.max_filtered_lines)  # appending drops the oldest ones
+        self.filtered_output.hide()
+        main_layout.addWidget(self.script_output)
+        main_layout.addWidget(self.filtered_output)
+        self.setLayout(main_layout)
+
+        # typing in the filter and output coming in both go through a short delay, so bursts only filter once
+        self.filter_timer = QtCore.QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+        self.filter_timer.timeout.connect(self.apply_filter)
+
+        self.stream_combo_box.currentIndexChanged.connect(self.apply_filter)
+        self.last_run_check_box.toggled.connect(self.apply_filter)
+        self.pattern_line_edit.textChanged.connect(self.filter_timer.start)
+        self.script_output.lines_written.connect(self._output_changed)
+
+        # while the filter stays the same, only lines written after these get filtered and appended
+        self.shown_filter_key = None
+        self.filtered_line_count = 0
+        self.match_count = 0
+
+    def is_filtered(self):
+        return bool(self.stream_filters[self.stream_combo_box.currentIndex()][1]
+                    or self.last_run_check_box.isChecked()
+                    or self.pattern_line_edit.text())
+
+    def _output_changed(self):
+        if self.is_filtered() and not self.filter_timer.isActive():
+            self.filter_timer.start()
+
+    def apply_filter(self):
+        if not self.is_filtered():
+            self.shown_filter_key = None
+            self.filtered_output.hide()
+            self.script_output.show()
+            self.match_count_label.clear()
+            return
+
+        line_index = self.script_output.line_index
+        streams = self.stream_filters[self.stream_combo_box.currentIndex()][1]
+        run_id = line_index.current_run_id if self.last_run_check_box.isChecked() else None
+
+        pattern = None
+        pattern_text = self.pattern_line_edit.text()
+        if pattern_text:
+            try:
+                pattern = re.compile(pattern_text, re.IGNORECASE)
+            except re.error as e:
+                self.shown_filter_key = None
+                self.match_count_label.setText("Invalid regex: {}".format(e))
+                return
+
+        filter_key = (line_index.generation, streams, run_id, pattern_text)
+        if filter_key == self.shown_filter_key:
+            start_line = self.filtered_line_count  # same filter as what's shown, only the new lines
+        else:
+            start_line = 0
+            self.match_count = 0
+            self.filtered_output.clear()
+        self.shown_filter_key = filter_key
+        self.filtered_line_count = len(line_index)
+
+        line_numbers = line_index.filter(streams=streams, run_id=run_id, pattern=pattern, start_line=start_line)
+        self.match_count += len(line_numbers)
+
+        self.match_count_label.setText("{} lines".format(self.match_count))
+        if self.match_count > self.max_filtered_lines:
+            self.match_count_label.setText("{} lines (showing last {})".format(self.match_count,
+                                                                              self.max_filtered_lines))
+        if line_numbers:
+            self.filtered_output.write_indexed_lines(line_numbers[-self.max_filtered_lines:], line_index)
+        self.filtered_output.verticalScrollBar().setValue(self.filtered_output.verticalScrollBar().maximum())
+
+        self.script_output.hide()
+        self.filtered_output.show()
+
+
+def format_duration(seconds):
+    if seconds < 1:
+        return "{:.0f}ms".format(seconds * 1000)
+    if seconds < 60:
+        return "{:.1f}s".format(seconds)
+    return "{:.0f}m{:02.0f}s".format(*divmod(seconds, 60))
+
 
 class PythonObjectCompleter(QtWidgets.QCompleter):
     insert_text = QtCore.Signal(str)
+    remote_completions_ready = QtCore.Signal(int, list)  # request number, completions
+
+    remote_timeout = 2.0  # seconds
 
     def __init__(self, parent=None):
         super(PythonObjectCompleter, self).__init__(["yeahh", "boiiii"], parent)  # if this shows up, that means trouble
@@ -93,6 +319,9 @@ class PythonObjectCompleter(QtWidgets.QCompleter):
         self.popup().setStyleSheet(lk.tool_qt_stylesheet)
 
         self.last_selected = None
+        self.remote_pool = None  # type: command_port.ConnectionPool
+        self.remote_request_count = 0
+        self.namespace = dict()  # globals of the namespace the script runs in
         self.setCompletionMode(QtWidgets.QCompleter.UnfilteredPopupCompletion)
         self.highlighted.connect(self.set_highlighted)
 
@@ -107,6 +336,16 @@ class PythonObjectCompleter(QtWidgets.QCompleter):
         self.filter_model.setFilterFixedString(self.filter_text)
         self.setModel(self.filter_model)
 
+        # one completer gets shared by all tabs, the text goes to whichever one it's currently attached to
+        self.setMaxVisibleItems(20)
+        self.insert_text.connect(self.insert_into_widget)
+        self.remote_completions_ready.connect(self.set_remote_completions)
+
+    def insert_into_widget(self, text):
+        widget = self.widget()
+        if widget is not None:
+            widget.insert_completion(text)
+
     def set_highlighted(self, text):
         self.last_selected = text
 
@@ -118,12 +357,16 @@ class PythonObjectCompleter(QtWidgets.QCompleter):
         Analyse a string and get the dir() of the python object (so we can fill autocomplete list)
 
         :param text:
-        :return:
+        :return: False if the list gets filled in later, when a remote host replies
         """
+        if self.remote_pool is not None:
+            self.request_remote_completions(text)
+            return False
+
         found_obj_names = lk.obj_name_re.findall(text)  # strip ( and find everything after special characters
         if not found_obj_names:
             log.warning("regex failed on: {}".format(text))
-            return
+            return True
 
         selected_obj_full_name = "".join(found_obj_names)
 
@@ -131,25 +374,60 @@ class PythonObjectCompleter(QtWidgets.QCompleter):
 
         selected_obj_base = dot_split[0]  # get first part before the .
 
-        selected_obj = globals().get(selected_obj_base)  # get python obj from globals()
+        selected_obj = self.namespace.get(selected_obj_base)  # get python obj from the script namespace
 
         if selected_obj:
             if selected_obj_full_name.endswith("."):
                 selected_obj_full_name = selected_obj_full_name.rstrip(".")
 
-            completion_list = dir(eval(selected_obj_full_name))  # this doesn't feel very safe
+            completion_list = dir(eval(selected_obj_full_name, self.namespace))  # this doesn't feel very safe
 
             self.item_model.setStringList(completion_list)
+        return True
 
     def set_filter(self, filter_text):
         self.filter_model.setFilterFixedString(filter_text)
         self.filter_text = filter_text
 
     def reset_completion_list(self):
+        """
+        :return: False if the list gets filled in later, when a remote host replies
+        """
+        if self.remote_pool is not None:
+            self.request_remote_completions("")
+            return False
+
         completion_list = []
-        completion_list.extend(globals())
+        completion_list.extend(self.namespace)
         completion_list.extend(dir(builtins))
         self.item_model.setStringList(completion_list)
+        return True
+
+    def request_remote_completions(self, text):
+        """
+        Ask the remote host in the background, the popup shows up once it replies
+        """
+        self.remote_request_count += 1
+        _remote_completion_executor.submit(self._get_remote_completions, self.remote_pool, self.remote_request_count,
+                                           text)
+
+    def _get_remote_completions(self, pool, request_number, text):
+        if request_number != self.remote_request_count:
+            return  # typed on while this was waiting, a newer request is queued
+        try:
+            completions = pool.complete(text, timeout=self.remote_timeout)
+        except (OSError, command_port.CommandPortError) as e:
+            log.warning("Remote completion failed on {}: {}".format(pool.name, e))
+            completions = []
+        self.remote_completions_ready.emit(request_number, completions)
+
+    def set_remote_completions(self, request_number, completions):
+        if request_number != self.remote_request_count or self.remote_pool is None:
+            return
+        self.item_model.setStringList(completions)
+        widget = self.widget()
+        if completions and widget is not None and widget.hasFocus():
+            widget.show_completion_popup()
 
 
 class LineNumberArea(QtWidgets.QWidget):
@@ -170,17 +448,36 @@ class LineNumberArea(QtWidgets.QWidget):
 
 
 class PythonScriptTextEdit(QtWidgets.QPlainTextEdit):
-    def __init__(self, file_path="", parent=None):
+    diagnostics_ready = QtCore.Signal(int, list)  # document revision, [syntax_checker.Diagnostic]
+
+    diagnostics_delay = 500  # ms after the last key press
+    max_diagnostic_selections = 200
+    marker_width = 8
+    heat_color = QtGui.QColor(255, 110, 40)
+    cell_state_colors = {
+        cells.DONE: QtGui.QColor(120, 220, 120),
+        cells.FAILED: QtGui.QColor(255, 100, 100),
+        cells.CHANGED: QtGui.QColor(230, 190, 80),
+    }
+    diagnostic_colors = {
+        syntax_checker.ERROR: QtGui.QColor(255, 100, 100),
+        syntax_checker.WARNING: QtGui.QColor(230, 190, 80),
+    }
+
+    def __init__(self, file_path="", completer=None, parent=None):
         super(PythonScriptTextEdit, self).__init__(parent)
 
         self.dock_widget = None  # type: QtWidgets.QDockWidget
         self.script_file_path = file_path
         self.script_name = os.path.basename(file_path) if file_path else "UNDEFINED"
+        self.namespace_scope = namespaces.SHARED
+        self.session_name = None
+        self.tab_key = id(self)  # what the tab namespace is stored under, outlives the editor if it's in a dock
+        self.namespace = dict()  # globals of the namespace the script runs in
+        self.disk_text = None  # what the file had when it was last loaded or saved, to tell external changes apart
 
-        self.completer = PythonObjectCompleter()
+        self.completer = completer if completer is not None else PythonObjectCompleter()
         self.completer.setWidget(self)
-        self.completer.setMaxVisibleItems(20)
-        self.completer.insert_text.connect(self.insert_completion)
 
         self.line_number_area = LineNumberArea(self)
 
@@ -189,6 +486,29 @@ class PythonScriptTextEdit(QtWidgets.QPlainTextEdit):
         self.cursorPositionChanged.connect(self.highlight_current_line)
         self.textChanged.connect(self.mark_unsaved_changes)
 
+        self.syntax_checker = syntax_checker.SyntaxChecker()
+        self.diagnostics = list()  # type: list[syntax_checker.Diagnostic]
+        self.diagnostic_lines = dict()  # line number: severity, for the gutter
+        self.diagnostic_selections = list()
+        self.diagnostics_timer = QtCore.QTimer(self)
+        self.diagnostics_timer.setSingleShot(True)
+        self.diagnostics_timer.setInterval(self.diagnostics_delay)
+        self.diagnostics_timer.timeout.connect(self.request_diagnostics)
+        self.textChanged.connect(self.diagnostics_timer.start)
+        self.diagnostics_ready.connect(self.set_diagnostics)
+
+        self.line_timings = None  # type: line_timer.LineTimings
+        self.line_timing_lines = dict()  # line number: (fraction of the hottest line, text), for the gutter
+        self.line_timing_width = 0
+        self.blockCountChanged.connect(self.clear_line_timings)  # lines moved, the numbers don't match anymore
+
+        self.cell_tracker = cells.CellTracker()
+        self.cells = list()  # type: list[cells.Cell]
+        self.cell_state_lines = dict()  # line number: cell state, for the gutter
+        self.cell_timing_lines = dict()  # first line of a cell: text
+        self.cell_timing_width = 0
+        self.diagnostics_timer.timeout.connect(self.update_cells)
+
         self.update_line_number_area_width(0)
 
     # -------------------------------------------
@@ -201,9 +521,11 @@ class PythonScriptTextEdit(QtWidgets.QPlainTextEdit):
             if not file_path:
                 return
 
+        text = self.toPlainText()
         with open(file_path, "w") as fp:
-            fp.write(self.toPlainText())
+            fp.write(text)
 
+        self.disk_text = text
         self.set_active_script_path(file_path)
         return True
 
@@ -216,11 +538,83 @@ class PythonScriptTextEdit(QtWidgets.QPlainTextEdit):
                     return
 
         with open(file_path, "r") as fp:
-            self.setPlainText(fp.read())
+            text = fp.read()
+        self.setPlainText(text)
 
+        self.disk_text = text
         self.set_active_script_path(file_path)
         return True
 
+    def read_script_file(self):
+        with open(self.script_file_path, "r") as fp:
+            return fp.read()
+
+    def reload_script(self):
+        """
+        Read the file again and apply only what changed, see apply_script_text()
+        """
+        if not self.script_file_path:
+            return
+        self.apply_script_text(self.read_script_file())
+        return True
+
+    def apply_script_text(self, text):
+        """
+        Replace the text as one undo step that only touches the lines that differ.
+        Cursor and scroll position stay on the same code, and the highlighter only redoes the changed blocks.
+
+        :param text: new contents of the file
+        :return: whether anything changed
+        """
+        changes = text_diff.get_line_changes(self.toPlainText().split("\n"), text.split("\n"))
+        if changes:
+            # the top of the view follows the line it's on, same as the text cursor does
+            top_cursor = QtGui.QTextCursor(self.firstVisibleBlock())
+            horizontal_scroll = self.horizontalScrollBar().value()
+
+            cursor = QtGui.QTextCursor(self.document())
+            cursor.beginEditBlock()
+            for change in reversed(changes):  # from the bottom up, so the line numbers above stay valid
+                self._replace_lines(cursor, change)
+            cursor.endEditBlock()
+
+            self.verticalScrollBar().setValue(top_cursor.block().blockNumber())
+            self.horizontalScrollBar().setValue(horizontal_scroll)
+
+        self.disk_text = text
+        self.set_active_script_path(self.script_file_path)  # it matches the file again, drop the *
+        return bool(changes)
+
+    def _replace_lines(self, cursor, change):
+        """
+        :param cursor: QTextCursor to edit with
+        :param change: text_diff.LineChange, lines are blocks of the document
+        """
+        document = self.document()
+        block_count = document.blockCount()
+        document_end = document.characterCount() - 1  # there's always an invisible paragraph separator at the end
+
+        if change.end < block_count:
+            # lines in the middle, every line keeps its own newline
+            start = document.findBlockByNumber(change.start).position()
+            end = document.findBlockByNumber(change.end).position()
+            new_text = "".join(line + "\n" for line in change.lines)
+        elif change.start < block_count:
+            # up to the end of the document, there's no newline after the last line
+            start = document.findBlockByNumber(change.start).position()
+            end = document_end
+            new_text = "\n".join(change.lines)
+            if not change.lines and change.start > 0:
+                start -= 1  # removing the last lines takes the newline before them too
+        else:
+            # new lines after the last one
+            start = end = document_end
+            new_text = "".join("\n" + line for line in change.lines)
+
+        cursor.setPosition(start)
+        cursor.setPosition(end, QtGui.QTextCursor.KeepAnchor)
+        cursor.insertText(new_text)
+
     def set_active_script_path(self, file_path):
         script_name = os.path.basename(file_path)
         self.set_dock_tab_name(script_name)
@@ -236,6 +630,153 @@ class PythonScriptTextEdit(QtWidgets.QPlainTextEdit):
     def set_dock_tab_name(self, name):
         self.dock_widget.setWindowTitle(name)
 
+    def has_unsaved_changes(self):
+        return self.dock_widget.windowTitle().endswith("*")
+
+    def set_namespace(self, namespace_globals):
+        self.namespace = namespace_globals
+        if self.completer.widget() is self:
+            self.completer.namespace = namespace_globals
+
+    # -------------------------------------------------------------------
+    # Diagnostics
+    def request_diagnostics(self):
+        """
+        Check the script on the syntax check thread, the result comes back through diagnostics_ready
+        """
+        revision = self.document().revision()
+        future = _syntax_check_executor.submit(
+            self.syntax_checker.check, self.toPlainText(), list(self.namespace))
+
+        def emit_result(done_future):
+            try:
+                self.diagnostics_ready.emit(revision, done_future.result())
+            except RuntimeError:
+                pass  # tab got closed while checking
+
+        future.add_done_callback(emit_result)
+
+    def set_diagnostics(self, revision, diagnostics):
+        if revision != self.document().revision():
+            return  # text changed since, the timer will ask again
+
+        self.diagnostics = diagnostics
+        self.diagnostic_lines = dict()
+        for diagnostic in diagnostics:
+            if self.diagnostic_lines.get(diagnostic.line) != syntax_checker.ERROR:
+                self.diagnostic_lines[diagnostic.line] = diagnostic.severity
+
+        document = self.document()
+        self.diagnostic_selections = list()
+        for diagnostic in diagnostics[:self.max_diagnostic_selections]:
+            block = document.findBlockByNumber(diagnostic.line)
+            if not block.isValid():
+                continue
+
+            selection = QtWidgets.QTextEdit.ExtraSelection()
+            selection.format.setUnderlineStyle(QtGui.QTextCharFormat.WaveUnderline)
+            selection.format.setUnderlineColor(self.diagnostic_colors[diagnostic.severity])
+            selection.cursor = QtGui.QTextCursor(block)
+            col = min(diagnostic.col, block.length() - 1)
+            selection.cursor.setPosition(block.position() + col)
+            if diagnostic.length:
+                length = min(diagnostic.length, block.length() - 1 - col)
+                selection.cursor.movePosition(QtGui.QTextCursor.Right, QtGui.QTextCursor.KeepAnchor, max(length, 1))
+            else:
+                selection.cursor.movePosition(QtGui.QTextCursor.EndOfBlock, QtGui.QTextCursor.KeepAnchor)
+            self.diagnostic_selections.append(selection)
+
+        self.highlight_current_line()
+        self.line_number_area.update()
+
+    def get_diagnostics_for_line(self, line):
+        return [d for d in self.diagnostics if d.line == line]
+
+    def event(self, event):
+        if event.type() == QtCore.QEvent.ToolTip and self.diagnostics:
+            viewport_pos = self.viewport().mapFromGlobal(event.globalPos())
+            line = self.cursorForPosition(viewport_pos).blockNumber()
+            line_diagnostics = self.get_diagnostics_for_line(line)
+            if line_diagnostics:
+                QtWidgets.QToolTip.showText(event.globalPos(), "\n".join(d.message for d in line_diagnostics), self)
+            else:
+                QtWidgets.QToolTip.hideText()
+            return True
+        return super(PythonScriptTextEdit, self).event(event)
+
+    # -------------------------------------------------------------------
+    # Line timing
+    def set_line_timings(self, timings, first_line=0):
+        """
+        :param timings: line_timer.LineTimings
+        :param first_line: block number the timed code started at, if only a selection ran
+        """
+        self.line_timings = timings
+        max_time = timings.max_time or 1.0
+
+        # work out everything the gutter needs here, painting only has to look it up
+        self.line_timing_lines = dict()
+        text_width = 0
+        font_metrics = self.fontMetrics()
+        for line, hits in timings.hits.items():
+            line_time = timings.times.get(line, 0.0)
+            text = "{}x {:.1f}ms".format(hits, line_time * 1000)
+            self.line_timing_lines[first_line + line - 1] = (line_time / max_time, text)
+            text_width = max(text_width, font_metrics.width(text))
+        self.line_timing_width = text_width + 8 if self.line_timing_lines else 0
+
+        self.update_line_number_area_width(0)
+        self.update_line_number_area_geometry()
+        self.line_number_area.update()
+
+    def clear_line_timings(self, *args):
+        if self.line_timings is None:
+            return
+        self.line_timings = None
+        self.line_timing_lines = dict()
+        self.line_timing_width = 0
+        self.update_line_number_area_width(0)
+        self.update_line_number_area_geometry()
+        self.line_number_area.update()
+
+    # -------------------------------------------------------------------
+    # Cells
+    def update_cells(self):
+        """
+        Split the script into cells again and work out what the gutter shows for each of them
+        """
+        text = self.toPlainText()
+        self.cells = cells.split_cells(text)
+        has_markers = any(cell.has_marker for cell in self.cells)  # no point in showing one big cell
+
+        self.cell_state_lines = dict()
+        self.cell_timing_lines = dict()
+        text_width = 0
+        font_metrics = self.fontMetrics()
+        for cell in self.cells if has_markers else []:
+            state, cell_run = self.cell_tracker.get_state(cell)
+            if cell_run is None:
+                continue
+            for line in range(cell.start_line, cell.end_line):
+                self.cell_state_lines[line] = state
+            text = format_duration(cell_run.duration)
+            self.cell_timing_lines[cell.start_line] = text
+            text_width = max(text_width, font_metrics.width(text))
+
+        cell_timing_width = text_width + 6 if self.cell_timing_lines else 0
+        if cell_timing_width != self.cell_timing_width:
+            self.cell_timing_width = cell_timing_width
+            self.update_line_number_area_width(0)
+            self.update_line_number_area_geometry()
+        self.line_number_area.update()
+
+    def get_current_cell(self):
+        """
+        :rtype: cells.Cell
+        """
+        self.cells = cells.split_cells(self.toPlainText())
+        return cells.get_cell_at_line(self.cells, self.textCursor().blockNumber())
+
     # -------------------------------------------------------------------
     # UI things
     def line_number_area_width(self):
@@ -244,7 +785,8 @@ class PythonScriptTextEdit(QtWidgets.QPlainTextEdit):
         while count >= 10:
             count /= 10
             digits += 1
-        space = 3 + self.fontMetrics().width('9') * digits
+        space = 3 + self.line_timing_width + self.cell_timing_width + self.marker_width + \
+            self.fontMetrics().width('9') * digits
         return space
 
     def update_line_number_area_width(self, _):
@@ -261,6 +803,9 @@ class PythonScriptTextEdit(QtWidgets.QPlainTextEdit):
 
     def resizeEvent(self, event):
         super(PythonScriptTextEdit, self).resizeEvent(event)
+        self.update_line_number_area_geometry()
+
+    def update_line_number_area_geometry(self):
         cr = self.contentsRect()
         self.line_number_area.setGeometry(
             QtCore.QRect(cr.left(), cr.top(), self.line_number_area_width() + 10, cr.height()))
@@ -276,12 +821,41 @@ class PythonScriptTextEdit(QtWidgets.QPlainTextEdit):
 
         # Just to make sure I use the right font
         height = self.fontMetrics().height()
+        heat_color = QtGui.QColor(self.heat_color)
+        marker_x = self.line_timing_width + self.cell_timing_width
         while block.isValid() and (top <= event.rect().bottom()):
             if block.isVisible() and (bottom >= event.rect().top()):
                 number = str(block_number + 1)
                 my_painter.setPen(QtCore.Qt.lightGray)
                 my_painter.drawText(-7, top, self.line_number_area.width(), height, QtCore.Qt.AlignRight, number)
 
+                line_timing = self.line_timing_lines.get(block_number)
+                if line_timing is not None:
+                    fraction, text = line_timing
+                    heat_color.setAlpha(40 + int(160 * fraction))
+                    my_painter.fillRect(0, int(top), max(int(self.line_timing_width * fraction), 2), int(height),
+                                        heat_color)
+                    my_painter.setPen(QtCore.Qt.white if fraction > 0.5 else QtCore.Qt.gray)
+                    my_painter.drawText(2, top, self.line_timing_width - 4, height, QtCore.Qt.AlignLeft, text)
+
+                cell_state = self.cell_state_lines.get(block_number)
+                if cell_state is not None:
+                    cell_color = self.cell_state_colors[cell_state]
+                    my_painter.fillRect(marker_x, int(top), 2, int(bottom - top), cell_color)
+                    cell_timing = self.cell_timing_lines.get(block_number)
+                    if cell_timing is not None:
+                        my_painter.setPen(cell_color)
+                        my_painter.drawText(self.line_timing_width + 2, top, self.cell_timing_width - 4, height,
+                                            QtCore.Qt.AlignLeft, cell_timing)
+
+                severity = self.diagnostic_lines.get(block_number)
+                if severity is not None:
+                    my_painter.setPen(QtCore.Qt.NoPen)
+                    my_painter.setBrush(self.diagnostic_colors[severity])
+                    marker_size = min(self.marker_width - 2, height)
+                    my_painter.drawEllipse(marker_x + 2, int(top + (height - marker_size) / 2),
+                                           marker_size, marker_size)
+
             block = block.next()
             top = bottom
             bottom = top + self.blockBoundingRect(block).height()
@@ -301,7 +875,7 @@ class PythonScriptTextEdit(QtWidgets.QPlainTextEdit):
             selection.cursor = self.textCursor()
             selection.cursor.clearSelection()
             extra_selections.append(selection)
-        self.setExtraSelections(extra_selections)
+        self.setExtraSelections(extra_selections + self.diagnostic_selections)
 
     def insert_completion(self, completion):
         tc = self.textCursor()
@@ -317,6 +891,7 @@ class PythonScriptTextEdit(QtWidgets.QPlainTextEdit):
     def focusInEvent(self, event):
         if self.completer:
             self.completer.setWidget(self)
+            self.completer.namespace = self.namespace
         super(PythonScriptTextEdit, self).focusInEvent(event)
 
     def keyPressEvent(self, event):
@@ -446,8 +1021,6 @@ class PythonScriptTextEdit(QtWidgets.QPlainTextEdit):
         ctrl_space_pressed = key_event == key_list.Key_Space and modifiers == QtCore.Qt.ControlModifier
 
         if key_event == key_list.Key_Period or ctrl_space_pressed:
-            popup = self.completer.popup()
-
             tc.movePosition(QtGui.QTextCursor.Left)
             tc.movePosition(QtGui.QTextCursor.Right, QtGui.QTextCursor.KeepAnchor)
             last_character = tc.selectedText()
@@ -457,32 +1030,436 @@ class PythonScriptTextEdit(QtWidgets.QPlainTextEdit):
 
             self.completer.set_filter("")
             if last_character == "." and current_line_text:
-                self.completer.complete_text(current_line_text)
+                completions_ready = self.completer.complete_text(current_line_text)
             else:
-                self.completer.reset_completion_list()
+                completions_ready = self.completer.reset_completion_list()
                 if current_line_text:
                     self.completer.set_filter(current_line_text)
 
-            popup.setCurrentIndex(self.completer.completionModel().index(0, 0))
+            if completions_ready:
+                self.show_completion_popup()
+
+    def show_completion_popup(self):
+        popup = self.completer.popup()
+        popup.setCurrentIndex(self.completer.completionModel().index(0, 0))
+
+        cr = self.cursorRect()
+        cr.setWidth(popup.sizeHintForColumn(0) + popup.verticalScrollBar().sizeHint().width())
+        self.completer.complete(cr)
+
+
+class ScriptTabDock(QtWidgets.QDockWidget):
+    """
+    Dock for one script tab
+
+    Starts out as a placeholder that only knows the path and a few settings. The editor (with its
+    highlighter and the file contents) gets built the first time the tab is shown, and can be
+    released back to a placeholder when the tab hasn't been looked at for a while.
+    """
+    editor_created = QtCore.Signal(object)  # PythonScriptTextEdit
+
+    def __init__(self, file_path=None, completer=None, parent=None):
+        super(ScriptTabDock, self).__init__(parent)
+        self.completer = completer  # type: PythonObjectCompleter
+        self.editor = None  # type: PythonScriptTextEdit
+        self.last_visible = time.monotonic()
+
+        # what's needed to build the editor again
+        self.file_path = file_path
+        self.script_name = os.path.basename(file_path) if file_path else "Python"
+        self.namespace_scope = namespaces.SHARED
+        self.session_name = None
+        self.text = None  # only kept for unsaved changes, otherwise the file gets read again
+        self.cell_tracker = cells.CellTracker()  # what ran is still true after the editor gets released
+        self.title = self.script_name
+        self.cursor_position = 0
+        self.scroll_position = 0
+
+        self.setWindowTitle(self.title)
+        self.setWidget(QtWidgets.QWidget())
+        self.visibilityChanged.connect(self._visibility_changed)
+
+    @property
+    def tab_key(self):
+        return id(self)
+
+    def get_file_path(self):
+        if self.editor is not None:
+            return self.editor.script_file_path or None
+        return self.file_path
+
+    def _visibility_changed(self, visible):
+        self.last_visible = time.monotonic()
+        if visible:
+            self.materialize()
+
+    def materialize(self):
+        """
+        :return: the editor, built if it isn't there yet
+        :rtype: PythonScriptTextEdit
+        """
+        if self.editor is not None:
+            return self.editor
+
+        editor = PythonScriptTextEdit(file_path=self.file_path or "", completer=self.completer)
+        editor.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+        editor.setWordWrapMode(QtGui.QTextOption.NoWrap)
+        editor.dock_widget = self
+        editor.tab_key = self.tab_key
+        editor.cell_tracker = self.cell_tracker
+        editor.namespace_scope = self.namespace_scope
+        editor.session_name = self.session_name
+
+        # syntax highlight
+        python_syntax_highlight.PythonHighlighter(editor.document())
+
+        if self.text is not None:
+            editor.setPlainText(self.text)
+            editor.script_file_path = self.file_path or ""
+            editor.script_name = self.script_name
+        elif self.file_path:
+            editor.load_script(self.file_path)
+        else:
+            editor.script_name = self.script_name
+        self.setWindowTitle(self.title)  # loading the text marks it as changed
+
+        cursor = editor.textCursor()
+        cursor.setPosition(min(self.cursor_position, len(editor.toPlainText())))
+        editor.setTextCursor(cursor)
+        editor.verticalScrollBar().setValue(self.scroll_position)
+
+        self.text = None
+        self.editor = editor
+        placeholder = self.widget()
+        self.setWidget(editor)
+        placeholder.deleteLater()
+        self.editor_created.emit(editor)
+        return editor
+
+    def sync_from_editor(self):
+        if self.editor is None:
+            return
+        self.file_path = self.editor.script_file_path or None
+        self.script_name = self.editor.script_name
+        self.namespace_scope = self.editor.namespace_scope
+        self.session_name = self.editor.session_name
+        self.title = self.windowTitle()
+        self.cursor_position = self.editor.textCursor().position()
+        self.scroll_position = self.editor.verticalScrollBar().value()
+
+    def release(self):
+        """
+        Drop the editor and keep just enough to build it again
+        """
+        if self.editor is None:
+            return
+        self.sync_from_editor()
+        editor = self.editor
+        if editor.has_unsaved_changes() or not self.file_path:
+            self.text = editor.toPlainText()
+
+        if self.completer.widget() is editor:
+            self.completer.popup().hide()
+        self.editor = None
+        self.setWidget(QtWidgets.QWidget())
+        editor.deleteLater()
+
+
+class ScriptTreeItem(object):
+    def __init__(self, path, name, is_dir, parent=None, row=0):
+        self.path = path
+        self.name = name
+        self.is_dir = is_dir
+        self.parent = parent
+        self.row = row
+        self.children = list()  # type: list[ScriptTreeItem]
+        self.populated = False  # children have been filled in from a listing
+
+    @property
+    def key(self):
+        return self.name, self.is_dir
+
+
+class ScriptTreeModel(QtCore.QAbstractItemModel):
+    """
+    Script folder as a tree, built from the listings of a script_index.ScriptIndex
+
+    Folders get filled in from the cached listing when they're expanded and updated in place when the
+    background check finds a change, so expanded folders and the selection stay as they are.
+    """
+    listing_changed = QtCore.Signal(str)  # emitted from the index's worker threads
+
+    cache_save_delay = 2000  # ms after the last change
+
+    def __init__(self, cache_dir, parent=None):
+        super(ScriptTreeModel, self).__init__(parent)
+        self.cache_dir = cache_dir
+        self.script_index = None  # type: script_index.ScriptIndex
+        self.patterns = script_index.compile_patterns("*.py")
+        self.tree_root = ScriptTreeItem("", "", True)
+        self.root_item = self.tree_root  # the tree, or the flat list of search results while filtering
+        self.folder_items = dict()  # path: ScriptTreeItem of every folder in the tree
+        self.filter_text = ""
+
+        icon_provider = QtWidgets.QFileIconProvider()  # per file icons can mean a round trip to the network share
+        self.folder_icon = icon_provider.icon(QtWidgets.QFileIconProvider.Folder)
+        self.file_icon = icon_provider.icon(QtWidgets.QFileIconProvider.File)
+
+        self.listing_changed.connect(self.update_folder)
+
+        self.cache_save_timer = QtCore.QTimer(self)
+        self.cache_save_timer.setSingleShot(True)
+        self.cache_save_timer.setInterval(self.cache_save_delay)
+        self.cache_save_timer.timeout.connect(self.save_cache)
+
+    def set_root_path(self, root_path):
+        self.close()
+        cache_name = hashlib.sha1(script_index.normalize_path(root_path).encode("utf-8")).hexdigest()
+        self.script_index = script_index.ScriptIndex(
+            root_path,
+            cache_path=os.path.join(self.cache_dir, "{}.json".format(cache_name)),
+            on_listing=self.listing_changed.emit,
+        )
+        self.script_index.load_cache()  # shows what was there last time until the check below catches up
+        self.rebuild()
+        self.script_index.refresh()
+
+    def set_patterns(self, patterns):
+        """
+        :param patterns: ';' separated fnmatch patterns of the files to show
+        """
+        self.patterns = script_index.compile_patterns(patterns)
+        if self.script_index is not None:
+            self.rebuild()
+
+    def refresh(self):
+        if self.script_index is not None:
+            self.script_index.refresh()
+
+    def rebuild(self):
+        self.beginResetModel()
+        self.tree_root = ScriptTreeItem(self.script_index.root_path, "", True)
+        self.folder_items = {self.tree_root.path: self.tree_root}
+        self._fill_folder(self.tree_root)
+        self.root_item = self.tree_root
+        if self.filter_text:
+            self.root_item = self._build_search_results()
+        self.endResetModel()
+
+    def close(self):
+        if self.script_index is None:
+            return
+        self.cache_save_timer.stop()
+        self.script_index.close()
+        if self.script_index.dirty:
+            self.script_index.save_cache()
+        self.script_index = None
+
+    def save_cache(self):
+        if self.script_index is None or not self.script_index.dirty:
+            return
+        if self.script_index.is_busy:
+            self.cache_save_timer.start()  # wait for the whole check to finish instead of writing it over and over
+            return
+        self.script_index.save_cache()
+
+    # -------------------------------------------------------------------
+    # filtering
+    def set_filter_text(self, text):
+        """
+        Show the files whose path contains all words of text as a flat list, or the tree again if it's empty
+        """
+        self.filter_text = text.strip()
+        self.beginResetModel()
+        self.root_item = self._build_search_results() if self.filter_text else self.tree_root
+        self.endResetModel()
+
+    def _build_search_results(self):
+        root_item = ScriptTreeItem(self.tree_root.path, "", True)
+        root_item.populated = True
+        root_length = len(self.tree_root.path.rstrip("/")) + 1
+        for file_path in self.script_index.search(self.filter_text, self.patterns):
+            root_item.children.append(
+                ScriptTreeItem(file_path, file_path[root_length:], False, root_item, len(root_item.children)))
+        return root_item
+
+    # -------------------------------------------------------------------
+    # updates from the index
+    def update_folder(self, path):
+        if self.script_index is None:
+            return
+        item = self.folder_items.get(path)
+        if item is not None and item.populated:
+            self._fill_folder(item, notify=self.root_item is self.tree_root)
+        self.cache_save_timer.start()
+
+    def _fill_folder(self, item, notify=False):
+        """
+        Bring the children of a folder item in line with its listing
+
+        :param notify: tell the views, only when the item is in the tree they show
+        """
+        item.populated = True
+        listing = self.script_index.get_listing(item.path)
+        if listing is None:
+            self.script_index.refresh(item.path, recursive=False)  # not listed yet, shows up through listing_changed
+            entries = []
+        else:
+            entries = [(name, is_dir) for name, is_dir in listing.entries if is_dir or self.patterns.match(name)]
+
+        parent_index = self.index_for_item(item) if notify else None
+        # same minimal diff as external script changes, so rows that are still there keep their state
+        for change in reversed(text_diff.get_line_changes([child.key for child in item.children], entries)):
+            if change.end > change.start:
+                if notify:
+                    self.beginRemoveRows(parent_index, change.start, change.end - 1)
+                for child in item.children[change.start:change.end]:
+                    self._forget_folder(child)
+                del item.children[change.start:change.end]
+                self._update_rows(item)
+                if notify:
+                    self.endRemoveRows()
+            if change.lines:
+                if notify:
+                    self.beginInsertRows(parent_index, change.start, change.start + len(change.lines) - 1)
+                new_children = list()
+                for name, is_dir in change.lines:
+                    child = ScriptTreeItem(script_index.join_path(item.path, name), name, is_dir, item)
+                    if is_dir:
+                        self.folder_items[child.path] = child
+                    new_children.append(child)
+                item.children[change.start:change.start] = new_children
+                self._update_rows(item)
+                if notify:
+                    self.endInsertRows()
+
+    def _forget_folder(self, item):
+        if not item.is_dir:
+            return
+        self.folder_items.pop(item.path, None)
+        for child in item.children:
+            self._forget_folder(child)
+
+    @staticmethod
+    def _update_rows(item):
+        for row, child in enumerate(item.children):
+            child.row = row
+
+    # -------------------------------------------------------------------
+    # QAbstractItemModel
+    def get_item(self, index):
+        """
+        :rtype: ScriptTreeItem
+        """
+        if index.isValid():
+            return index.internalPointer()
+        return self.root_item
+
+    def index_for_item(self, item):
+        if item is self.root_item or item.parent is None:
+            return QtCore.QModelIndex()
+        return self.createIndex(item.row, 0, item)
+
+    def index_for_path(self, path):
+        """
+        :return: index of the item with that path, filling in the folders on the way. Invalid if it isn't there,
+                 or if it isn't one of the search results while filtering.
+        """
+        if self.root_item is not self.tree_root:
+            # the flat list of search results is what the view shows, rows in the tree would point at hidden items
+            for child in self.root_item.children:
+                if child.path == path:
+                    return self.index_for_item(child)
+            return QtCore.QModelIndex()
+
+        root_path = self.root_item.path.rstrip("/")
+        if not path.startswith(root_path + "/"):
+            return QtCore.QModelIndex()
+
+        item = self.root_item
+        for name in path[len(root_path) + 1:].split("/"):
+            if item.is_dir and not item.populated:
+                self._fill_folder(item, notify=True)
+            for child in item.children:
+                if child.name == name:
+                    item = child
+                    break
+            else:
+                return QtCore.QModelIndex()
+        return self.index_for_item(item)
 
-            cr = self.cursorRect()
-            cr.setWidth(popup.sizeHintForColumn(0) + popup.verticalScrollBar().sizeHint().width())
-            self.completer.complete(cr)
+    def filePath(self, index):
+        """
+        Same as QFileSystemModel.filePath()
+        """
+        if not index.isValid():
+            return ""
+        return self.get_item(index).path
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column, self.get_item(parent).children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        parent_item = self.get_item(index).parent
+        if parent_item is None or parent_item is self.root_item:
+            return QtCore.QModelIndex()
+        return self.createIndex(parent_item.row, 0, parent_item)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.get_item(parent).children)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        item = self.get_item(parent)
+        return item.is_dir and (not item.populated or bool(item.children))
+
+    def canFetchMore(self, parent):
+        item = self.get_item(parent)
+        return item.is_dir and not item.populated
+
+    def fetchMore(self, parent):
+        self._fill_folder(self.get_item(parent), notify=True)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.get_item(index)
+        if role == QtCore.Qt.DisplayRole:
+            return item.name
+        if role == QtCore.Qt.DecorationRole:
+            return self.folder_icon if item.is_dir else self.file_icon
+        if role == QtCore.Qt.ToolTipRole:
+            return item.path
+        return None
 
 
 class ScriptTree(QtWidgets.QWidget):
     file_path_double_clicked = QtCore.Signal(str)
+    run_external_requested = QtCore.Signal(str)
+    batch_run_requested = QtCore.Signal(list)
 
     def __init__(self, parent=None):
         super(ScriptTree, self).__init__(parent)
 
         self._settings = ScriptEditorSettings()
+        self.expanded_paths = set()  # to expand them again after the tree gets rebuilt
 
         main_layout = QtWidgets.QVBoxLayout()
         main_layout.setContentsMargins(4, 4, 4, 4)
         main_layout.setSpacing(2)
 
-        self.file_model = QtWidgets.QFileSystemModel()
+        self.file_model = ScriptTreeModel(os.path.join(os.path.dirname(self._settings.fileName()), "script_tree_cache"))
+        self.file_model.set_patterns(self.get_file_patterns())
+        self.file_model.modelReset.connect(self.restore_expanded_folders)
+        self.file_model.listing_changed.connect(self._listing_changed)
 
         folder_path_layout = QtWidgets.QHBoxLayout()
         self.folder_path_line_edit = QtWidgets.QLineEdit()
@@ -493,11 +1470,31 @@ class ScriptTree(QtWidgets.QWidget):
         folder_path_layout.addWidget(self.folder_path_browse_button)
         main_layout.addLayout(folder_path_layout)
 
+        self.filter_line_edit = QtWidgets.QLineEdit()
+        self.filter_line_edit.setPlaceholderText("Filter scripts...")
+        self.filter_line_edit.setClearButtonEnabled(True)
+        main_layout.addWidget(self.filter_line_edit)
+
+        self.filter_timer = QtCore.QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.filter_line_edit.textChanged.connect(self.filter_timer.start)
+        self.filter_line_edit.returnPressed.connect(self._filter_return_pressed)
+
+        # new listings come in bursts while the folder is being checked, don't redo the search for each
+        self.filter_refresh_timer = QtCore.QTimer(self)
+        self.filter_refresh_timer.setSingleShot(True)
+        self.filter_refresh_timer.setInterval(1000)
+        self.filter_refresh_timer.timeout.connect(self.apply_filter)
+
         self.tree_view = QtWidgets.QTreeView()
         self.tree_view.setModel(self.file_model)
         self.tree_view.setHeaderHidden(True)
-        for i in range(1, self.tree_view.model().columnCount()):
-            self.tree_view.header().hideSection(i)
+        self.tree_view.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.tree_view.setUniformRowHeights(True)
+        self.tree_view.expanded.connect(self._folder_expanded)
+        self.tree_view.collapsed.connect(self._folder_collapsed)
         main_layout.addWidget(self.tree_view)
 
         folder_path = self._settings.value(ScriptEditorSettings.k_folder_path)
@@ -515,7 +1512,13 @@ class ScriptTree(QtWidgets.QWidget):
         actions = list()
         # actions.append({"Run Script": self.run_script})
         actions.append({"Show in Explorer": self.open_path_in_explorer})
+        if os.path.isfile(self.get_current_selected_file_path()):
+            actions.append({"Run in External Interpreter": self._run_external_requested})
+        actions.append({"Batch Run Active Script...": self._batch_run_requested})
         # actions.append({"Open Backup Folder": self.open_backup_folder})
+        actions.append("-")
+        actions.append({"Refresh": self.file_model.refresh})
+        actions.append({"Set File Patterns...": self.set_file_patterns})
 
         menu = self.build_context_menu(actions)
         menu.exec_(self.tree_view.viewport().mapToGlobal(position))
@@ -536,10 +1539,57 @@ class ScriptTree(QtWidgets.QWidget):
 
     def set_folder_path(self, folder_path):
         self.folder_path_line_edit.setText(folder_path)
-        self.file_model.setRootPath(folder_path)
-        self.tree_view.setRootIndex(self.file_model.index(folder_path))
+        self.expanded_paths.clear()
+        self.file_model.set_root_path(folder_path)
         self._settings.setValue(ScriptEditorSettings.k_folder_path, folder_path)
 
+    def get_file_patterns(self):
+        return self._settings.value(ScriptEditorSettings.k_script_tree_file_patterns) or "*.py"
+
+    def set_file_patterns(self):
+        patterns, ok = QtWidgets.QInputDialog.getText(
+            self, "Script Tree", "Show files matching (separated by ;)", text=self.get_file_patterns())
+        if not ok:
+            return
+        self._settings.setValue(ScriptEditorSettings.k_script_tree_file_patterns, patterns)
+        self.file_model.set_patterns(patterns)
+
+    def apply_filter(self):
+        self.filter_refresh_timer.stop()
+        self.file_model.set_filter_text(self.filter_line_edit.text())
+        if self.file_model.filter_text and self.file_model.rowCount():
+            self.tree_view.setCurrentIndex(self.file_model.index(0, 0))
+
+    def _filter_return_pressed(self):
+        self.apply_filter()
+        self._path_double_clicked(self.tree_view.currentIndex())
+
+    def _listing_changed(self, path):
+        if self.file_model.filter_text and not self.filter_refresh_timer.isActive():
+            self.filter_refresh_timer.start()
+
+    def _folder_expanded(self, index):
+        if not self.file_model.filter_text:
+            self.expanded_paths.add(self.file_model.filePath(index))
+
+    def _folder_collapsed(self, index):
+        if not self.file_model.filter_text:
+            self.expanded_paths.discard(self.file_model.filePath(index))
+
+    def restore_expanded_folders(self):
+        if self.file_model.filter_text:
+            return
+        for path in sorted(self.expanded_paths, key=len):  # parents first
+            index = self.file_model.index_for_path(path)
+            if index.isValid():
+                self.tree_view.expand(index)
+
+    def close_index(self):
+        """
+        Stop checking the folder and save what's been listed so far
+        """
+        self.file_model.close()
+
     def get_folder_path(self):
         return self.folder_path_line_edit.text()
 
@@ -553,6 +1603,12 @@ class ScriptTree(QtWidgets.QWidget):
         if os.path.isfile(path):
             self.file_path_double_clicked.emit(path)
 
+    def _run_external_requested(self):
+        self.run_external_requested.emit(self.get_current_selected_file_path())
+
+    def _batch_run_requested(self):
+        self.batch_run_requested.emit(self.get_selected_file_paths())
+
     def get_file_path_from_index(self, index):
         return self.file_model.filePath(index).replace("\\", "/")
 
@@ -560,6 +1616,12 @@ class ScriptTree(QtWidgets.QWidget):
         index = self.tree_view.currentIndex()
         return self.get_file_path_from_index(index)
 
+    def get_selected_file_paths(self):
+        indexes = self.tree_view.selectionModel().selectedRows()
+        if not indexes:
+            return [self.get_current_selected_file_path()]
+        return [self.get_file_path_from_index(index) for index in indexes]
+
     def open_path_in_explorer(self, file_path=None):
         if not file_path:
             file_path = self.get_current_selected_file_path()
@@ -580,6 +1642,580 @@ class ScriptTree(QtWidgets.QWidget):
             log.warning("Attempt to open path in explorer failed")
 
 
+class RemoteExecutionRunner(QtCore.QObject):
+    """
+    Runs code on a command port host in a background thread and hands the output back to the GUI thread
+    """
+    output_received = QtCore.Signal(str, str)  # stream, text
+    finished = QtCore.Signal(str, dict, object)  # host name, done message, context passed to execute
+    ping_finished = QtCore.Signal(str, float, str)  # host name, round trip in seconds, error or empty
+
+    def execute(self, pool, source, context=None):
+        thread = threading.Thread(target=self._execute, args=(pool, source, context), daemon=True)
+        thread.start()
+
+    def _execute(self, pool, source, context):
+        try:
+            reply = pool.execute(source, on_output=self.output_received.emit, timeout=None)
+        except (OSError, command_port.CommandPortError) as e:
+            self.output_received.emit("stderr", "Remote execution on {} failed: {}\n".format(pool.name, e))
+            reply = {"ok": False}
+        self.finished.emit(pool.name, reply, context)
+
+    def ping(self, pool):
+        thread = threading.Thread(target=self._ping, args=(pool,), daemon=True)
+        thread.start()
+
+    def _ping(self, pool):
+        try:
+            self.ping_finished.emit(pool.name, pool.ping(), "")
+        except (OSError, command_port.CommandPortError) as e:
+            self.ping_finished.emit(pool.name, 0.0, str(e))
+
+
+class HistoryPaletteUI(QtWidgets.QDialog):
+    """
+    Search through everything that has been run, and insert or re-run it
+    """
+    insert_requested = QtCore.Signal(str)
+    run_requested = QtCore.Signal(str)
+
+    def __init__(self, history, parent=None):
+        super(HistoryPaletteUI, self).__init__(parent)
+        self.history = history  # type: execution_history.ExecutionHistory
+        self.entries = list()  # type: list[execution_history.HistoryEntry]
+
+        self.setWindowTitle("Execution History")
+        self.resize(800, 500)
+
+        main_layout = QtWidgets.QVBoxLayout()
+        self.search_line_edit = QtWidgets.QLineEdit()
+        self.search_line_edit.setPlaceholderText("Search code, tab name or file path")
+        self.search_line_edit.setClearButtonEnabled(True)
+        main_layout.addWidget(self.search_line_edit)
+
+        splitter = QtWidgets.QSplitter(QtCore.Qt.Vertical)
+        self.results_tree = QtWidgets.QTreeWidget()
+        self.results_tree.setHeaderLabels(["Time", "Tab", "Status", "Duration", "Code"])
+        self.results_tree.setRootIsDecorated(False)
+        self.results_tree.setUniformRowHeights(True)
+        self.results_tree.currentItemChanged.connect(self.show_preview)
+        self.results_tree.itemDoubleClicked.connect(self.insert_selected)
+        splitter.addWidget(self.results_tree)
+
+        self.preview = QtWidgets.QPlainTextEdit()
+        self.preview.setReadOnly(True)
+        self.preview.setWordWrapMode(QtGui.QTextOption.NoWrap)
+        self.preview.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+        python_syntax_highlight.PythonHighlighter(self.preview.document())
+        splitter.addWidget(self.preview)
+        main_layout.addWidget(splitter)
+
+        button_layout = QtWidgets.QHBoxLayout()
+        self.status_label = QtWidgets.QLabel()
+        button_layout.addWidget(self.status_label)
+        button_layout.addStretch()
+        insert_button = QtWidgets.QPushButton("Insert")
+        insert_button.clicked.connect(self.insert_selected)
+        button_layout.addWidget(insert_button)
+        run_button = QtWidgets.QPushButton("Run")
+        run_button.clicked.connect(self.run_selected)
+        button_layout.addWidget(run_button)
+        main_layout.addLayout(button_layout)
+        self.setLayout(main_layout)
+
+        QtWidgets.QShortcut(QtGui.QKeySequence("CTRL+RETURN"), self, self.run_selected)
+
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(100)
+        self.search_timer.timeout.connect(self.search)
+        self.search_line_edit.textChanged.connect(self.search_timer.start)
+
+    def showEvent(self, event):
+        super(HistoryPaletteUI, self).showEvent(event)
+        self.search_line_edit.setFocus()
+        self.search_line_edit.selectAll()
+        self.search()
+
+    def keyPressEvent(self, event):
+        # arrow keys in the search box move through the results
+        if event.key() in (key_list.Key_Up, key_list.Key_Down) and self.search_line_edit.hasFocus():
+            QtWidgets.QApplication.sendEvent(self.results_tree, event)
+            return
+        if event.key() == key_list.Key_Return and not event.modifiers():
+            self.insert_selected()
+            return
+        super(HistoryPaletteUI, self).keyPressEvent(event)
+
+    def search(self):
+        start_time = time.perf_counter()
+        self.entries = self.history.search(self.search_line_edit.text())
+        duration = time.perf_counter() - start_time
+
+        self.results_tree.clear()
+        items = list()
+        for entry in self.entries:
+            items.append(QtWidgets.QTreeWidgetItem([
+                datetime.datetime.fromtimestamp(entry.timestamp).strftime("%Y-%m-%d %H:%M:%S"),
+                entry.tab_name or "",
+                "ok" if entry.success else "failed",
+                "{:.1f}ms".format(entry.duration * 1000) if entry.duration is not None else "",
+                entry.first_line,
+            ]))
+        self.results_tree.addTopLevelItems(items)
+        if items:
+            self.results_tree.setCurrentItem(items[0])
+        else:
+            self.preview.clear()
+        self.status_label.setText("{} results ({:.1f}ms)".format(len(items), duration * 1000))
+
+    def get_selected_entry(self):
+        item = self.results_tree.currentItem()
+        if item is None:
+            return None
+        return self.entries[self.results_tree.indexOfTopLevelItem(item)]
+
+    def show_preview(self, item, previous_item=None):
+        entry = self.get_selected_entry()
+        self.preview.setPlainText(entry.code if entry else "")
+
+    def insert_selected(self):
+        entry = self.get_selected_entry()
+        if entry is not None:
+            self.insert_requested.emit(entry.code)
+            self.accept()
+
+    def run_selected(self):
+        entry = self.get_selected_entry()
+        if entry is not None:
+            self.run_requested.emit(entry.code)
+
+
+class ExternalRunOutputUI(QtWidgets.QWidget):
+    """
+    Output of a script running in an external interpreter, with buttons to kill and re-run it
+    """
+
+    def __init__(self, run, source=None, parent=None):
+        super(ExternalRunOutputUI, self).__init__(parent)
+        self.run = run  # type: external_runner.ExternalScriptRun
+        self.source = source  # ("tab", tab key) or ("file", path) the run came from, its output gets re-used for it
+        self.dock_widget = None  # type: QtWidgets.QDockWidget
+
+        main_layout = QtWidgets.QVBoxLayout()
+        main_layout.setContentsMargins(2, 2, 2, 2)
+        main_layout.setSpacing(2)
+
+        button_layout = QtWidgets.QHBoxLayout()
+        self.status_label = QtWidgets.QLabel()
+        button_layout.addWidget(self.status_label)
+        button_layout.addStretch()
+        self.rerun_button = QtWidgets.QPushButton("Re-Run")
+        self.rerun_button.clicked.connect(lambda: self.rerun())  # clicked would pass checked as script_text
+        button_layout.addWidget(self.rerun_button)
+        self.kill_button = QtWidgets.QPushButton("Kill")
+        self.kill_button.clicked.connect(self.run.kill)
+        button_layout.addWidget(self.kill_button)
+        main_layout.addLayout(button_layout)
+
+        self.output = ScriptConsoleOutputUI(self)
+        self.output.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+        main_layout.addWidget(self.output)
+        self.setLayout(main_layout)
+
+        self.run.lines_received.connect(self.write_lines)
+        self.run.started.connect(self.run_started)
+        self.run.finished.connect(self.run_finished)
+
+    def write_lines(self, stream, lines):
+        text = "\n".join(lines)
+        if stream == "stderr":
+            self.output.write_error(text)
+        else:
+            self.output.write(text)
+
+    def rerun(self, script_text=None):
+        if self.run.is_running():
+            return
+        if script_text is not None:
+            self.run.update_script_text(script_text)
+        self.output.clear()
+        self.run.start()
+
+    def run_started(self):
+        self.status_label.setText("Running: {} ({})".format(self.run.name, self.run.python_executable))
+        self.rerun_button.setEnabled(False)
+        self.kill_button.setEnabled(True)
+        self.dock_widget.setWindowTitle("{} (running)".format(self.run.name))
+
+    def run_finished(self, exit_code, duration):
+        self.status_label.setText("Finished: {} (exit code {}, {:.2f}s)".format(self.run.name, exit_code, duration))
+        self.rerun_button.setEnabled(True)
+        self.kill_button.setEnabled(False)
+        self.dock_widget.setWindowTitle("{} ({})".format(self.run.name, exit_code))
+
+
+class BatchRunUI(QtWidgets.QWidget):
+    """
+    Progress of a batch run, with status, time and output per file
+    """
+    item_changed = QtCore.Signal(object)
+    batch_finished = QtCore.Signal()
+
+    status_colors = {
+        batch_runner.PENDING: QtGui.QColor("gray"),
+        batch_runner.RUNNING: QtGui.QColor(160, 180, 255),
+        batch_runner.DONE: QtGui.QColor(120, 220, 120),
+        batch_runner.FAILED: QtGui.QColor(255, 100, 100),
+        batch_runner.CANCELLED: QtGui.QColor(255, 180, 80),
+    }
+    finished_statuses = (batch_runner.DONE, batch_runner.FAILED, batch_runner.CANCELLED)
+
+    def __init__(self, script_text, file_paths, python_executable, worker_count, name="batch", summary_dir=None,
+                 parent=None):
+        super(BatchRunUI, self).__init__(parent)
+        self.dock_widget = None  # type: QtWidgets.QDockWidget
+
+        # callbacks come in from the worker threads, the signals bring them over to the GUI thread
+        self.batch_run = batch_runner.BatchRun(
+            script_text,
+            file_paths,
+            python_executable,
+            worker_count=worker_count,
+            on_item_changed=self.item_changed.emit,
+            on_finished=self.batch_finished.emit,
+            name=name,
+            summary_dir=summary_dir,
+        )
+        self.item_changed.connect(self.update_item)
+        self.batch_finished.connect(self.run_finished)
+
+        main_layout = QtWidgets.QVBoxLayout()
+        main_layout.setContentsMargins(2, 2, 2, 2)
+        main_layout.setSpacing(2)
+
+        button_layout = QtWidgets.QHBoxLayout()
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, len(self.batch_run.items))
+        button_layout.addWidget(self.progress_bar)
+        self.retry_button = QtWidgets.QPushButton("Retry Failed")
+        self.retry_button.clicked.connect(self.retry_failed)
+        button_layout.addWidget(self.retry_button)
+        self.cancel_button = QtWidgets.QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.batch_run.cancel)
+        button_layout.addWidget(self.cancel_button)
+        self.save_summary_button = QtWidgets.QPushButton("Save Summary...")
+        self.save_summary_button.clicked.connect(self.save_summary)
+        button_layout.addWidget(self.save_summary_button)
+        main_layout.addLayout(button_layout)
+
+        splitter = QtWidgets.QSplitter(QtCore.Qt.Vertical)
+        self.item_tree = QtWidgets.QTreeWidget()
+        self.item_tree.setHeaderLabels(["File", "Status", "Time", "Attempts"])
+        self.item_tree.setRootIsDecorated(False)
+        self.item_tree.setUniformRowHeights(True)
+        self.item_tree.currentItemChanged.connect(self.show_item_output)
+        splitter.addWidget(self.item_tree)
+
+        self.item_output = ScriptConsoleOutputUI(self)
+        self.item_output.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+        splitter.addWidget(self.item_output)
+        main_layout.addWidget(splitter)
+        self.setLayout(main_layout)
+
+        self.item_statuses = [batch_runner.PENDING] * len(self.batch_run.items)
+        self.finished_count = 0
+        self.tree_items = list()
+        for batch_item in self.batch_run.items:
+            tree_item = QtWidgets.QTreeWidgetItem([batch_item.file_path, batch_item.status, "", ""])
+            self.tree_items.append(tree_item)
+        self.item_tree.addTopLevelItems(self.tree_items)
+        self.item_tree.resizeColumnToContents(0)
+
+    def start(self):
+        self.retry_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.batch_run.start()
+
+    def retry_failed(self):
+        self.retry_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.batch_run.retry_failed()
+
+    def update_item(self, batch_item):
+        tree_item = self.tree_items[batch_item.index]
+        tree_item.setText(1, batch_item.status)
+        tree_item.setForeground(1, QtGui.QBrush(self.status_colors[batch_item.status]))
+        if batch_item.status not in (batch_runner.PENDING, batch_runner.RUNNING):
+            tree_item.setText(2, "{:.2f}s".format(batch_item.duration))
+        tree_item.setText(3, str(batch_item.attempts))
+
+        if self.item_tree.currentItem() is tree_item:
+            self.show_item_output(tree_item)
+
+        # keep the count up to date from the status changes instead of walking all items every time
+        previous_status = self.item_statuses[batch_item.index]
+        self.item_statuses[batch_item.index] = batch_item.status
+        self.finished_count += (batch_item.status in self.finished_statuses) - (previous_status in self.finished_statuses)
+        finished_count = self.finished_count
+        self.progress_bar.setValue(finished_count)
+        self.dock_widget.setWindowTitle("{} ({}/{})".format(self.batch_run.name, finished_count, len(self.tree_items)))
+
+    def show_item_output(self, tree_item, previous_item=None):
+        if tree_item is None:
+            return
+        batch_item = self.batch_run.items[self.item_tree.indexOfTopLevelItem(tree_item)]
+        self.item_output.clear()
+        self.item_output.write(batch_item.output)
+        if batch_item.result is not None:
+            self.item_output.write_input("batch_result = {!r}".format(batch_item.result))
+
+    def run_finished(self):
+        counts = self.batch_run.counts()
+        self.retry_button.setEnabled(bool(counts[batch_runner.FAILED] or counts[batch_runner.CANCELLED]))
+        self.cancel_button.setEnabled(False)
+        self.progress_bar.setFormat("{} done, {} failed, {} cancelled".format(
+            counts[batch_runner.DONE], counts[batch_runner.FAILED], counts[batch_runner.CANCELLED]))
+        if self.batch_run.summary_path:
+            self.progress_bar.setToolTip("Summary: {}".format(self.batch_run.summary_path))
+
+    def save_summary(self):
+        file_path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save Batch Summary", filter="*.json")
+        if file_path:
+            self.batch_run.write_summary(file_path)
+
+
+class MemoryTrackerUI(QtWidgets.QWidget):
+    """
+    What every run left behind in memory: types that grew and the lines that allocated what's still alive
+    """
+
+    def __init__(self, tracker, parent=None):
+        super(MemoryTrackerUI, self).__init__(parent)
+        self.tracker = tracker  # type: memory_tracker.MemoryTracker
+        self.dock_widget = None  # type: QtWidgets.QDockWidget
+        self.shown_reports = list()  # type: list[memory_tracker.RunMemoryReport]
+
+        main_layout = QtWidgets.QVBoxLayout()
+        main_layout.setContentsMargins(2, 2, 2, 2)
+        main_layout.setSpacing(2)
+
+        button_layout = QtWidgets.QHBoxLayout()
+        self.enabled_checkbox = QtWidgets.QCheckBox("Track Memory")
+        self.enabled_checkbox.setToolTip("Counts objects and traces allocations around every run.\n"
+                                         "Runs are slower while this is on, allocations from before it was "
+                                         "turned on aren't traced.")
+        self.enabled_checkbox.toggled.connect(self.tracker.set_enabled)
+        button_layout.addWidget(self.enabled_checkbox)
+        button_layout.addStretch()
+        button_layout.addWidget(QtWidgets.QLabel("Compare Last"))
+        self.compare_count_spinbox = QtWidgets.QSpinBox()
+        self.compare_count_spinbox.setRange(2, self.tracker.reports.maxlen)
+        self.compare_count_spinbox.setValue(5)
+        self.compare_count_spinbox.setSuffix(" runs")
+        button_layout.addWidget(self.compare_count_spinbox)
+        compare_button = QtWidgets.QPushButton("Compare")
+        compare_button.clicked.connect(self.compare_runs)
+        button_layout.addWidget(compare_button)
+        clear_button = QtWidgets.QPushButton("Clear")
+        clear_button.clicked.connect(self.clear)
+        button_layout.addWidget(clear_button)
+        main_layout.addLayout(button_layout)
+
+        splitter = QtWidgets.QSplitter(QtCore.Qt.Vertical)
+        self.run_tree = QtWidgets.QTreeWidget()
+        self.run_tree.setHeaderLabels(["Run", "Time", "Traced", "Objects", "New Variables", "Overhead"])
+        self.run_tree.setRootIsDecorated(False)
+        self.run_tree.setUniformRowHeights(True)
+        self.run_tree.currentItemChanged.connect(self.show_selected_report)
+        splitter.addWidget(self.run_tree)
+
+        self.type_tree = QtWidgets.QTreeWidget()
+        self.type_tree.setHeaderLabels(["Type", "Growth", "Count"])
+        self.type_tree.setRootIsDecorated(False)
+        self.type_tree.setUniformRowHeights(True)
+        splitter.addWidget(self.type_tree)
+
+        self.allocation_tree = QtWidgets.QTreeWidget()
+        self.allocation_tree.setHeaderLabels(["Size", "Blocks", "Location", "Source"])
+        self.allocation_tree.setRootIsDecorated(False)
+        self.allocation_tree.setUniformRowHeights(True)
+        splitter.addWidget(self.allocation_tree)
+        main_layout.addWidget(splitter)
+        self.setLayout(main_layout)
+
+    def add_report(self, report):
+        """
+        :param report: memory_tracker.RunMemoryReport
+        """
+        self.shown_reports.append(report)
+        tree_item = QtWidgets.QTreeWidgetItem([
+            report.label,
+            datetime.datetime.fromtimestamp(report.timestamp).strftime("%H:%M:%S"),
+            "{}{}".format("+" if report.traced_growth > 0 else "-", namespaces.format_size(abs(report.traced_growth))),
+            "{:+d}".format(sum(growth.growth for growth in report.type_growth)),
+            ", ".join(report.new_variables),
+            "{:.0f}ms".format(report.overhead * 1000),
+        ])
+        self.run_tree.addTopLevelItem(tree_item)
+        self.run_tree.setCurrentItem(tree_item)
+
+    def show_selected_report(self, tree_item, previous_item=None):
+        if tree_item is None:
+            return
+        self.show_report(self.shown_reports[self.run_tree.indexOfTopLevelItem(tree_item)])
+
+    def show_report(self, report):
+        self.type_tree.clear()
+        self.type_tree.addTopLevelItems([
+            QtWidgets.QTreeWidgetItem([growth.type_name, "{:+d}".format(growth.growth), str(growth.count)])
+            for growth in report.type_growth
+        ])
+        self.type_tree.resizeColumnToContents(0)
+
+        self.allocation_tree.clear()
+        self.allocation_tree.addTopLevelItems([
+            QtWidgets.QTreeWidgetItem([namespaces.format_size(allocation.size), "{:+d}".format(allocation.count),
+                                       allocation.location, allocation.source_line])
+            for allocation in report.allocations
+        ])
+        self.allocation_tree.resizeColumnToContents(2)
+
+    def compare_runs(self):
+        report = self.tracker.compare(self.compare_count_spinbox.value())
+        if report is None:
+            return
+        self.add_report(report)
+
+    def clear(self):
+        self.tracker.clear()
+        self.shown_reports = list()
+        self.run_tree.clear()
+        self.type_tree.clear()
+        self.allocation_tree.clear()
+
+
+class AsyncTasksUI(QtWidgets.QWidget):
+    """
+    Tasks on the editor's event loop, the ones still running and the last ones that finished
+    """
+    refresh_interval = 500  # ms, only while it's visible
+    state_colors = {
+        async_tasks.RUNNING: QtGui.QColor(120, 180, 255),
+        async_tasks.FAILED: QtGui.QColor(255, 100, 100),
+        async_tasks.CANCELLED: QtGui.QColor(150, 150, 150),
+    }
+
+    def __init__(self, driver, parent=None):
+        super(AsyncTasksUI, self).__init__(parent)
+        self.driver = driver  # type: async_tasks.EventLoopDriver
+        self.dock_widget = None  # type: QtWidgets.QDockWidget
+        self.shown_tasks = list()
+
+        main_layout = QtWidgets.QVBoxLayout()
+        main_layout.setContentsMargins(2, 2, 2, 2)
+        main_layout.setSpacing(2)
+
+        button_layout = QtWidgets.QHBoxLayout()
+        self.count_label = QtWidgets.QLabel()
+        button_layout.addWidget(self.count_label)
+        button_layout.addStretch()
+        cancel_button = QtWidgets.QPushButton("Cancel Selected")
+        cancel_button.clicked.connect(self.cancel_selected)
+        button_layout.addWidget(cancel_button)
+        cancel_all_button = QtWidgets.QPushButton("Cancel All")
+        cancel_all_button.clicked.connect(self.cancel_all)
+        button_layout.addWidget(cancel_all_button)
+        clear_button = QtWidgets.QPushButton("Clear Finished")
+        clear_button.clicked.connect(self.clear_finished)
+        button_layout.addWidget(clear_button)
+        main_layout.addLayout(button_layout)
+
+        self.task_tree = QtWidgets.QTreeWidget()
+        self.task_tree.setHeaderLabels(["Task", "State", "From", "Duration", "Waiting At"])
+        self.task_tree.setRootIsDecorated(False)
+        self.task_tree.setUniformRowHeights(True)
+        self.task_tree.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.task_tree.itemDoubleClicked.connect(self.show_task_details)
+        main_layout.addWidget(self.task_tree)
+        self.setLayout(main_layout)
+
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.setInterval(self.refresh_interval)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super(AsyncTasksUI, self).showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        super(AsyncTasksUI, self).hideEvent(event)
+        self.refresh_timer.stop()
+
+    def refresh(self):
+        selected_tasks = set(self.get_selected_tasks())
+        scroll_position = self.task_tree.verticalScrollBar().value()
+        self.shown_tasks = self.driver.get_tasks()
+        now = time.time()
+
+        self.task_tree.clear()
+        running_count = 0
+        for task in self.shown_tasks:
+            info = self.driver.get_info(task)
+            state = async_tasks.get_task_state(task)
+            running_count += state == async_tasks.RUNNING
+            tree_item = QtWidgets.QTreeWidgetItem([
+                async_tasks.get_task_name(task),
+                state,
+                info.origin,
+                format_duration((info.finished or now) - info.started),
+                async_tasks.get_task_location(task),
+            ])
+            if state in self.state_colors:
+                tree_item.setForeground(1, self.state_colors[state])
+            self.task_tree.addTopLevelItem(tree_item)
+            tree_item.setSelected(task in selected_tasks)
+        self.task_tree.resizeColumnToContents(0)
+        self.task_tree.verticalScrollBar().setValue(scroll_position)
+        self.count_label.setText("{} running, {} finished".format(running_count,
+                                                                   len(self.shown_tasks) - running_count))
+
+    def get_selected_tasks(self):
+        return [self.shown_tasks[self.task_tree.indexOfTopLevelItem(tree_item)]
+                for tree_item in self.task_tree.selectedItems()]
+
+    def show_task_details(self, tree_item, column=0):
+        task = self.shown_tasks[self.task_tree.indexOfTopLevelItem(tree_item)]
+        state = async_tasks.get_task_state(task)
+        if state == async_tasks.RUNNING:
+            details = io.StringIO()
+            task.print_stack(file=details)
+            text = details.getvalue()
+        elif state == async_tasks.FAILED:
+            exception = task.exception()
+            text = "".join(traceback.format_exception(type(exception), exception, exception.__traceback__))
+        elif state == async_tasks.DONE:
+            text = "{}\n\n{}".format(result_renderer.summarize(task.result()), reprlib.repr(task.result()))
+        else:
+            text = "Cancelled"
+        QtWidgets.QMessageBox.information(self, async_tasks.get_task_name(task), text)
+
+    def cancel_selected(self):
+        for task in self.get_selected_tasks():
+            task.cancel()
+        self.refresh()
+
+    def cancel_all(self):
+        self.driver.cancel_all()
+        self.refresh()
+
+    def clear_finished(self):
+        self.driver.clear_finished()
+        self.refresh()
+
+
 class LiveScriptEditorWindowUI(QtWidgets.QWidget):
     def __init__(self, parent=None):
         super(LiveScriptEditorWindowUI, self).__init__(parent)
@@ -592,7 +2228,8 @@ class LiveScriptEditorWindowUI(QtWidgets.QWidget):
 
         self.script_output_dock = QtWidgets.QDockWidget()
         self.script_output_dock.setWindowTitle("Output")
-        self.script_output_dock.setWidget(self.script_output)
+        self.script_console = ScriptConsoleUI(self.script_output)
+        self.script_output_dock.setWidget(self.script_console)
         # self.script_output_dock.setAllowedAreas(QtCore.Qt.LeftDockWidgetArea | QtCore.Qt.RightDockWidgetArea)
 
         self.script_tree = ScriptTree()
@@ -603,6 +2240,10 @@ class LiveScriptEditorWindowUI(QtWidgets.QWidget):
 
 
 class LiveScriptEditorWindow(QtWidgets.QMainWindow):
+    output_captured = QtCore.Signal()  # emitted from other threads, brings the drain over to the GUI thread
+
+    async_io_check_interval = 50  # ms, how often the event loop looks for i/o while it has no timer due sooner
+
     def __init__(self, parent=None):
         super(LiveScriptEditorWindow, self).__init__(parent)
         self.setWindowTitle("Live Script Editor")
@@ -611,12 +2252,55 @@ class LiveScriptEditorWindow(QtWidgets.QMainWindow):
 
         self._settings = ScriptEditorSettings()
 
-        self.script_docks = list()
+        self.script_docks = list()  # type: list[ScriptTabDock]
+        self.completer = PythonObjectCompleter(self)  # shared by all tabs
         self.recently_closed_scripts = list()
+        self.external_run_widgets = list()  # type: list[ExternalRunOutputUI]
+        self.tab_numbers = dict()  # tab key: number in the file name its code gets compiled with
+        self.batch_run_widgets = list()  # type: list[BatchRunUI]
+        self.module_reloader = None  # type: module_reloader.ModuleReloader
+        self.history_palette = None  # type: HistoryPaletteUI
+
+        history_path = os.path.join(os.path.dirname(self._settings.fileName()), "execution_history.sqlite")
+        try:
+            self.execution_history = execution_history.ExecutionHistory(history_path)
+        except sqlite3.Error as e:
+            log.warning("Execution history disabled, failed to open {}: {}".format(history_path, e))
+            self.execution_history = None
+        self.memory_tracker = memory_tracker.MemoryTracker()
+        self.memory_tracker_widget = None  # type: MemoryTrackerUI
+
+        self.remote_pools = dict()  # type: dict[str, command_port.ConnectionPool]
+        self.active_remote_pool = None  # type: command_port.ConnectionPool
+
+        # asyncio runs on the GUI thread, stepped by a timer while it has something to do
+        self.async_driver = async_tasks.EventLoopDriver(on_error=self.write_async_error)
+        self.async_timer = QtCore.QTimer(self)
+        self.async_timer.timeout.connect(self.pump_event_loop)
+        self.async_tasks_widget = None  # type: AsyncTasksUI
+        self.waiting_run_task = None  # task of the run that is waiting for its top level await
+        self.namespaces = namespaces.NamespaceManager(coroutine_runner=self.run_coroutine)
 
         self.ui = LiveScriptEditorWindowUI(self)
+        self.get_module_reloader()  # start tracking mtimes from here
+        self.result_renderer = result_renderer.ResultRenderer(self.ui.script_output.write)
+        self.output_capture = output_capture.OutputCapture(
+            self.write_captured_output,
+            wakeup=self.output_captured.emit,
+            capture_fds=str(self._settings.value(ScriptEditorSettings.k_capture_native_output, False)).lower() == "true",
+        )
+        self.output_captured.connect(self.output_capture.drain)
+
+        # editors save in all sorts of ways, wait for the writes to settle before reading the file
+        self.file_watcher = QtCore.QFileSystemWatcher(self)
+        self.file_watcher.fileChanged.connect(self.watched_file_changed)
+        self.changed_file_paths = set()
+        self.file_change_timer = QtCore.QTimer(self)
+        self.file_change_timer.setSingleShot(True)
+        self.file_change_timer.setInterval(300)
+        self.file_change_timer.timeout.connect(self.reload_changed_files)
         # self.add_script_tab(file_path=__file__)
-        self.add_script_tab()
+        self.restore_open_scripts()
 
         self.reset_layout()
 
@@ -643,18 +2327,93 @@ class LiveScriptEditorWindow(QtWidgets.QMainWindow):
         file_menu.addAction("Re-Open Recent Script", self.reopen_recently_closed, QtGui.QKeySequence("CTRL+SHIFT+T"))
         file_menu.addAction("Reload Script", self.reload_script, QtGui.QKeySequence("CTRL+R"))
         file_menu.addAction("Close Script", self.close_current_tab, QtGui.QKeySequence("CTRL+W"))
+        file_menu.addAction("Set Idle Tab Release Time...", self.set_release_idle_tabs_minutes)
         file_menu.addSeparator()
         file_menu.addAction("Run Script", self.run_script, QtGui.QKeySequence("CTRL+RETURN"))
+        file_menu.addAction("Run with Line Timing", self.run_script_with_line_timing,
+                            QtGui.QKeySequence("CTRL+ALT+RETURN"))
+        file_menu.addAction("Run in External Interpreter", lambda: self.run_script_external(),
+                            QtGui.QKeySequence("CTRL+SHIFT+RETURN"))
+        file_menu.addAction("Set External Python Executable...", self.set_python_executable)
+        file_menu.addAction("Set Batch Worker Count...", self.set_batch_worker_count)
+        file_menu.addSeparator()
+        file_menu.addAction("Reload Changed Modules", self.reload_changed_modules, QtGui.QKeySequence("CTRL+SHIFT+R"))
+        self.auto_reload_modules_action = file_menu.addAction("Auto Reload Modules Before Run")
+        self.auto_reload_modules_action.setCheckable(True)
+        self.auto_reload_modules_action.setChecked(
+            str(self._settings.value(ScriptEditorSettings.k_auto_reload_modules, False)).lower() == "true")
+        self.auto_reload_modules_action.toggled.connect(
+            lambda checked: self._settings.setValue(ScriptEditorSettings.k_auto_reload_modules, checked))
 
         edit_menu = self.menuBar().addMenu("Edit")
         edit_menu.setTearOffEnabled(True)
-        edit_menu.addAction("Clear History", self.ui.script_output.clear, QtGui.QKeySequence("CTRL+SHIFT+D"))
+        edit_menu.addAction("Clear History", self.clear_history, QtGui.QKeySequence("CTRL+SHIFT+D"))
+        edit_menu.addAction("Execution History...", self.show_history_palette, QtGui.QKeySequence("CTRL+SHIFT+H"))
+        capture_native_action = edit_menu.addAction("Capture Native Output")
+        capture_native_action.setToolTip("Also show what C extensions and child processes write to stdout/stderr")
+        capture_native_action.setCheckable(True)
+        capture_native_action.setChecked(self.output_capture.capture_fds)
+        capture_native_action.toggled.connect(self.set_capture_native_output)
+        edit_menu.addSeparator()
+        show_more_action = edit_menu.addAction(
+            "Show More of Last Result", self.show_more_of_last_result, QtGui.QKeySequence("CTRL+SHIFT+M"))
+        save_result_action = edit_menu.addAction("Save Last Result to File...", self.save_last_result_to_file)
+        self.ui.script_output.extra_context_actions.extend([show_more_action, save_result_action])
+        edit_menu.addSeparator()
         edit_menu.addAction("Reset Layout", self.reset_layout, QtGui.QKeySequence("F5"))
 
+        self.remote_menu = self.menuBar().addMenu("Remote")
+        self.remote_menu.setTearOffEnabled(True)
+        self.remote_menu.addAction("Add Remote Host...", self.add_remote_host)
+        self.remote_menu.addAction("Ping Remote Hosts", self.ping_remote_hosts)
+        self.remote_menu.addAction("Remove Current Remote Host", self.remove_current_remote_host)
+        self.remote_menu.addSeparator()
+        self.remote_target_group = QtWidgets.QActionGroup(self)
+        self.remote_target_group.setExclusive(True)
+        self.remote_target_group.triggered.connect(self.remote_target_changed)
+        local_action = self.remote_menu.addAction("Local (In-Process)")
+        local_action.setCheckable(True)
+        local_action.setChecked(True)
+        self.remote_target_group.addAction(local_action)
+
         self.ui.script_tree.file_path_double_clicked.connect(self.open_script_path)
+        self.ui.script_tree.run_external_requested.connect(self.run_script_external)
+        self.ui.script_tree.batch_run_requested.connect(self.batch_run_paths)
+
+        cell_menu = self.menuBar().addMenu("Cells")
+        cell_menu.setTearOffEnabled(True)
+        cell_menu.addAction("Run Cell", self.run_current_cell, QtGui.QKeySequence("ALT+RETURN"))
+        cell_menu.addAction("Run Changed Cells", self.run_changed_cells, QtGui.QKeySequence("ALT+SHIFT+RETURN"))
+        cell_menu.addAction("Run All Cells", self.run_all_cells, QtGui.QKeySequence("CTRL+ALT+SHIFT+RETURN"))
+        cell_menu.addSeparator()
+        cell_menu.addAction("Forget Cell States", lambda: self.forget_cell_states())
+
+        namespace_menu = self.menuBar().addMenu("Namespace")
+        namespace_menu.setTearOffEnabled(True)
+        namespace_menu.addAction("Use Shared Namespace", self.use_shared_namespace)
+        namespace_menu.addAction("Use Tab Namespace", self.use_tab_namespace)
+        namespace_menu.addAction("Use Session Namespace...", self.use_session_namespace)
+        namespace_menu.addSeparator()
+        namespace_menu.addAction("Show Memory Usage", self.show_namespace_memory_usage)
+        namespace_menu.addAction("Memory Tracker", self.show_memory_tracker)
+        namespace_menu.addAction("Async Tasks", self.show_async_tasks)
+        namespace_menu.addAction("Reset Current Namespace", self.reset_current_namespace)
+        namespace_menu.addAction("Reset All Namespaces", self.reset_all_namespaces)
 
         # class properties
-        self.interp = code.InteractiveInterpreter(globals())
+
+        self.idle_tab_timer = QtCore.QTimer(self)
+        self.idle_tab_timer.setInterval(60 * 1000)
+        self.idle_tab_timer.timeout.connect(self.release_idle_tabs)
+        self.idle_tab_timer.start()
+
+        self.remote_runner = RemoteExecutionRunner(self)
+        self.remote_runner.output_received.connect(self.write_remote_output)
+        self.remote_runner.finished.connect(self.remote_execution_finished)
+        self.remote_runner.ping_finished.connect(self.remote_ping_finished)
+        for address in self.get_saved_remote_hosts():
+            self.add_remote_host(address, save=False)
+
         self.show_message("Ready")
 
     """
@@ -674,86 +2433,213 @@ class LiveScriptEditorWindow(QtWidgets.QMainWindow):
     def open_script_path(self, path):
         self.add_script_tab(path)
 
-    def add_script_tab(self, file_path=None):
-
-        # custom QT widget for ScriptEditing
-        script_text_edit = PythonScriptTextEdit(file_path=file_path)
-        script_text_edit.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
-        script_text_edit.setWordWrapMode(QtGui.QTextOption.NoWrap)
-
-        # syntax highlight
-        python_syntax_highlight.PythonHighlighter(script_text_edit.document())
-
-        # Dock Widget for ScriptTab
-        script_tabs_dock = QtWidgets.QDockWidget()
-        script_tabs_dock.setWidget(script_text_edit)
-        script_text_edit.dock_widget = script_tabs_dock  # not very safe
-
-        if file_path:
-            script_text_edit.load_script(file_path)
-            self.show_message("Opened: {}".format(file_path))
-        else:
-            script_text_edit.script_name = "Python"
-            script_text_edit.set_dock_tab_name("Python")
+    def add_script_tab(self, file_path=None, show=True):
+        """
+        :param file_path: script to open, empty tab if not given
+        :param show: bring the tab to the front. Tabs that aren't shown stay placeholders until they are.
+        """
+        # Dock Widget for ScriptTab, the editor inside gets built once the tab is shown
+        script_tabs_dock = ScriptTabDock(file_path=file_path, completer=self.completer)
+        script_tabs_dock.editor_created.connect(self.script_editor_created)
 
         # dock to existing script tab, or make new at the bottom
         if self.script_docks:
             self.tabifyDockWidget(self.script_docks[-1], script_tabs_dock)
         else:
             self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, script_tabs_dock)
-
-        # show new tab and set focus to ti
-        script_tabs_dock.show()
-        script_tabs_dock.raise_()
-        script_text_edit.setFocus(QtCore.Qt.FocusReason.ActiveWindowFocusReason)
         self.script_docks.append(script_tabs_dock)
 
-    def get_active_script_text_edit(self):
-        for dock in self.script_docks:  # type: QtWidgets.QDockWidget
-            if dock.widget().hasFocus():
+        if file_path:
+            self.show_message("Opened: {}".format(file_path))
+            self.update_watched_files()
+
+        if show:
+            # show new tab and set focus to it
+            script_tabs_dock.show()
+            script_tabs_dock.raise_()
+            script_text_edit = script_tabs_dock.materialize()
+            script_text_edit.setFocus(QtCore.Qt.FocusReason.ActiveWindowFocusReason)
+
+    def script_editor_created(self, script_text_edit):
+        script_text_edit.set_namespace(self.get_script_namespace(script_text_edit).globals)
+
+    def get_active_script_dock(self):
+        """
+        :rtype: ScriptTabDock
+        """
+        for dock in self.script_docks:
+            if dock.editor is not None and dock.editor.hasFocus():
                 if dock.visibleRegion().isEmpty():  # if it's not visible, don't return it
                     continue
-                return dock.widget()
-        return self.script_docks[-1].widget()  # nothing has focus, return last created
+                return dock
+        # nothing has focus, return the one that was looked at last
+        visible_docks = [dock for dock in self.script_docks if not dock.visibleRegion().isEmpty()]
+        return max(visible_docks or self.script_docks, key=lambda d: d.last_visible)
+
+    def get_active_script_text_edit(self):
+        return self.get_active_script_dock().materialize()
 
     def close_current_tab(self):
         docks_in_focus = []
-        for dock in self.script_docks:  # type: QtWidgets.QDockWidget
-            dock_widget = dock.widget()  # type: PythonScriptTextEdit
-            if dock_widget.hasFocus():
+        for dock in self.script_docks:
+            if dock.editor is not None and dock.editor.hasFocus():
                 if dock.visibleRegion().isEmpty():  # if it's not visible, don't close it
                     continue
                 docks_in_focus.append(dock)
-                self.script_docks.remove(dock)
-                self.recently_closed_scripts.append(dock_widget.script_file_path)
-                self.show_message("Closed: {}".format(dock_widget.script_name))
+
+        for dock in docks_in_focus:
+            dock.sync_from_editor()
+            self.script_docks.remove(dock)
+            self.namespaces.release_tab(dock.tab_key)
+            self.recently_closed_scripts.append(dock.file_path)
+            self.show_message("Closed: {}".format(dock.script_name))
 
         [d.close() for d in docks_in_focus]
         [d.deleteLater() for d in docks_in_focus]
+        self.update_watched_files()
 
         if len(self.script_docks):
-            self.script_docks[-1].widget().setFocus(QtCore.Qt.FocusReason.ActiveWindowFocusReason)
+            self.get_active_script_text_edit().setFocus(QtCore.Qt.FocusReason.ActiveWindowFocusReason)
+
+    def restore_open_scripts(self):
+        """
+        Open the scripts that were open last time. Only the last one gets loaded, the rest waits until it's shown.
+        """
+        file_paths = self._settings.value(ScriptEditorSettings.k_open_scripts) or []
+        if isinstance(file_paths, str):  # QSettings gives back a plain string for single item lists
+            file_paths = [file_paths]
+        file_paths = [file_path for file_path in file_paths if os.path.isfile(file_path)]
+
+        if not file_paths:
+            self.add_script_tab()
+            return
+
+        for file_path in file_paths[:-1]:
+            self.add_script_tab(file_path, show=False)
+        self.add_script_tab(file_paths[-1])
+
+    def save_open_scripts(self):
+        file_paths = list()
+        for dock in self.script_docks:
+            dock.sync_from_editor()
+            if dock.file_path:
+                file_paths.append(dock.file_path)
+        self._settings.setValue(ScriptEditorSettings.k_open_scripts, file_paths)
+
+    def get_release_idle_tabs_minutes(self):
+        return int(self._settings.value(ScriptEditorSettings.k_release_idle_tabs_minutes) or 0)
+
+    def set_release_idle_tabs_minutes(self):
+        minutes, ok = QtWidgets.QInputDialog.getInt(
+            self, "Release Idle Tabs", "Unload tabs that haven't been shown for this many minutes (0 = never)",
+            self.get_release_idle_tabs_minutes(), 0, 24 * 60)
+        if ok:
+            self._settings.setValue(ScriptEditorSettings.k_release_idle_tabs_minutes, minutes)
+
+    def release_idle_tabs(self):
+        minutes = self.get_release_idle_tabs_minutes()
+        if not minutes:
+            return
+
+        released_count = 0
+        for dock in self.script_docks:
+            if dock.editor is None or not dock.visibleRegion().isEmpty():
+                continue
+            if time.monotonic() - dock.last_visible > minutes * 60:
+                dock.release()
+                released_count += 1
+        if released_count:
+            log.info("Released {} idle tabs".format(released_count))
 
     def save_current_tab(self):
         active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
         if active_script.save_script(start_dir=self.ui.script_tree.get_folder_path()):
             self.show_message("Saved: {}".format(active_script.script_name))
+            self.update_watched_files()
 
     def save_current_tab_as(self):
         active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
         if active_script.save_script(save_as=True, start_dir=self.ui.script_tree.get_folder_path()):
             self.show_message("Saved: {}".format(active_script.script_name))
+            self.update_watched_files()
 
     def open_script(self):
         active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
         if active_script.load_script(open_dialog=True, start_dir=self.ui.script_tree.get_folder_path()):
             self.show_message("Opened: {}".format(active_script.script_name))
+            self.update_watched_files()
 
     def reload_script(self):
         active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
-        if active_script.load_script(start_dir=self.ui.script_tree.get_folder_path()):
+        if not active_script.script_file_path:
+            if active_script.load_script(start_dir=self.ui.script_tree.get_folder_path()):
+                self.show_message("Opened: {}".format(active_script.script_name))
+                self.update_watched_files()
+            return
+        if active_script.reload_script():
             self.show_message("Reloaded: {}".format(active_script.script_name))
 
+    # -------------------------------------------------------------------
+    # External changes
+    def update_watched_files(self):
+        """
+        Watch the files of all open tabs, and only those
+        """
+        file_paths = set()
+        for dock in self.script_docks:
+            file_path = dock.get_file_path()
+            if file_path and os.path.isfile(file_path):
+                file_paths.add(file_path)
+
+        watched_paths = set(self.file_watcher.files())
+        if watched_paths - file_paths:
+            self.file_watcher.removePaths(list(watched_paths - file_paths))
+        if file_paths - watched_paths:
+            self.file_watcher.addPaths(list(file_paths - watched_paths))
+
+    def watched_file_changed(self, file_path):
+        self.changed_file_paths.add(file_path)
+        self.file_change_timer.start()  # restarts the wait if it's already running
+
+    def reload_changed_files(self):
+        changed_file_paths = self.changed_file_paths
+        self.changed_file_paths = set()
+
+        # saving by writing a new file and renaming it over the old one makes the watcher drop the path
+        self.update_watched_files()
+
+        for dock in list(self.script_docks):
+            file_path = dock.get_file_path()
+            if file_path not in changed_file_paths:
+                continue
+            if not os.path.isfile(file_path):
+                self.show_message("Deleted on disk: {}".format(file_path))
+                continue
+            if dock.editor is None and dock.text is None:
+                continue  # the file gets read when the tab is shown
+
+            editor = dock.materialize()
+            try:
+                disk_text = editor.read_script_file()
+            except (IOError, OSError, UnicodeDecodeError) as e:
+                log.warning("Failed to read {}: {}".format(file_path, e))
+                continue
+            if disk_text == editor.disk_text:
+                continue  # saved from here, or touched without changing anything
+
+            if editor.has_unsaved_changes() and editor.toPlainText() != disk_text:
+                answer = QtWidgets.QMessageBox.question(
+                    self, "Script Changed on Disk",
+                    "{} was changed on disk and also has unsaved changes here.\n\n"
+                    "Reload it from disk? The reload can be undone to get the changes back.".format(file_path),
+                )
+                if answer != QtWidgets.QMessageBox.Yes:
+                    editor.disk_text = disk_text  # don't ask again until it changes again
+                    continue
+
+            editor.apply_script_text(disk_text)
+            self.show_message("Reloaded: {}".format(editor.script_name))
+
     def reopen_recently_closed(self):
         if not len(self.recently_closed_scripts):
             self.show_message("No recent scripts found")
@@ -765,38 +2651,563 @@ class LiveScriptEditorWindow(QtWidgets.QMainWindow):
         current_time = datetime.datetime.now().strftime("%H:%M:%S")
         self.statusBar().showMessage("{} - {}".format(current_time, text))
 
-    def run_script(self):
+    def run_script(self, line_timing=False):
         active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
 
         # Get selected text
         cursor = active_script.textCursor()  # type: QtGui.QTextCursor
         python_script_text = cursor.selection().toPlainText()
+        first_line = active_script.document().findBlock(cursor.selectionStart()).blockNumber()
 
         # If no text selected, get the entire script
         if not python_script_text:
             python_script_text = active_script.toPlainText()
+            first_line = 0
+
+        self.execute_script_text(python_script_text, active_script, line_timing, first_line)
 
+    def run_script_with_line_timing(self):
+        self.run_script(line_timing=True)
+
+    def execute_script_text(self, python_script_text, active_script, line_timing=False, first_line=0):
+        """
+        :param python_script_text:
+        :param active_script: tab the code comes from
+        :param line_timing: time every line and show the result in the tab's gutter
+        :param first_line: block number the code starts at in the tab, for the line timings
+        :return: False if the code raised, None if it was sent to a remote host,
+                 _not_run if it couldn't run because the last run is still waiting
+        """
+        self.ui.script_output.start_run()
         self.ui.script_output.write_input(python_script_text)
 
+        if self.active_remote_pool is not None:
+            if line_timing:
+                self.ui.script_output.write_error("Line timing only works for local runs, running without it")
+            self.remote_runner.execute(self.active_remote_pool, python_script_text,
+                                       context=(python_script_text, active_script.script_name,
+                                                active_script.script_file_path))
+            self.show_message("Sent to {}: {}".format(self.active_remote_pool.name, active_script.script_name))
+            return None
+
+        if self.waiting_run_task is not None:
+            self.ui.script_output.write_error("The last run is still waiting for an await, "
+                                              "cancel it in Namespace > Async Tasks to run something else")
+            return _not_run
+
+        if self.auto_reload_modules_action.isChecked():
+            self.reload_changed_modules(quiet=True)
+
         # execute script
-        if python_script_text.count("\n"):
-            self.interp.runcode(python_script_text)  # runsource fails on multi-line
-        else:
-            self.interp.runsource(python_script_text)  # shows results of single line commands
+        namespace = self.get_script_namespace(active_script)
+        file_name = self.get_run_file_name(active_script)
+        if line_timing:
+            # its own file name, so the timer can tell this code apart from everything it calls
+            file_name = "<line timing: {}>".format(file_name[1:-1])
+        with self.async_driver.started_from(active_script.script_name), \
+                self.async_driver.activated(), \
+                self.output_capture.capturing(), \
+                self.memory_tracker.measure(active_script.script_name, python_script_text,
+                                            namespace.globals, file_name) as memory_report:
+            start_time = time.perf_counter()
+            with self.result_renderer.installed():  # big results get summarized instead of printed in full
+                if line_timing:
+                    timer = self.run_with_line_timing(namespace, python_script_text, file_name)
+                    success = not namespace.interp.failed
+                else:
+                    success = namespace.interp.run(python_script_text, file_name)
+            duration = time.perf_counter() - start_time
+        if self.module_reloader is not None:
+            self.module_reloader.record_new_modules()  # what the code imported is the version it knows about
+        self.start_event_loop()  # for tasks the code started without waiting for them
+        if memory_report is not None:
+            self.memory_tracker_widget.add_report(memory_report)
+        if line_timing:
+            active_script.set_line_timings(timer.timings, first_line)
+            self.ui.script_output.write(str(timer.timings))
+
+        self.record_execution(python_script_text, active_script.script_name, active_script.script_file_path,
+                              duration, success)
         self.show_message("Executed: {}".format(active_script.script_name))
+        return success
 
+    # -------------------------------------------------------------------
+    # Output capture
+    def write_captured_output(self, stream_name, text):
+        if stream_name == output_capture.STDERR:
+            self.ui.script_output.write_error(text)
+        else:
+            self.ui.script_output.write(text)
 
-class Redirect(object):
-    """
-    Map self.write to a function
-    from: https://python-forum.io/Thread-Embed-Python-console-in-GUI-application
-    """
+    def set_capture_native_output(self, capture_native_output):
+        self._settings.setValue(ScriptEditorSettings.k_capture_native_output, capture_native_output)
+        self.output_capture.set_capture_fds(capture_native_output)
+
+    # -------------------------------------------------------------------
+    # Cells
+    def run_cells(self, active_script, cells_to_run):
+        """
+        Run cells one after the other, stops at the first one that fails
+        """
+        for cell in cells_to_run:
+            start_time = time.perf_counter()
+            success = self.execute_script_text(cell.text, active_script, first_line=cell.start_line)
+            if success is _not_run:
+                break  # it never ran, so it didn't fail either
+            if success is None:
+                continue  # remote, no way to tell how it went from here
+            active_script.cell_tracker.record(cell, success, time.perf_counter() - start_time)
+            if not success:
+                self.show_message("Cell {} of {} failed".format(cell.index + 1, active_script.script_name))
+                break
+        active_script.update_cells()
+
+    def run_current_cell(self):
+        active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
+        self.run_cells(active_script, [active_script.get_current_cell()])
+
+    def run_changed_cells(self):
+        active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
+        active_script.get_current_cell()  # makes sure the cells are up to date
+        dirty_cells = active_script.cell_tracker.get_dirty_cells(active_script.cells)
+        if not dirty_cells:
+            self.show_message("No changed cells in {}".format(active_script.script_name))
+            return
+        self.run_cells(active_script, dirty_cells)
+
+    def run_all_cells(self):
+        active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
+        active_script.get_current_cell()
+        self.run_cells(active_script, active_script.cells)
+
+    def forget_cell_states(self, namespace=None):
+        """
+        :param namespace: only for tabs that run in this namespace, all tabs if not given
+        """
+        for dock in self.script_docks:
+            if namespace is not None and dock.editor is not None \
+                    and self.get_script_namespace(dock.editor) is not namespace:
+                continue
+            dock.cell_tracker.clear()
+            if dock.editor is not None:
+                dock.editor.update_cells()
+
+    def get_run_file_name(self, active_script):
+        """
+        File name the code of a tab gets compiled with, every tab has its own so the memory tracker
+        can tell line 12 of one tab apart from line 12 of another
+        """
+        tab_number = self.tab_numbers.setdefault(active_script.tab_key, len(self.tab_numbers) + 1)
+        return "<tab {}: {}>".format(tab_number, active_script.script_name)
+
+    @staticmethod
+    def run_with_line_timing(namespace, python_script_text, file_name):
+        """
+        :return: line_timer.LineTimer with the timings of the run
+        """
+        line_timer.register_source(file_name, python_script_text)
+        timer = line_timer.LineTimer(file_name)
+        with timer.running():
+            namespace.interp.run(python_script_text, file_name)
+        return timer
 
-    def __init__(self, func: Callable) -> 'Redirect':
-        self.func = func
+    # -------------------------------------------------------------------
+    # Async
+    def run_coroutine(self, coroutine):
+        """
+        Run code that awaits at the top level. Qt events keep being processed while it waits,
+        so the GUI stays responsive and background tasks keep going.
+
+        :return: the result of the coroutine
+        """
+        task = self.async_driver.create_run_task(coroutine)
+        wait_loop = QtCore.QEventLoop()
+        task.add_done_callback(lambda _: wait_loop.quit())
+
+        self.waiting_run_task = task
+        self.start_event_loop()
+        try:
+            if not task.done():
+                wait_loop.exec_()
+        finally:
+            self.waiting_run_task = None
+        return task.result()
+
+    def start_event_loop(self):
+        """
+        Keep stepping the event loop for as long as it has tasks
+        """
+        if self.async_timer.isActive() or not self.async_driver.has_work():
+            return
+        self.async_timer.start(0)
+
+    def pump_event_loop(self):
+        if self.async_driver.is_due():
+            with self.output_capture.capturing():  # what tasks print goes to the console, same as for runs
+                self.async_driver.run_once()
+        if not self.async_driver.has_work():
+            self.async_timer.stop()
+            return
+        # straight back if callbacks are lined up and no later than the next timer, otherwise only look
+        # for i/o and callbacks from other threads every now and then
+        interval = self.async_io_check_interval
+        timeout = self.async_driver.get_next_timeout()
+        if timeout is not None:
+            interval = min(interval, int(math.ceil(timeout * 1000)))
+        self.async_timer.setInterval(interval)
+
+    def write_async_error(self, text):
+        self.ui.script_output.write_error(text)
+
+    def show_async_tasks(self):
+        if self.async_tasks_widget is None:
+            self.async_tasks_widget = AsyncTasksUI(self.async_driver)
+            tasks_dock = QtWidgets.QDockWidget()
+            tasks_dock.setWindowTitle("Async Tasks")
+            tasks_dock.setWidget(self.async_tasks_widget)
+            self.async_tasks_widget.dock_widget = tasks_dock
+            self.tabifyDockWidget(self.ui.script_output_dock, tasks_dock)
+        self.async_tasks_widget.dock_widget.show()
+        self.async_tasks_widget.dock_widget.raise_()
+
+    # -------------------------------------------------------------------
+    # Execution history
+    def record_execution(self, python_script_text, tab_name, file_path, duration, success):
+        if self.execution_history is not None:
+            self.execution_history.record(python_script_text, tab_name, file_path, duration, success)
+
+    def show_history_palette(self):
+        if self.execution_history is None:
+            self.show_message("Execution history is not available")
+            return
+
+        if self.history_palette is None:
+            self.history_palette = HistoryPaletteUI(self.execution_history, self)
+            self.history_palette.insert_requested.connect(self.insert_into_active_script)
+            self.history_palette.run_requested.connect(
+                lambda text: self.execute_script_text(text, self.get_active_script_text_edit()))
+        self.history_palette.show()
+        self.history_palette.raise_()
+
+    def insert_into_active_script(self, text):
+        active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
+        active_script.textCursor().insertText(text)
+        active_script.setFocus()
+
+    def closeEvent(self, event):
+        self.save_open_scripts()
+        self.ui.script_tree.close_index()
+        for batch_widget in self.batch_run_widgets:
+            batch_widget.batch_run.shutdown()  # kills what's still running, the workers remove the temp files
+        self.async_timer.stop()
+        self.async_driver.close()  # cancels the tasks, a run that is still waiting ends with a CancelledError
+        while self.output_capture.installed:
+            self.output_capture.uninstall()
+        if self.execution_history is not None:
+            self.execution_history.close()
+            self.execution_history = None
+        super(LiveScriptEditorWindow, self).closeEvent(event)
 
-    def write(self, line: str) -> None:
-        self.func(line)
+    def clear_history(self):
+        self.ui.script_output.clear()
+        self.ui.script_console.apply_filter()
+        self.result_renderer.clear()
+
+    def show_more_of_last_result(self):
+        if not self.result_renderer.show_more():
+            self.show_message("Nothing more to show")
+
+    def save_last_result_to_file(self):
+        pager = self.result_renderer.last_pager
+        if pager is None:
+            self.show_message("No result to save")
+            return
+
+        file_path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save Result", filter="*.txt")
+        if not file_path:
+            return
+
+        pager.write_to_file(file_path)
+        self.show_message("Saved {} to: {}".format(pager.summary, file_path))
+
+    # -------------------------------------------------------------------
+    # Module reloading
+    def get_module_reloader(self):
+        """
+        Reloader for modules under the Script Tree folder, a new one if the folder changed
+        """
+        root_path = self.ui.script_tree.get_folder_path()
+        if self.module_reloader is None or self.module_reloader.root_path != module_reloader.normalize_path(root_path):
+            self.module_reloader = module_reloader.ModuleReloader(root_path)
+            self.module_reloader.reload_changed()  # first pass only records the baseline
+        return self.module_reloader
+
+    def reload_changed_modules(self, quiet=False):
+        """
+        :param quiet: only report when something actually got reloaded
+        """
+        report = self.get_module_reloader().reload_changed()
+        if report.failed:
+            self.ui.script_output.write_error(str(report))
+        elif report.reloaded or not quiet:
+            self.ui.script_output.write(str(report))
+
+    # -------------------------------------------------------------------
+    # External interpreter
+    def get_python_executable(self):
+        python_executable = self._settings.value(ScriptEditorSettings.k_python_executable)
+        return python_executable or external_runner.get_default_python_executable()
+
+    def set_python_executable(self):
+        python_executable, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "External Python Executable", dir=os.path.dirname(self.get_python_executable()))
+        if python_executable:
+            self._settings.setValue(ScriptEditorSettings.k_python_executable, python_executable)
+            self.show_message("External Python: {}".format(python_executable))
+
+    def run_script_external(self, file_path=None):
+        """
+        Run a file, or the contents of the active tab, in a separate interpreter
+
+        :param file_path: run this file from disk, if not given the active tab's text is used
+        """
+        script_text = None
+        if file_path:
+            source = ("file", os.path.normcase(os.path.abspath(file_path)))
+        else:
+            active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
+            file_path = active_script.script_file_path
+            script_text = active_script.toPlainText()
+            source = ("tab", active_script.tab_key)
+
+        # re-use the output of a previous run from the same tab or file if it's done
+        for run_widget in self.external_run_widgets:
+            if run_widget.source == source and not run_widget.run.is_running():
+                run_widget.run.python_executable = self.get_python_executable()
+                run_widget.run.set_script_path(file_path)  # eg. the tab got saved under another name
+                run_widget.run.update_script_text(script_text)  # None runs the file as it is on disk
+                run_widget.dock_widget.setWindowTitle(run_widget.run.name)
+                run_widget.rerun()
+                run_widget.dock_widget.show()
+                run_widget.dock_widget.raise_()
+                return
+
+        run = external_runner.ExternalScriptRun(
+            script_path=file_path,
+            script_text=script_text,
+            python_executable=self.get_python_executable(),
+            parent=self,
+        )
+        run_widget = ExternalRunOutputUI(run, source=source)
+
+        run_dock = QtWidgets.QDockWidget()
+        run_dock.setWindowTitle(run.name)
+        run_dock.setWidget(run_widget)
+        run_widget.dock_widget = run_dock
+        self.tabifyDockWidget(self.ui.script_output_dock, run_dock)
+        run_dock.show()
+        run_dock.raise_()
+
+        self.external_run_widgets.append(run_widget)
+        run.start()
+        self.show_message("Started external run: {}".format(run.name))
+
+    def get_batch_worker_count(self):
+        return int(self._settings.value(ScriptEditorSettings.k_batch_worker_count) or os.cpu_count() or 1)
+
+    def set_batch_worker_count(self):
+        worker_count, ok = QtWidgets.QInputDialog.getInt(
+            self, "Batch Worker Count", "Files to process at the same time", self.get_batch_worker_count(), 1, 256)
+        if ok:
+            self._settings.setValue(ScriptEditorSettings.k_batch_worker_count, worker_count)
+
+    def batch_run_paths(self, paths):
+        """
+        Run the active tab's script once for every file in paths (folders get expanded)
+        """
+        active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
+
+        patterns = "*"
+        if any(os.path.isdir(path) for path in paths):
+            patterns, ok = QtWidgets.QInputDialog.getText(
+                self, "Batch Run", "File patterns (separated by ;)",
+                text=self._settings.value(ScriptEditorSettings.k_batch_file_patterns) or "*.py")
+            if not ok:
+                return
+            self._settings.setValue(ScriptEditorSettings.k_batch_file_patterns, patterns)
+
+        file_paths = batch_runner.collect_files(paths, patterns)
+        if not file_paths:
+            self.show_message("No files found to batch run")
+            return
+
+        batch_widget = BatchRunUI(
+            active_script.toPlainText(),
+            file_paths,
+            self.get_python_executable(),
+            self.get_batch_worker_count(),
+            name="Batch: {}".format(active_script.script_name),
+            summary_dir=os.path.join(os.path.dirname(self._settings.fileName()), "batch_summaries"),
+        )
+        batch_dock = QtWidgets.QDockWidget()
+        batch_dock.setWindowTitle(batch_widget.batch_run.name)
+        batch_dock.setWidget(batch_widget)
+        batch_widget.dock_widget = batch_dock
+        self.tabifyDockWidget(self.ui.script_output_dock, batch_dock)
+        batch_dock.show()
+        batch_dock.raise_()
+
+        self.batch_run_widgets.append(batch_widget)
+        batch_widget.start()
+        self.show_message("Batch running {} on {} files".format(active_script.script_name, len(file_paths)))
+
+    # -------------------------------------------------------------------
+    # Namespaces
+    def get_script_namespace(self, script_text_edit):
+        """
+        :param script_text_edit:
+        :rtype: namespaces.ScriptNamespace
+        """
+        return self.namespaces.get_namespace(
+            script_text_edit.namespace_scope,
+            tab_key=script_text_edit.tab_key,
+            tab_name=script_text_edit.script_name,
+            session_name=script_text_edit.session_name,
+        )
+
+    def set_active_script_namespace(self, scope, session_name=None):
+        active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
+        active_script.namespace_scope = scope
+        active_script.session_name = session_name
+
+        namespace = self.get_script_namespace(active_script)
+        active_script.set_namespace(namespace.globals)
+        self.show_message("{} now runs in: {}".format(active_script.script_name, namespace.name))
+
+    def use_shared_namespace(self):
+        self.set_active_script_namespace(namespaces.SHARED)
+
+    def use_tab_namespace(self):
+        self.set_active_script_namespace(namespaces.TAB)
+
+    def use_session_namespace(self):
+        session_name, ok = QtWidgets.QInputDialog.getItem(
+            self, "Session Namespace", "Session name", sorted(self.namespaces.sessions) or ["Session"], editable=True)
+        if ok and session_name:
+            self.set_active_script_namespace(namespaces.SESSION, session_name)
+
+    def show_namespace_memory_usage(self):
+        for namespace in self.namespaces.all_namespaces():
+            self.ui.script_output.write("{}: {}".format(namespace.name, namespace.get_memory_usage()))
+
+    def show_memory_tracker(self):
+        if self.memory_tracker_widget is None:
+            self.memory_tracker_widget = MemoryTrackerUI(self.memory_tracker)
+            memory_dock = QtWidgets.QDockWidget()
+            memory_dock.setWindowTitle("Memory Tracker")
+            memory_dock.setWidget(self.memory_tracker_widget)
+            self.memory_tracker_widget.dock_widget = memory_dock
+            self.tabifyDockWidget(self.ui.script_output_dock, memory_dock)
+        self.memory_tracker_widget.dock_widget.show()
+        self.memory_tracker_widget.dock_widget.raise_()
+
+    def reset_current_namespace(self):
+        active_script = self.get_active_script_text_edit()  # type: PythonScriptTextEdit
+        namespace = self.get_script_namespace(active_script)
+        self.result_renderer.clear()
+        collected = namespace.reset()
+        self.forget_cell_states(namespace)  # whatever the cells set up is gone
+        self.show_message("Reset {} ({} objects collected)".format(namespace.name, collected))
+
+    def reset_all_namespaces(self):
+        self.result_renderer.clear()
+        collected = self.namespaces.reset_all()
+        self.forget_cell_states()
+        self.show_message("Reset all namespaces ({} objects collected)".format(collected))
+
+    # -------------------------------------------------------------------
+    # Remote hosts
+    def get_saved_remote_hosts(self):
+        hosts = self._settings.value(ScriptEditorSettings.k_remote_hosts)
+        if not hosts:
+            return []
+        if isinstance(hosts, str):  # QSettings gives back a plain string for single item lists
+            hosts = [hosts]
+        return list(hosts)
+
+    def add_remote_host(self, address=None, save=True):
+        if not address:
+            address, ok = QtWidgets.QInputDialog.getText(
+                self, "Add Remote Host", "host:port or socket path",
+                text="{}:{}".format(command_port.DEFAULT_HOST, command_port.DEFAULT_PORT))
+            if not ok or not address:
+                return
+
+        pool = command_port.ConnectionPool(address)
+        if pool.name in self.remote_pools:
+            return
+
+        self.remote_pools[pool.name] = pool
+
+        action = self.remote_menu.addAction(pool.name)
+        action.setCheckable(True)
+        action.setData(pool.name)
+        self.remote_target_group.addAction(action)
+
+        if save:
+            self._settings.setValue(ScriptEditorSettings.k_remote_hosts, list(self.remote_pools))
+            action.trigger()
+
+    def remove_current_remote_host(self):
+        pool = self.active_remote_pool
+        if pool is None:
+            return
+
+        for action in self.remote_target_group.actions():
+            if action.data() == pool.name:
+                self.remote_target_group.removeAction(action)
+                self.remote_menu.removeAction(action)
+            elif action.data() is None:
+                action.trigger()  # back to local
+
+        pool.close()
+        self.remote_pools.pop(pool.name, None)
+        self._settings.setValue(ScriptEditorSettings.k_remote_hosts, list(self.remote_pools))
+        self.show_message("Removed remote host: {}".format(pool.name))
+
+    def remote_target_changed(self, action):
+        self.active_remote_pool = self.remote_pools.get(action.data())
+        self.completer.remote_pool = self.active_remote_pool
+
+        target_name = self.active_remote_pool.name if self.active_remote_pool else "Local"
+        self.setWindowTitle("Live Script Editor - {}".format(target_name))
+        self.show_message("Executing on: {}".format(target_name))
+
+    def ping_remote_hosts(self):
+        # in the background, a host that is gone takes the whole connect timeout to fail
+        for pool in self.remote_pools.values():
+            self.remote_runner.ping(pool)
+
+    def remote_ping_finished(self, host_name, duration, error):
+        if error:
+            self.ui.script_output.write_error("{}: {}".format(host_name, error))
+        else:
+            self.ui.script_output.write("{}: {:.2f}ms".format(host_name, duration * 1000))
+
+    def write_remote_output(self, stream, text):
+        if stream == "stderr":
+            self.ui.script_output.write_error(text)
+        else:
+            self.ui.script_output.write(text)
+
+    def remote_execution_finished(self, host_name, reply, context):
+        python_script_text, tab_name, file_path = context
+        self.record_execution(python_script_text, "{} @ {}".format(tab_name, host_name), file_path,
+                              reply.get("duration"), reply.get("ok", False))
+        if reply.get("error"):
+            self.ui.script_output.write_error("Remote execution on {} failed: {}".format(host_name, reply["error"]))
+        if "duration" in reply:
+            self.show_message("Executed on {} ({:.1f}ms)".format(host_name, reply["duration"] * 1000))
 
 
 def main():
@@ -817,15 +3228,13 @@ def main():
             window.open_script_path(script_path)
 
     if existing_app:
+        # inside a DCC output only gets captured while a script runs, the rest belongs to the DCC
         window.show()
 
     else:
-        # This might be tricky to replicate in DCC
-        # It looks like the app.exec_() needs to be part of the 'with'
-        error_redirect = Redirect(window.ui.script_output.write_error)
-        with redirect_stdout(window.ui.script_output), redirect_stderr(error_redirect):
-            window.show()
-            sys.exit(app.exec_())
+        window.output_capture.install()  # standalone, everything goes to the console
+        window.show()
+        sys.exit(app.exec_())
 
     return window
 
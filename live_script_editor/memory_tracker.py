@@ -0,0 +1,246 @@
+"""
+Track what a run leaves behind in memory
+
+Before and after a run the live objects are counted per type and a tracemalloc snapshot is
+taken, so the difference shows which types grew and which source lines allocated the memory
+that is still alive. Nothing is measured (and tracemalloc isn't tracing) while tracking is off.
+"""
+import collections
+import contextlib
+import gc
+import linecache
+import re
+import time
+import tracemalloc
+
+# code run through the interpreter gets compiled with these file names. Code from the editor gets one per tab,
+# and runs with line timing get their own
+_script_file_name_re = re.compile(r"<(string|input|tab \d+: .*|line timing: .*)>$")
+
+
+def count_objects():
+    """
+    :return: {type: count} of the objects the garbage collector knows about
+    """
+    return collections.Counter(map(type, gc.get_objects()))
+
+
+def get_type_name(object_type):
+    module = getattr(object_type, "__module__", None)
+    if module in (None, "builtins"):
+        return object_type.__qualname__
+    return "{}.{}".format(module, object_type.__qualname__)
+
+
+class TypeGrowth(object):
+    def __init__(self, type_name, growth, count):
+        self.type_name = type_name
+        self.growth = growth  # how many more there are than before the run
+        self.count = count  # how many there are after the run
+
+
+class AllocationGrowth(object):
+    def __init__(self, file_path, line_number, size, count, source_line=""):
+        self.file_path = file_path
+        self.line_number = line_number
+        self.size = size  # bytes allocated by this line that are still alive
+        self.count = count  # number of blocks
+        self.source_line = source_line
+
+    @property
+    def location(self):
+        return "{}:{}".format(self.file_path, self.line_number)
+
+
+class RunMemoryReport(object):
+    def __init__(self, label):
+        self.label = label
+        self.timestamp = time.time()
+        self.type_growth = []  # [TypeGrowth] biggest growth first
+        self.allocations = []  # [AllocationGrowth] biggest size first
+        self.traced_growth = 0  # bytes, total of everything tracemalloc saw
+        self.new_variables = []  # names that were added to the namespace
+        self.overhead = 0.0  # seconds spent measuring
+        self.source = ""
+        self.file_name = None  # the source got compiled with, to find the run a line of script code came from
+        self._type_counts_before = None  # {type name: count}, for comparing across runs
+        self._type_counts = None
+        self._grown_types = None  # names of every type that grew, not just the top ones
+        self._line_sizes_before = None  # {(file name, line number): (size, count)}, for comparing across runs
+        self._line_growth = dict()  # {(file name, line number): size} of every line that allocated more
+
+    def __str__(self):
+        text = "{}: {:+.1f}KB traced, {:+d} objects".format(
+            self.label, self.traced_growth / 1024.0, sum(growth.growth for growth in self.type_growth))
+        if self.new_variables:
+            text += ", new variables: {}".format(", ".join(self.new_variables))
+        return text
+
+
+class MemoryTracker(object):
+    """
+    :param frame_count: traceback depth tracemalloc records per allocation
+    :param top_count: how many types and lines the reports keep
+    :param history_size: how many reports are kept for comparing runs
+    """
+
+    def __init__(self, frame_count=1, top_count=25, history_size=20):
+        self.frame_count = frame_count
+        self.top_count = top_count
+        self.reports = collections.deque(maxlen=history_size)  # type: collections.deque[RunMemoryReport]
+        self.enabled = False
+        self._started_tracemalloc = False
+        self._last_line_sizes = None
+        self._ignored_file_names = {tracemalloc.__file__, __file__, linecache.__file__}  # our own allocations
+
+    def set_enabled(self, enabled):
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+
+        if enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frame_count)
+                self._started_tracemalloc = True
+        else:
+            self._last_line_sizes = None
+            if self._started_tracemalloc:  # someone else might be using it too, leave theirs running
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def clear(self):
+        self.reports.clear()
+        self._last_line_sizes = None
+
+    def _take_line_sizes(self):
+        """
+        :return: {(file name, line number): (size, block count)} of everything currently traced
+        """
+        # only the per line totals are kept, whole snapshots get big and slow everything down.
+        # filtering the totals is a lot quicker than Snapshot.filter_traces() too
+        ignored = self._ignored_file_names
+        line_sizes = dict()
+        for stat in tracemalloc.take_snapshot().statistics("lineno"):
+            frame = stat.traceback[0]
+            if frame.filename not in ignored:
+                line_sizes[(frame.filename, frame.lineno)] = (stat.size, stat.count)
+        return line_sizes
+
+    @contextlib.contextmanager
+    def measure(self, label, source="", namespace=None, file_name=None):
+        """
+        Wrap a run with this. Does nothing when tracking is off.
+
+        :param label: shown in the report, eg. the tab name
+        :param source: code that runs, to show lines allocated by the script itself
+        :param namespace: globals the code runs in, to list the variables it added
+        :param file_name: the source gets compiled with, None for the default ones of the interpreter
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        report = RunMemoryReport(label)
+        report.source = source
+        report.file_name = file_name
+        start_time = time.perf_counter()
+        gc.collect()  # only count what is still alive, not garbage waiting for a collection
+        counts_before = count_objects()
+        report._line_sizes_before = self._take_line_sizes()
+        names_before = set(namespace) if namespace is not None else set()
+        report.overhead += time.perf_counter() - start_time
+
+        try:
+            yield report
+        finally:
+            start_time = time.perf_counter()
+            gc.collect()
+            self._last_line_sizes = self._take_line_sizes()
+            counts_after = count_objects()
+            if namespace is not None:
+                report.new_variables = sorted(name for name in namespace if name not in names_before)
+
+            self._fill_type_growth(report, counts_before, counts_after)
+            del counts_before, counts_after
+            self._fill_allocations(report, report._line_sizes_before, self._last_line_sizes, [report])
+
+            report.overhead += time.perf_counter() - start_time
+            self.reports.append(report)
+
+    def _fill_type_growth(self, report, counts_before, counts_after):
+        # several types can share a name (classes redefined by running a script again), so go by name
+        type_counts_before = collections.Counter()
+        for object_type, count in counts_before.items():
+            type_counts_before[get_type_name(object_type)] += count
+        type_counts = collections.Counter()
+        for object_type, count in counts_after.items():
+            type_counts[get_type_name(object_type)] += count
+
+        growth = collections.Counter(type_counts)
+        growth.subtract(type_counts_before)
+
+        report._type_counts_before = type_counts_before
+        report._type_counts = type_counts
+        report._grown_types = {type_name for type_name, difference in growth.items() if difference > 0}
+        report.type_growth = [TypeGrowth(type_name, difference, type_counts[type_name])
+                              for type_name, difference in growth.most_common(self.top_count) if difference > 0]
+
+    def _fill_allocations(self, report, line_sizes_before, line_sizes_after, run_reports):
+        """
+        :param run_reports: reports of the runs the growth happened in. Lines of code that didn't come
+                            from a file are looked up in the source of the run compiled with that file name
+                            that grew the most there.
+        """
+        growth = []
+        total = 0
+        for location, (size, count) in line_sizes_after.items():
+            size_before, count_before = line_sizes_before.get(location, (0, 0))
+            total += size - size_before
+            if size > size_before:
+                growth.append((size - size_before, count - count_before, location))
+        total -= sum(size for location, (size, count) in line_sizes_before.items()
+                     if location not in line_sizes_after)
+        report.traced_growth = total
+        report._line_growth = {location: size for size, count, location in growth}
+
+        growth.sort(reverse=True)
+        for size, count, location in growth[:self.top_count]:
+            file_name, line_number = location
+            if _script_file_name_re.match(file_name):
+                # default file names are shared by every run, those can only be told apart by the growth
+                candidates = [r for r in run_reports if r.file_name == file_name] or \
+                    [r for r in run_reports if r.file_name is None] or run_reports
+                source = max(candidates, key=lambda r: r._line_growth.get(location, 0)).source
+                source_lines = source.split("\n") if source else []
+                source_line = source_lines[line_number - 1] if 0 < line_number <= len(source_lines) else ""
+            else:
+                source_line = linecache.getline(file_name, line_number)
+            report.allocations.append(AllocationGrowth(file_name, line_number, size, count, source_line.strip()))
+
+    def compare(self, run_count):
+        """
+        Growth over the last few runs together, to tell steady leaks apart from one-off caches
+
+        :param run_count: how many of the latest runs to look at
+        :return: RunMemoryReport covering those runs, None if there's nothing to compare.
+                 type_growth only lists types that grew in every one of the runs.
+        """
+        reports = list(self.reports)[-run_count:]
+        if not reports or self._last_line_sizes is None:
+            return None
+
+        report = RunMemoryReport("Last {} runs".format(len(reports)))
+        first_counts = reports[0]._type_counts_before
+        last_counts = reports[-1]._type_counts
+        grown_in_every_run = set.intersection(*(r._grown_types for r in reports))
+        for type_name in grown_in_every_run:
+            count = last_counts.get(type_name, 0)
+            difference = count - first_counts.get(type_name, 0)
+            if difference > 0:
+                report.type_growth.append(TypeGrowth(type_name, difference, count))
+        report.type_growth.sort(key=lambda growth: growth.growth, reverse=True)
+        del report.type_growth[self.top_count:]
+
+        self._fill_allocations(report, reports[0]._line_sizes_before, self._last_line_sizes, reports)
+        report.new_variables = sorted(set(name for r in reports for name in r.new_variables))
+        return report
@@ -0,0 +1,228 @@
+"""
+Reload modules under a folder that changed on disk, plus everything that imports them
+
+Imports are read from the source with ast and cached by file mtime, so a check where
+nothing changed is a stat() per tracked module and not much else. That's cheap enough to
+do before every run.
+"""
+import ast
+import importlib
+import os
+import sys
+import time
+
+
+class ReloadReport(object):
+    def __init__(self):
+        self.changed = []  # modules whose file changed
+        self.reloaded = []  # everything that got reloaded, in order
+        self.failed = []  # [(module name, exception)]
+        self.duration = 0.0
+
+    def __str__(self):
+        if not self.reloaded and not self.failed:
+            return "No changed modules ({:.1f}ms)".format(self.duration * 1000)
+
+        text = "Reloaded {} modules in {:.1f}ms: {}".format(
+            len(self.reloaded), self.duration * 1000, ", ".join(self.reloaded))
+        for module_name, exception in self.failed:
+            text += "\nFailed to reload {}: {}".format(module_name, exception)
+        return text
+
+
+def normalize_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _resolve_import_from(node, package):
+    """
+    Full module names an ImportFrom could be pulling in, relative imports resolved against package
+    """
+    if node.level:
+        if not package:
+            return []
+        parts = package.split(".")
+        if node.level > 1:
+            parts = parts[:-(node.level - 1)]
+        base = ".".join(parts + ([node.module] if node.module else []))
+    else:
+        base = node.module or ""
+
+    # 'from pkg import mod' imports pkg.mod if that's a module, otherwise an attribute of pkg
+    names = [base] if base else []
+    names.extend("{}.{}".format(base, alias.name) if base else alias.name for alias in node.names)
+    return names
+
+
+def topological_order(graph):
+    """
+    :param graph: {node: set of nodes it depends on}
+    :return: nodes with dependencies first, None if there's a cycle
+    """
+    remaining = {node: set(dependencies) for node, dependencies in graph.items()}
+    dependents = {node: set() for node in graph}
+    for node, dependencies in remaining.items():
+        for dependency in dependencies:
+            dependents[dependency].add(node)
+
+    order = []
+    ready = sorted(node for node, dependencies in remaining.items() if not dependencies)
+    while ready:
+        node = ready.pop()
+        order.append(node)
+        for dependent in dependents[node]:
+            remaining[dependent].discard(node)
+            if not remaining[dependent]:
+                ready.append(dependent)
+
+    if len(order) != len(graph):
+        return None
+    return order
+
+
+def read_imports(file_path, package):
+    """
+    :return: set of module names the file imports
+    """
+    with open(file_path, "rb") as fh:
+        tree = ast.parse(fh.read(), filename=file_path)
+
+    imported = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                # 'import a.b.c' imports a, a.b and a.b.c
+                parts = alias.name.split(".")
+                imported.update(".".join(parts[:i + 1]) for i in range(len(parts)))
+        elif isinstance(node, ast.ImportFrom):
+            imported.update(_resolve_import_from(node, package))
+    return imported
+
+
+class ModuleReloader(object):
+    def __init__(self, root_path):
+        self.root_path = normalize_path(root_path)
+        self._mtimes = dict()  # module name: mtime at last reload/scan
+        self._imports = dict()  # module name: (mtime, set of imported module names)
+        self._ignored = dict()  # module name: id(module) for modules outside the root
+
+    def _is_tracked(self, module_name, module):
+        if self._ignored.get(module_name) == id(module):
+            return False
+
+        file_path = getattr(module, "__file__", None)
+        if not file_path or not file_path.endswith(".py") \
+                or not normalize_path(file_path).startswith(self.root_path + os.sep):
+            self._ignored[module_name] = id(module)
+            return False
+        return True
+
+    def get_tracked_modules(self):
+        """
+        :return: {module name: module} for loaded modules whose file lives under the root
+        """
+        return {name: module for name, module in list(sys.modules.items())
+                if module is not None and self._is_tracked(name, module)}
+
+    def _get_imports(self, module_name, module, mtime):
+        cached = self._imports.get(module_name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        package = module.__package__ if module.__package__ is not None else module_name.rpartition(".")[0]
+        try:
+            imported = read_imports(module.__file__, package)
+        except (OSError, SyntaxError, ValueError):
+            imported = set()
+        self._imports[module_name] = (mtime, imported)
+        return imported
+
+    def build_dependency_graph(self, modules):
+        """
+        :return: {module name: set of tracked module names it imports}
+        """
+        graph = dict()
+        for module_name, module in modules.items():
+            mtime = self._get_mtime(module)
+            imported = self._get_imports(module_name, module, mtime)
+            graph[module_name] = {name for name in imported if name in modules and name != module_name}
+        return graph
+
+    @staticmethod
+    def _get_mtime(module):
+        try:
+            return os.stat(module.__file__).st_mtime
+        except OSError:
+            return None
+
+    def find_changed_modules(self, modules):
+        changed = []
+        for module_name, module in modules.items():
+            mtime = self._get_mtime(module)
+            if module_name not in self._mtimes:
+                self._mtimes[module_name] = mtime  # first time we see it, this is the baseline
+            elif mtime is not None and mtime != self._mtimes[module_name]:
+                changed.append(module_name)
+        return changed
+
+    def record_new_modules(self):
+        """
+        Take the current mtime of modules imported since the last check as their baseline
+
+        Call this right after code ran, otherwise the baseline is only taken at the next check
+        and an edit made before that would never count as a change.
+        """
+        for module_name, module in self.get_tracked_modules().items():
+            if module_name not in self._mtimes:
+                self._mtimes[module_name] = self._get_mtime(module)
+
+    def reload_changed(self):
+        """
+        Reload modules that changed since the last call, and everything that depends on them
+
+        :return: ReloadReport
+        """
+        report = ReloadReport()
+        start_time = time.perf_counter()
+
+        modules = self.get_tracked_modules()
+        report.changed = self.find_changed_modules(modules)
+        if report.changed:
+            self._reload(modules, report)
+
+        report.duration = time.perf_counter() - start_time
+        return report
+
+    def _reload(self, modules, report):
+        graph = self.build_dependency_graph(modules)
+
+        dependents = {name: set() for name in graph}
+        for module_name, imported in graph.items():
+            for imported_name in imported:
+                dependents[imported_name].add(module_name)
+
+        affected = set()
+        pending = list(report.changed)
+        while pending:
+            module_name = pending.pop()
+            if module_name in affected:
+                continue
+            affected.add(module_name)
+            pending.extend(dependents[module_name])
+
+        # dependencies before the modules that import them
+        reload_order = topological_order({name: graph[name] & affected for name in affected})
+        if reload_order is None:
+            # circular imports, fall back to the order they were originally imported in
+            reload_order = [name for name in sys.modules if name in affected]
+
+        for module_name in reload_order:
+            module = sys.modules.get(module_name)
+            if module is None:
+                continue
+            try:
+                importlib.reload(module)
+                report.reloaded.append(module_name)
+            except Exception as e:
+                report.failed.append((module_name, e))
+            self._mtimes[module_name] = self._get_mtime(module)
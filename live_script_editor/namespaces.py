@@ -0,0 +1,238 @@
+"""
+Namespaces that scripts get executed in
+
+Every namespace has its own interpreter, so a tab can run in the shared namespace,
+its own private one, or a named session that several tabs share.
+"""
+import ast
+import asyncio
+import builtins
+import code
+import gc
+import inspect
+import sys
+import traceback
+import types
+
+SHARED = "shared"
+TAB = "tab"
+SESSION = "session"
+
+SHARED_NAMESPACE_NAME = "Shared"
+
+# lets code await at the top level, it then compiles to a coroutine. python 3.8+
+_compile_flags = getattr(ast, "PyCF_ALLOW_TOP_LEVEL_AWAIT", 0)
+
+# objects that belong to the interpreter rather than to the user, don't count them towards the size of a namespace
+_unowned_types = (types.ModuleType, type, types.FunctionType, types.BuiltinFunctionType, types.CodeType,
+                  types.FrameType)
+
+
+class MemoryUsage(object):
+    def __init__(self, variable_count=0, object_count=0, size=0, truncated=False):
+        self.variable_count = variable_count
+        self.object_count = object_count
+        self.size = size
+        self.truncated = truncated  # hit the object limit, real numbers are bigger
+
+    def __str__(self):
+        return "{} variables, {}{} objects, ~{}".format(
+            self.variable_count,
+            self.object_count,
+            "+" if self.truncated else "",
+            format_size(self.size),
+        )
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return "{:.1f}{}".format(size, unit)
+        size /= 1024.0
+    return "{:.1f}GB".format(size)
+
+
+def run_coroutine(coroutine):
+    """
+    Default for running code that awaits at the top level, on an event loop of its own until it's done
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class ScriptInterpreter(code.InteractiveInterpreter):
+    """
+    InteractiveInterpreter that remembers if the last thing it ran raised
+
+    :param coroutine_runner: called with the coroutine of code that awaits at the top level,
+                             runs it to the end and returns its result
+    """
+
+    def __init__(self, namespace, coroutine_runner=None):
+        super(ScriptInterpreter, self).__init__(namespace)
+        self.failed = False
+        self.coroutine_runner = coroutine_runner or run_coroutine
+        self.compile.compiler.flags |= _compile_flags  # same for single lines going through runsource
+
+    def showsyntaxerror(self, filename=None, **kwargs):
+        self.failed = True
+        super(ScriptInterpreter, self).showsyntaxerror(filename, **kwargs)
+
+    def showtraceback(self):
+        self.failed = True
+        super(ScriptInterpreter, self).showtraceback()
+
+    def run(self, source, filename=None):
+        """
+        :param source:
+        :param filename: compile the code with this file name, eg. to tell it apart when tracing
+        :return: False if the code raised
+        """
+        self.failed = False
+        if not source.count("\n"):
+            self.runsource(source, filename or "<input>")  # shows results of single line commands
+            return not self.failed
+
+        # runsource fails on multi-line, "<string>" is the name exec() would have given it
+        filename = filename or "<string>"
+        try:
+            code_object = compile(source, filename, "exec", _compile_flags)
+        except (OverflowError, SyntaxError, ValueError):
+            self.showsyntaxerror(filename)
+            return False
+        self.runcode(code_object)
+        return not self.failed
+
+    def runcode(self, code_object):
+        if not code_object.co_flags & inspect.CO_COROUTINE:
+            super(ScriptInterpreter, self).runcode(code_object)
+            return
+
+        try:
+            self.coroutine_runner(eval(code_object, self.locals))
+        except SystemExit:
+            raise
+        except BaseException:  # includes the CancelledError of a run that got cancelled
+            self.failed = True
+            exc_type, exc_value, tb = sys.exc_info()
+            # start at the script, the event loop frames in between don't help anyone
+            while tb is not None and tb.tb_frame.f_code.co_filename != code_object.co_filename:
+                tb = tb.tb_next
+            sys.last_type, sys.last_value, sys.last_traceback = exc_type, exc_value, tb
+            self.write("".join(traceback.format_exception(exc_type, exc_value, tb)))
+
+
+class ScriptNamespace(object):
+    def __init__(self, name, scope=SESSION, coroutine_runner=None):
+        self.name = name
+        self.scope = scope
+        self.globals = dict()
+        self.interp = ScriptInterpreter(self.globals, coroutine_runner)
+        self._populate()
+
+    def _populate(self):
+        self.globals.update({
+            "__name__": "__main__",
+            "__doc__": None,
+            "__builtins__": builtins,
+        })
+
+    def user_variables(self):
+        return {k: v for k, v in self.globals.items() if not (k.startswith("__") and k.endswith("__"))}
+
+    def get_memory_usage(self, object_limit=1000000):
+        """
+        Walk everything reachable from the variables in this namespace
+
+        Modules, classes and functions are skipped since they're usually owned by something else,
+        so this is an estimate of what resetting the namespace could give back.
+
+        :param object_limit: stop walking after this many objects
+        :return: MemoryUsage
+        """
+        user_variables = self.user_variables()
+        usage = MemoryUsage(variable_count=len(user_variables))
+
+        seen = {id(self.globals)}
+        pending = list(user_variables.values())
+        while pending:
+            obj = pending.pop()
+            obj_id = id(obj)
+            if obj_id in seen or isinstance(obj, _unowned_types):
+                continue
+            seen.add(obj_id)
+
+            usage.object_count += 1
+            usage.size += sys.getsizeof(obj, 0)
+            if usage.object_count >= object_limit:
+                usage.truncated = True
+                break
+
+            pending.extend(gc.get_referents(obj))
+
+        return usage
+
+    def reset(self):
+        """
+        Drop all references held by this namespace
+
+        :return: number of unreachable objects the garbage collector found
+        """
+        self.globals.clear()
+        self._populate()
+        sys.last_type = sys.last_value = sys.last_traceback = None  # tracebacks keep frames alive
+        if hasattr(sys, "last_exc"):
+            sys.last_exc = None
+        return gc.collect()
+
+
+class NamespaceManager(object):
+    """
+    Hands out namespaces for tabs depending on which scope they use
+
+    :param coroutine_runner: see ScriptInterpreter
+    """
+
+    def __init__(self, coroutine_runner=None):
+        self.coroutine_runner = coroutine_runner
+        self.shared = ScriptNamespace(SHARED_NAMESPACE_NAME, scope=SHARED, coroutine_runner=coroutine_runner)
+        self.sessions = dict()  # type: dict[str, ScriptNamespace]
+        self.tab_namespaces = dict()  # type: dict[int, ScriptNamespace]
+
+    def get_session(self, name):
+        if name not in self.sessions:
+            self.sessions[name] = ScriptNamespace(name, scope=SESSION, coroutine_runner=self.coroutine_runner)
+        return self.sessions[name]
+
+    def get_tab_namespace(self, tab_key, tab_name=""):
+        if tab_key not in self.tab_namespaces:
+            self.tab_namespaces[tab_key] = ScriptNamespace("Tab: {}".format(tab_name), scope=TAB,
+                                                           coroutine_runner=self.coroutine_runner)
+        return self.tab_namespaces[tab_key]
+
+    def get_namespace(self, scope, tab_key=None, tab_name="", session_name=None):
+        if scope == TAB:
+            return self.get_tab_namespace(tab_key, tab_name)
+        if scope == SESSION:
+            return self.get_session(session_name)
+        return self.shared
+
+    def release_tab(self, tab_key):
+        namespace = self.tab_namespaces.pop(tab_key, None)
+        if namespace is not None:
+            namespace.reset()
+
+    def all_namespaces(self):
+        namespaces = [self.shared]
+        namespaces.extend(self.sessions.values())
+        namespaces.extend(self.tab_namespaces.values())
+        return namespaces
+
+    def reset_all(self):
+        collected = 0
+        for namespace in self.all_namespaces():
+            collected += namespace.reset()
+        return collected
@@ -0,0 +1,277 @@
+"""
+Capture stdout/stderr for the console, from any thread and optionally at the file descriptor level
+
+Everything written goes into one queue. Writes from the thread that owns the capture (the GUI
+thread) are handed to on_output right away, so they stay in order with whatever else that thread
+writes to the console. Writes from other threads only queue up and call wakeup, which should
+get the owner thread to call drain(), eg. by emitting a Qt signal.
+
+With capture_fds, file descriptors 1 and 2 get pointed at pipes that a reader thread empties,
+so output of C extensions and subprocesses that inherit them shows up too.
+"""
+import codecs
+import collections
+import contextlib
+import os
+import sys
+import threading
+
+STDOUT = "stdout"
+STDERR = "stderr"
+
+
+class CaptureStream(object):
+    """
+    File-like object that goes in place of sys.stdout or sys.stderr
+    """
+
+    def __init__(self, capture, stream_name, original):
+        self.capture = capture
+        self.stream_name = stream_name
+        self.original = original
+
+    def write(self, text):
+        if text:
+            self.capture.put(self.stream_name, text)
+        return len(text)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def writable(self):
+        return True
+
+    @property
+    def encoding(self):
+        return getattr(self.original, "encoding", None) or "utf-8"
+
+    def __getattr__(self, name):
+        # fileno(), buffer and so on come from the stream that was replaced
+        return getattr(self.original, name)
+
+
+class FdRedirect(object):
+    """
+    Point a file descriptor at a pipe and pass everything that comes out of it to the capture
+
+    A child process that inherited the pipe keeps it open after stop(), so the reader thread can
+    outlive the redirect. It owns the duplicate of the original file descriptor from then on and
+    closes it once the last writer is gone, so its tee never writes to a number that got reused.
+
+    :param tee: also write it to where the file descriptor pointed before, eg. the DCC's own log
+    """
+
+    stop_timeout = 0.05  # seconds stop() waits for the reader to catch up, so the output keeps its order
+
+    def __init__(self, capture, fd, stream_name, tee=True):
+        self.capture = capture
+        self.fd = fd
+        self.stream_name = stream_name
+        self.tee = tee
+        self._saved_fd = None
+        self._read_fd = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._reader_done = False
+
+    def start(self):
+        self._saved_fd = os.dup(self.fd)
+        self._read_fd, write_fd = os.pipe()
+        os.dup2(write_fd, self.fd)
+        os.close(write_fd)  # self.fd is the only write end now, so restoring it gives the reader an EOF
+
+        self._thread = threading.Thread(target=self._read_loop, name="FdRedirect-{}".format(self.fd), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        _flush_c_streams()
+        os.dup2(self._saved_fd, self.fd)
+        self._thread.join(timeout=self.stop_timeout)  # without children holding the pipe, the EOF is right there
+        self._close_saved_fd(stopped=True)
+
+    def _close_saved_fd(self, stopped=False, reader_done=False):
+        # stop() needs it to restore the fd and the reader to tee, whoever is done last closes it
+        with self._lock:
+            self._stopped |= stopped
+            self._reader_done |= reader_done
+            if not (self._stopped and self._reader_done) or self._saved_fd is None:
+                return
+            saved_fd, self._saved_fd = self._saved_fd, None
+        os.close(saved_fd)
+
+    def _read_loop(self):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        saved_fd = self._saved_fd
+        try:
+            while True:
+                try:
+                    data = os.read(self._read_fd, 65536)
+                except OSError:
+                    break
+                if not data:
+                    break
+                if self.tee:
+                    try:
+                        os.write(saved_fd, data)
+                    except OSError:
+                        pass
+                text = decoder.decode(data)
+                if text:
+                    self.capture.put(self.stream_name, text)
+        finally:
+            os.close(self._read_fd)
+            self._close_saved_fd(reader_done=True)
+
+
+def _flush_c_streams():
+    """
+    printf() and friends buffer in the C runtime, push that out before the file descriptors get swapped back
+    """
+    try:
+        import ctypes
+        if sys.platform == "win32":
+            ctypes.cdll.msvcrt.fflush(None)
+        else:
+            ctypes.CDLL(None).fflush(None)
+    except (ImportError, OSError, AttributeError):
+        pass
+
+
+class OutputCapture(object):
+    """
+    :param on_output: called with (stream name, text) on the owner thread
+    :param wakeup: called from other threads when there's something new to drain
+    :param capture_fds: also capture file descriptors 1 and 2
+    """
+
+    def __init__(self, on_output, wakeup=None, capture_fds=False):
+        self.on_output = on_output
+        self.wakeup = wakeup
+        self.capture_fds = capture_fds
+        self.owner_thread_id = threading.get_ident()
+
+        self._queue = collections.deque()
+        self._lock = threading.Lock()
+        self._wakeup_pending = False
+        self._draining = False
+
+        self._install_count = 0
+        self._original_streams = None
+        self._fd_redirects = []
+
+    # -------------------------------------------------------------------
+    # producers, any thread
+    def put(self, stream_name, text):
+        self._queue.append((stream_name, text))
+
+        if threading.get_ident() == self.owner_thread_id:
+            self.drain()
+            return
+
+        with self._lock:
+            if self._wakeup_pending:
+                return
+            self._wakeup_pending = True
+        if self.wakeup is not None:
+            self.wakeup()
+
+    # -------------------------------------------------------------------
+    # consumer, owner thread
+    def drain(self):
+        """
+        Hand everything in the queue to on_output, with consecutive writes to the same stream joined
+        """
+        if self._draining:
+            return  # on_output printed something, it's in the queue and goes out with this drain
+        with self._lock:
+            self._wakeup_pending = False
+
+        self._draining = True
+        try:
+            while self._queue:
+                stream_name, text = self._queue.popleft()
+                parts = [text]
+                while self._queue and self._queue[0][0] == stream_name:
+                    parts.append(self._queue.popleft()[1])
+                self.on_output(stream_name, "".join(parts))
+        finally:
+            self._draining = False
+
+    # -------------------------------------------------------------------
+    # installing
+    @property
+    def installed(self):
+        return self._install_count > 0
+
+    def install(self):
+        """
+        Start capturing. Calls nest, only the last matching uninstall() stops it.
+        """
+        self._install_count += 1
+        if self._install_count > 1:
+            return
+
+        self._original_streams = (sys.stdout, sys.stderr)
+        sys.stdout = CaptureStream(self, STDOUT, sys.stdout)
+        sys.stderr = CaptureStream(self, STDERR, sys.stderr)
+
+        if self.capture_fds:
+            self._start_fd_redirects()
+
+    def uninstall(self):
+        if not self._install_count:
+            return
+        self._install_count -= 1
+        if self._install_count:
+            return
+
+        self._stop_fd_redirects()
+        sys.stdout, sys.stderr = self._original_streams
+        self._original_streams = None
+        if threading.get_ident() == self.owner_thread_id:
+            self.drain()
+
+    def set_capture_fds(self, capture_fds):
+        if capture_fds == self.capture_fds:
+            return
+        self.capture_fds = capture_fds
+        if not self.installed:
+            return
+        if capture_fds:
+            self._start_fd_redirects()
+        else:
+            self._stop_fd_redirects()
+
+    def _start_fd_redirects(self):
+        for fd, stream_name in ((1, STDOUT), (2, STDERR)):
+            fd_redirect = FdRedirect(self, fd, stream_name)
+            try:
+                fd_redirect.start()
+            except OSError as e:  # eg. no console attached on windows
+                self.put(STDERR, "Failed to capture file descriptor {}: {}\n".format(fd, e))
+                continue
+            self._fd_redirects.append(fd_redirect)
+
+    def _stop_fd_redirects(self):
+        for fd_redirect in self._fd_redirects:
+            fd_redirect.stop()
+        self._fd_redirects = []
+
+    @contextlib.contextmanager
+    def capturing(self):
+        """
+        Capture for the duration of a run. Does nothing extra if capturing is already installed.
+        """
+        self.install()
+        try:
+            yield self
+        finally:
+            self.uninstall()
@@ -0,0 +1,341 @@
+"""
+Display of expression results that doesn't choke on big objects
+
+The default sys.displayhook builds the full repr of a value, which for a list with
+millions of items takes ages and then has to be laid out by the console.
+This shows a summary and the first page of the value instead, and the rest can be paged in on demand.
+"""
+import builtins
+import collections
+import itertools
+import reprlib
+import sys
+import time
+from contextlib import contextmanager
+
+# only exactly these get paged item by item, subclasses like namedtuple or Counter have reprs of their own
+_brackets = {
+    list: ("[", "]"),
+    tuple: ("(", ")"),
+    collections.deque: ("deque([", "])"),
+    set: ("{", "}"),
+    frozenset: ("frozenset({", "})"),
+    dict: ("{", "}"),
+}
+
+# paged by slicing the value, so a huge string never gets repr'ed in one go
+_sliced_types = (str, bytes, bytearray)
+
+# types whose repr took longer than slow_repr_time, with how long it took. Their repr waits for show more.
+_slow_repr_types = dict()
+slow_repr_time = 0.5
+
+
+def _get_brackets(value):
+    return _brackets.get(type(value), ("", ""))
+
+
+def _is_pageable(value):
+    if type(value) not in _brackets:
+        return False
+    return not (type(value) is collections.deque and value.maxlen is not None)  # repr shows the maxlen
+
+
+def _get_length(value):
+    if not hasattr(type(value), "__len__"):
+        return 0
+    try:
+        return len(value)
+    except Exception:
+        return 0
+
+
+def _get_item_count(value):
+    """
+    :return: number of elements of an array by its shape, otherwise the length
+    """
+    shape = getattr(value, "shape", None)
+    if isinstance(shape, tuple) and all(isinstance(size, int) for size in shape):
+        item_count = 1
+        for size in shape:
+            item_count *= size
+        return item_count
+    return _get_length(value)
+
+
+def summarize(value):
+    """
+    Short description of a value, eg. 'list len=10000000' or 'ndarray shape=(1024, 1024) dtype=float32'
+    """
+    value_type = type(value)
+    if value_type.__module__ == "builtins":
+        parts = [value_type.__name__]
+    else:
+        parts = ["{}.{}".format(value_type.__module__, value_type.__qualname__)]
+
+    shape = getattr(value, "shape", None)
+    if isinstance(shape, tuple):
+        parts.append("shape={}".format(shape))
+        dtype = getattr(value, "dtype", None)
+        if dtype is not None:
+            parts.append("dtype={}".format(dtype))
+    elif hasattr(value_type, "__len__"):
+        try:
+            parts.append("len={}".format(len(value)))
+        except Exception:
+            pass
+
+    return " ".join(parts)
+
+
+class ResultPager(object):
+    """
+    Hands out the repr of a value a page at a time
+
+    Builtin containers are walked item by item, so a page only ever costs a page worth of work,
+    and ones that fit on a single page are shown with their plain repr. Strings and bytes are paged
+    by slicing them.
+    Anything else gets repr'ed once and the resulting string is paged. There's no stopping a repr halfway,
+    so for anything with more than max_repr_length items, or of a type whose repr was slow before,
+    that only happens once more is asked for.
+    """
+
+    line_width = 120
+
+    def __init__(self, value, page_items=200, max_chars=4000, time_limit=0.05, max_repr_length=100000):
+        self.value = value
+        self.page_items = page_items
+        self.max_chars = max_chars
+        self.time_limit = time_limit
+        self.summary = summarize(value)
+
+        # nested containers show this many items before getting cut with '...'
+        self.item_repr = reprlib.Repr()
+        self.item_repr.maxlevel = 4
+        for attr_name in ("maxtuple", "maxlist", "maxarray", "maxdict", "maxset", "maxfrozenset", "maxdeque"):
+            setattr(self.item_repr, attr_name, 50)
+        self.item_repr.maxstring = 200
+        self.item_repr.maxother = 200
+
+        self.shown_items = 0
+        self.shown_chars = 0
+        self._done = False
+        self._pending_item = None  # item that didn't fit on the last page
+
+        self._changed = False  # the container changed size between pages
+        self._sliced = type(value) in _sliced_types
+        if not _is_pageable(value):
+            self._items = None
+        elif isinstance(value, dict):
+            self._items = iter(value.items())
+        else:
+            self._items = iter(value)
+        self._text = None
+        self._repr_deferred = self._items is None and not self._sliced and \
+            (_get_item_count(value) > max_repr_length or type(value) in _slow_repr_types)
+
+    @property
+    def total_items(self):
+        if self._items is None:
+            return None
+        return len(self.value)
+
+    def has_more(self):
+        return not self._done
+
+    def remaining_description(self):
+        if self._done:
+            return ""
+        if self._items is not None:
+            return "{} of {} items shown".format(self.shown_items, self.total_items)
+        if self._sliced:
+            return "{} of {} characters shown".format(self.shown_chars, len(self.value))
+        if self._text is None and not self._repr_deferred:
+            if type(self.value) in _slow_repr_types:
+                return "repr took {:.1f}s last time, show more to build it".format(_slow_repr_types[type(self.value)])
+            return "repr of {} items not built yet, show more to build it".format(_get_item_count(self.value))
+        return "{} of {} characters shown".format(self.shown_chars, len(self._get_text()))
+
+    def _get_text(self):
+        if self._text is None:
+            start_time = time.perf_counter()
+            self._text = repr(self.value)
+            duration = time.perf_counter() - start_time
+            if duration > slow_repr_time:
+                _slow_repr_types[type(self.value)] = duration
+            else:
+                _slow_repr_types.pop(type(self.value), None)
+        return self._text
+
+    def _format_item(self, item):
+        if isinstance(self.value, dict):
+            return "{}: {}".format(self.item_repr.repr(item[0]), self.item_repr.repr(item[1]))
+        return self.item_repr.repr(item)
+
+    def next_page(self):
+        """
+        :return: text of the next page, empty string when everything has been shown
+        """
+        if self._done:
+            return ""
+
+        if self._sliced:
+            if not self.shown_chars and len(self.value) <= self.max_chars:
+                self._done = True
+                return repr(self.value)
+            # every page is a literal of its own, next to each other they still make the whole value
+            page = repr(self.value[self.shown_chars:self.shown_chars + self.max_chars])
+            self.shown_chars += self.max_chars
+            self._done = self.shown_chars >= len(self.value)
+            return page
+
+        if self._items is None:
+            if self._repr_deferred:
+                self._repr_deferred = False  # first page is only the summary
+                return ""
+            text = self._get_text()
+            page = text[self.shown_chars:self.shown_chars + self.max_chars]
+            self.shown_chars += len(page)
+            self._done = self.shown_chars >= len(text)
+            return page
+
+        opening, closing = _get_brackets(self.value)
+        item_texts = []
+        char_count = 0
+        deadline = time.perf_counter() + self.time_limit
+
+        items = self._items
+        if self._pending_item is not None:
+            items = itertools.chain([self._pending_item], items)
+            self._pending_item = None
+
+        try:
+            for item in items:
+                item_text = self._format_item(item)
+                if item_texts and (char_count + len(item_text) > self.max_chars or time.perf_counter() > deadline):
+                    self._pending_item = item
+                    break
+
+                item_texts.append(item_text)
+                char_count += len(item_text)
+                self.shown_items += 1
+                if len(item_texts) >= self.page_items:
+                    break
+        except RuntimeError:
+            # dicts, sets and deques refuse to go on iterating once they changed size
+            self._changed = True
+            self._done = True
+            self._pending_item = None
+
+        if not self._changed and self._pending_item is None and self.shown_items >= self.total_items:
+            self._done = True
+
+            # all of it fit on the first page and nothing got cut, so the real repr is about as cheap
+            item_text_length = sum(len(item_text) for item_text in item_texts)
+            if self.shown_items == len(item_texts) and item_text_length <= self.max_chars and \
+                    not any("..." in item_text for item_text in item_texts):
+                text = repr(self.value)
+                if len(text) <= self.max_chars:
+                    return text
+
+        # wrap the items into lines
+        lines = [opening if self.shown_items == len(item_texts) else ""]
+        for item_text in item_texts:
+            if len(lines[-1]) > 1 and len(lines[-1]) + len(item_text) > self.line_width:
+                lines.append("")
+            lines[-1] += item_text + ", "
+
+        text = "\n".join(line.rstrip() for line in lines).rstrip(",")
+        if self._changed:
+            text += "\n# ... {} changed while being shown, run it again to see the rest".format(
+                type(self.value).__name__)
+        elif self._done:
+            if isinstance(self.value, tuple) and self.shown_items == 1:
+                text += ","
+            text += closing
+        else:
+            text += ","
+        return text
+
+    def write_to_file(self, file_path):
+        """
+        Write the full repr of the value, item by item so the whole string never has to exist in memory
+        """
+        with open(file_path, "w") as fh:
+            if self._items is None:
+                fh.write(repr(self.value) if self._sliced else self._get_text())
+                return
+
+            opening, closing = _get_brackets(self.value)
+            fh.write(opening + "\n")
+            if isinstance(self.value, dict):
+                for key, value in self.value.items():
+                    fh.write("    {!r}: {!r},\n".format(key, value))
+            else:
+                for item in self.value:
+                    fh.write("    {!r},\n".format(item))
+            fh.write(closing + "\n")
+
+
+class ResultRenderer(object):
+    """
+    sys.displayhook replacement that writes a summary and the first page of a result
+
+    :param write_func: called with the text to show
+    """
+
+    def __init__(self, write_func, page_items=200, max_chars=4000, time_limit=0.05, max_repr_length=100000):
+        self.write_func = write_func
+        self.page_items = page_items
+        self.max_chars = max_chars
+        self.time_limit = time_limit
+        self.max_repr_length = max_repr_length
+        self.last_pager = None  # type: ResultPager
+
+    def displayhook(self, value):
+        if value is None:
+            return
+        builtins._ = None  # same dance as the default displayhook
+        self.render(value)
+        builtins._ = value
+
+    def render(self, value):
+        pager = ResultPager(value, page_items=self.page_items, max_chars=self.max_chars, time_limit=self.time_limit,
+                            max_repr_length=self.max_repr_length)
+        text = pager.next_page()
+        self.last_pager = pager  # kept around for show_more and saving to file
+
+        if pager.has_more():
+            lines = ["# " + pager.summary, text, "# ... " + pager.remaining_description()]
+            self.write_func("\n".join(line for line in lines if line))
+        else:
+            self.write_func(text)
+        return pager
+
+    def show_more(self):
+        """
+        :return: False if there was nothing left to show
+        """
+        pager = self.last_pager
+        if pager is None or not pager.has_more():
+            return False
+
+        text = pager.next_page()
+        if pager.has_more():
+            text += "\n# ... {}".format(pager.remaining_description())
+        self.write_func(text)
+        return True
+
+    def clear(self):
+        if self.last_pager is not None and getattr(builtins, "_", None) is self.last_pager.value:
+            builtins._ = None
+        self.last_pager = None
+
+    @contextmanager
+    def installed(self):
+        orig_displayhook = sys.displayhook
+        sys.displayhook = self.displayhook
+        try:
+            yield self
+        finally:
+            sys.displayhook = orig_displayhook
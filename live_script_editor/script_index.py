@@ -0,0 +1,258 @@
+"""
+Listings of every directory under a script folder, made on a thread pool and cached on disk
+
+On startup the cached listings show up straight away, then every directory gets checked again in
+the background. Only directories whose modification time changed get listed again, so on a network
+share a launch costs one stat per directory instead of listing everything from scratch.
+
+Listings keep all entries. Which files show up is decided when they're displayed, so changing the
+file patterns doesn't need anything listed again.
+"""
+import fnmatch
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+_cache_version = 1
+
+
+class DirectoryListing(object):
+    def __init__(self, path, mtime, entries):
+        self.path = path  # "/" separated
+        self.mtime = mtime  # of the directory, changes when entries get added, removed or renamed
+        self.entries = entries  # [(name, is_dir)] folders first, then by name
+
+    @property
+    def folder_names(self):
+        return [name for name, is_dir in self.entries if is_dir]
+
+
+def normalize_path(path):
+    return os.path.abspath(path).replace("\\", "/")
+
+
+def join_path(folder_path, name):
+    return "{}/{}".format(folder_path.rstrip("/"), name)
+
+
+def compile_patterns(patterns):
+    """
+    :param patterns: ';' separated fnmatch patterns, eg. "*.py;*.pyw"
+    :return: compiled regex that matches file names, ignoring case
+    """
+    patterns = [p.strip() for p in patterns.split(";") if p.strip()] or ["*"]
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns), re.IGNORECASE)
+
+
+def list_directory(path):
+    """
+    :return: [(name, is_dir)] folders first, then by name
+    """
+    entries = []
+    with os.scandir(path) as dir_entries:
+        for entry in dir_entries:
+            try:
+                is_dir = entry.is_dir()  # comes with the listing on windows and most unix file systems, no extra stat
+            except OSError:
+                is_dir = False
+            entries.append((entry.name, is_dir))
+    entries.sort(key=lambda e: (not e[1], e[0].lower()))
+    return entries
+
+
+class ScriptIndex(object):
+    """
+    :param root_path: folder to index
+    :param cache_path: json file the listings get saved to and loaded from, None to not cache them
+    :param worker_count: how many directories get listed at the same time
+    :param on_listing: called from a worker thread with the path of every directory whose listing changed
+    """
+
+    def __init__(self, root_path, cache_path=None, worker_count=8, on_listing=None):
+        self.root_path = normalize_path(root_path)
+        self.cache_path = cache_path
+        self.on_listing = on_listing
+        self.dirty = False  # listings changed since the cache was saved
+
+        self._listings = dict()  # type: dict[str, DirectoryListing]
+        self._pending = dict()  # path waiting for or being listed: whether to go on into its folders
+        self._lock = threading.Lock()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="ScriptIndex")
+
+    def get_listing(self, path):
+        """
+        :rtype: DirectoryListing or None
+        """
+        with self._lock:
+            return self._listings.get(path)
+
+    @property
+    def is_busy(self):
+        with self._lock:
+            return bool(self._pending)
+
+    # -------------------------------------------------------------------
+    # listing
+    def refresh(self, path=None, recursive=True):
+        """
+        Check a directory in the background, and list it again if it changed
+
+        :param path: defaults to the root
+        :param recursive: also check every folder under it
+        """
+        path = path or self.root_path
+        with self._lock:
+            if self._closed:
+                return
+            if path in self._pending:
+                self._pending[path] = self._pending[path] or recursive
+                return
+            self._pending[path] = recursive
+        self._executor.submit(self._refresh, path)
+
+    def _refresh(self, path):
+        if self._closed:
+            return
+        listing = self.get_listing(path)
+        changed = False
+        try:
+            mtime = os.stat(path).st_mtime
+            if listing is None or listing.mtime != mtime:
+                entries = list_directory(path)
+                changed = listing is None or listing.entries != entries
+                listing = DirectoryListing(path, mtime, entries)
+        except OSError as e:
+            # gone, or no access anymore
+            log.debug("Failed to list {}: {}".format(path, e))
+            changed = listing is not None
+            listing = None
+        except Exception:
+            log.exception("Failed to list {}".format(path))
+            listing = None
+
+        if changed:
+            self._set_listing(path, listing)
+
+        with self._lock:
+            recursive = self._pending.get(path, False)
+        try:
+            if self._closed:
+                return
+            if changed and self.on_listing is not None:
+                self.on_listing(path)
+            if recursive and listing is not None:
+                for folder_name in listing.folder_names:
+                    self.refresh(join_path(path, folder_name), recursive=True)
+        finally:
+            # only done once its folders are pending, so is_busy doesn't go False in between
+            with self._lock:
+                self._pending.pop(path, None)
+
+    def _set_listing(self, path, listing):
+        with self._lock:
+            previous = self._listings.pop(path, None)
+            if listing is not None:
+                self._listings[path] = listing
+            self.dirty = True
+
+            # folders that are gone take their listings with them
+            removed_folders = set(previous.folder_names if previous else [])
+            removed_folders.difference_update(listing.folder_names if listing else [])
+            for folder_name in removed_folders:
+                prefix = join_path(path, folder_name)
+                for listed_path in [p for p in self._listings if p == prefix or p.startswith(prefix + "/")]:
+                    del self._listings[listed_path]
+
+    # -------------------------------------------------------------------
+    # searching
+    def search(self, text, patterns=None, limit=500):
+        """
+        Files in the listings so far whose path (relative to the root) contains all words of text
+
+        :param text: words to look for, case doesn't matter
+        :param patterns: regex from compile_patterns(), only files matching it
+        :param limit:
+        :return: [file path] sorted by relative path
+        """
+        words = text.lower().split()
+        with self._lock:
+            listings = list(self._listings.values())
+
+        root_length = len(self.root_path.rstrip("/")) + 1
+        results = []
+        for listing in listings:
+            folder_path = listing.path
+            relative_folder = folder_path[root_length:].lower()
+            for name, is_dir in listing.entries:
+                if is_dir or (patterns is not None and not patterns.match(name)):
+                    continue
+                relative_path = "{}/{}".format(relative_folder, name.lower()) if relative_folder else name.lower()
+                if all(word in relative_path for word in words):
+                    results.append((relative_path, join_path(folder_path, name)))
+
+        results.sort()
+        return [file_path for relative_path, file_path in results[:limit]]
+
+    # -------------------------------------------------------------------
+    # cache
+    def load_cache(self):
+        """
+        :return: whether there was a cache for this root
+        """
+        if not self.cache_path or not os.path.isfile(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, "r") as fp:
+                data = json.load(fp)
+        except (IOError, OSError, ValueError) as e:
+            log.warning("Failed to read script tree cache {}: {}".format(self.cache_path, e))
+            return False
+        if data.get("version") != _cache_version or data.get("root") != self.root_path:
+            return False
+
+        listings = dict()
+        for relative_path, (mtime, entries) in data["listings"].items():
+            path = join_path(self.root_path, relative_path) if relative_path else self.root_path
+            listings[path] = DirectoryListing(path, mtime, [(name, bool(is_dir)) for name, is_dir in entries])
+        with self._lock:
+            self._listings.update(listings)
+        return True
+
+    def save_cache(self):
+        if not self.cache_path:
+            return
+        root_length = len(self.root_path.rstrip("/")) + 1
+        with self._lock:
+            listings = dict()
+            for path, listing in self._listings.items():
+                relative_path = path[root_length:] if path != self.root_path else ""
+                listings[relative_path] = (listing.mtime, listing.entries)
+            self.dirty = False
+
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        # write next to it and swap, so a crash halfway doesn't leave a broken cache
+        temp_path = self.cache_path + ".tmp"
+        try:
+            with open(temp_path, "w") as fp:
+                json.dump({"version": _cache_version, "root": self.root_path, "listings": listings}, fp)
+            os.replace(temp_path, self.cache_path)
+        except (IOError, OSError) as e:
+            log.warning("Failed to write script tree cache {}: {}".format(self.cache_path, e))
+
+    def close(self):
+        """
+        Stop listing, whatever is still queued gets dropped
+        """
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,467 @@
+"""
+Syntax errors, undefined names and unused imports for a script, without running it
+
+The script is split into top level regions (a def, a class, a block of statements) and each
+region is compiled and analysed on its own. Tokenizing the script finds the lines that continue a
+statement (inside brackets, strings or after a backslash), so a region never gets cut in the middle
+of one. After an edit only the part from the statement before the edit up to the first statement
+after it that starts the same way as last time gets tokenized again. The results are cached by
+region text, so only the regions that changed get looked at again. The cross-region part (which names
+exist at module level, which imports get used) is just set operations over the cached results.
+"""
+import ast
+import bisect
+import builtins
+import re
+import threading
+import tokenize
+
+ERROR = "error"
+WARNING = "warning"
+
+# col 0 lines that can't start a new region because they continue the previous one
+_region_start_re = re.compile(r"^(?!(else|elif|except|finally|case)\b|[\s#)\]}@]|$)")
+_decorator_re = re.compile(r"^@")
+
+# same as the interpreter the scripts run in, so top level await isn't an error where it works. python 3.8+
+_compile_flags = getattr(ast, "PyCF_ALLOW_TOP_LEVEL_AWAIT", 0)
+
+_layout_tokens = (tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.COMMENT,
+                  tokenize.ENDMARKER)
+
+_match_as = getattr(ast, "MatchAs", ())  # python 3.10+
+
+_builtin_names = set(dir(builtins)) | {"__file__", "__name__", "__doc__", "__builtins__", "__spec__",
+                                       "__loader__", "__package__", "__annotations__"}
+
+
+class Diagnostic(object):
+    def __init__(self, line, col, length, message, severity=WARNING):
+        self.line = line  # 0 based, same as QTextBlock.blockNumber()
+        self.col = col
+        self.length = length  # 0 means to the end of the line
+        self.message = message
+        self.severity = severity
+
+    def offset(self, line_offset):
+        return Diagnostic(self.line + line_offset, self.col, self.length, self.message, self.severity)
+
+    def __repr__(self):
+        return "Diagnostic({}:{} {} {!r})".format(self.line + 1, self.col, self.severity, self.message)
+
+
+class RegionResult(object):
+    """
+    Everything about one region that doesn't depend on the rest of the script. Lines are relative to the region.
+    """
+
+    def __init__(self):
+        self.errors = []  # [Diagnostic]
+        self.bindings = set()  # names bound at module level
+        self.imports = []  # [(name, line, col)] module level imports
+        self.loads = set()  # every name that gets read anywhere in the region
+        self.unresolved = []  # [(name, line, col)] reads that aren't bound in any enclosing function/comprehension
+        self.star_import = False
+
+
+def scan_statements(lines, start_line=0, stop_at=None):
+    """
+    Tokenize the lines from start_line on to find the lines that continue a statement
+
+    A bracket or string that is never closed doesn't count, the lines after it are left to the
+    region split so the rest of the script still gets checked while the error is being typed.
+
+    :param lines: lines of the script
+    :param start_line: has to be 0 or a line from the returned statement starts, the tokenizer starts out fresh there
+    :param stop_at: called with the line of every statement start, the scan stops before it if it returns True
+    :return: (continuation lines, statement starts, line the scan stopped at or None if it got to the end).
+             Statement starts are lines where a statement begins at column 0 outside of any bracket or string.
+    """
+    continuation_lines = set()
+    statement_starts = set()
+    statement_start = None  # line the current statement started on
+    statement_lines = set()  # continuation lines of the current statement
+    bracket_depth = 0  # a stray closing bracket leaves some tokenizers in a state a fresh start isn't in
+    line_iter = iter(range(start_line, len(lines)))
+
+    def readline():
+        for i in line_iter:
+            return lines[i] + "\n"
+        return ""
+
+    try:
+        for token in tokenize.generate_tokens(readline):
+            start, end = token.start[0] - 1 + start_line, token.end[0] - 1 + start_line
+            if token.type == tokenize.NEWLINE or (token.type == tokenize.NL and statement_start is None):
+                continuation_lines |= statement_lines
+                statement_start = None
+                statement_lines = set()
+                continue
+
+            if statement_start is None:
+                if token.type in _layout_tokens:
+                    continue
+                statement_start = start
+                if token.start[1] == 0 and bracket_depth >= 0:
+                    if start != start_line and stop_at is not None and stop_at(start):
+                        return continuation_lines, statement_starts, start
+                    statement_starts.add(start)
+            elif start > statement_start:
+                statement_lines.add(start)
+            statement_lines.update(range(start + 1, end + 1))  # multi-line strings
+
+            if token.type == tokenize.OP and token.string in "([{)]}":
+                bracket_depth += 1 if token.string in "([{" else -1
+    except (tokenize.TokenError, SyntaxError):
+        pass  # EOF inside the statement that's still pending, or something the parser will report
+    return continuation_lines, statement_starts, None
+
+
+def get_continuation_lines(text):
+    """
+    :param text: full script
+    :return: set of 0 based line numbers that continue the statement of a line above them
+    """
+    return scan_statements(text.split("\n"))[0]
+
+
+def split_regions(lines, continuation_lines=None):
+    """
+    :param lines: lines of the script
+    :param continuation_lines: from scan_statements(), found here if not given
+    :return: list of (start_line, end_line) tuples, end exclusive
+    """
+    if continuation_lines is None:
+        continuation_lines = scan_statements(lines)[0]
+
+    starts = []
+    pending_decorator = None
+    for i, line in enumerate(lines):
+        if i in continuation_lines:
+            continue
+
+        if _decorator_re.match(line):
+            if pending_decorator is None:
+                pending_decorator = i
+            continue
+
+        if _region_start_re.match(line):
+            starts.append(pending_decorator if pending_decorator is not None else i)
+        pending_decorator = None
+
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+
+    ends = starts[1:] + [len(lines)]
+    return list(zip(starts, ends))
+
+
+class _ScopeVisitor(ast.NodeVisitor):
+    """
+    Small scope aware walk, enough to tell if a name read inside a function is bound somewhere local
+    """
+
+    def __init__(self, result):
+        self.result = result
+        self.scopes = []  # stack of sets of names bound in function like scopes
+
+    # -- binding helpers
+    def _bind(self, name):
+        if self.scopes:
+            self.scopes[-1].add(name)
+        else:
+            self.result.bindings.add(name)
+
+    def _is_bound_locally(self, name):
+        return any(name in scope for scope in self.scopes)
+
+    @staticmethod
+    def _collect_bound_names(nodes):
+        """
+        Names a function body binds, without going into nested functions or classes
+        """
+        names = set()
+        pending = list(nodes)
+        while pending:
+            node = pending.pop()
+            if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+                names.add(node.id)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                names.add(node.name)
+                pending.extend(node.decorator_list)
+                continue
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                for alias in node.names:
+                    names.add((alias.asname or alias.name).split(".")[0])
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                names.update(node.names)
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                names.add(node.name)
+            elif isinstance(node, ast.arg):
+                names.add(node.arg)
+            elif isinstance(node, _match_as) and node.name:
+                names.add(node.name)
+            elif isinstance(node, ast.Lambda):
+                continue
+            pending.extend(ast.iter_child_nodes(node))
+        return names
+
+    # -- scopes
+    def _visit_function(self, node, body):
+        for decorator in getattr(node, "decorator_list", []):
+            self.visit(decorator)
+        for default in node.args.defaults + [d for d in node.args.kw_defaults if d is not None]:
+            self.visit(default)
+
+        scope = set(a.arg for a in node.args.args + node.args.kwonlyargs + getattr(node.args, "posonlyargs", []))
+        if node.args.vararg:
+            scope.add(node.args.vararg.arg)
+        if node.args.kwarg:
+            scope.add(node.args.kwarg.arg)
+        scope |= self._collect_bound_names(body if isinstance(body, list) else [body])
+
+        self.scopes.append(scope)
+        for child in (body if isinstance(body, list) else [body]):
+            self.visit(child)
+        self.scopes.pop()
+
+    def visit_FunctionDef(self, node):
+        self._bind(node.name)
+        self._visit_function(node, node.body)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node):
+        self._visit_function(node, node.body)
+
+    def visit_ClassDef(self, node):
+        self._bind(node.name)
+        for child in node.decorator_list + node.bases + [k.value for k in node.keywords]:
+            self.visit(child)
+        # class body names are visible inside the class body only, treat it like a function scope
+        self.scopes.append(self._collect_bound_names(node.body))
+        for child in node.body:
+            self.visit(child)
+        self.scopes.pop()
+
+    def _visit_comprehension(self, node):
+        scope = set()
+        for generator in node.generators:
+            scope |= self._collect_bound_names([generator.target])
+        self.visit(node.generators[0].iter)  # the first iterable is evaluated in the enclosing scope
+        self.scopes.append(scope)
+        for i, generator in enumerate(node.generators):
+            if i:
+                self.visit(generator.iter)
+            for condition in generator.ifs:
+                self.visit(condition)
+        for field in ("elt", "key", "value"):
+            if hasattr(node, field):
+                self.visit(getattr(node, field))
+        self.scopes.pop()
+
+    visit_ListComp = visit_SetComp = visit_GeneratorExp = visit_DictComp = _visit_comprehension
+
+    # -- names
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.result.loads.add(node.id)
+            if not self._is_bound_locally(node.id):
+                self.result.unresolved.append((node.id, node.lineno - 1, node.col_offset))
+        else:
+            self._bind(node.id)
+
+    def visit_Global(self, node):
+        self.result.bindings.update(node.names)  # assigning to a global from a function still defines it
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            name = (alias.asname or alias.name).split(".")[0]
+            self._bind(name)
+            if not self.scopes:
+                self.result.imports.append((name, node.lineno - 1, node.col_offset))
+
+    def visit_ImportFrom(self, node):
+        for alias in node.names:
+            if alias.name == "*":
+                self.result.star_import = True
+                continue
+            name = alias.asname or alias.name
+            self._bind(name)
+            if not self.scopes and node.module != "__future__":
+                self.result.imports.append((name, node.lineno - 1, node.col_offset))
+
+    def visit_ExceptHandler(self, node):
+        if node.name:
+            self._bind(node.name)
+        self.generic_visit(node)
+
+
+def analyse_region(text):
+    """
+    :param text: source of one region
+    :return: RegionResult
+    """
+    result = RegionResult()
+    try:
+        tree = ast.parse(text)
+    except SyntaxError as e:
+        result.errors.append(_syntax_error_diagnostic(e))
+        return result
+    except ValueError as e:  # null bytes and such
+        result.errors.append(Diagnostic(0, 0, 1, str(e), ERROR))
+        return result
+
+    # parsing alone lets 'return' or 'break' outside of where they belong through, compiling catches them
+    try:
+        compile(tree, "<region>", "exec", _compile_flags)
+    except SyntaxError as e:
+        result.errors.append(_syntax_error_diagnostic(e))
+    except ValueError:
+        pass
+
+    _ScopeVisitor(result).visit(tree)
+
+    # names listed in __all__ count as used
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets):
+            if isinstance(node.value, (ast.List, ast.Tuple)):
+                result.loads.update(e.value for e in node.value.elts if isinstance(e, ast.Constant))
+    return result
+
+
+def _syntax_error_diagnostic(error):
+    line = max((error.lineno or 1) - 1, 0)
+    col = max((error.offset or 1) - 1, 0)
+    return Diagnostic(line, col, 1, "SyntaxError: {}".format(error.msg), ERROR)
+
+
+class SyntaxChecker(object):
+    """
+    Keeps the per-region cache for one script. check() is meant to be called from a worker thread,
+    only one check per checker runs at a time.
+    """
+
+    def __init__(self):
+        self._cache = dict()  # region text: RegionResult
+        self._lock = threading.Lock()
+        self.last_checked_region_count = 0  # how many regions actually had to be analysed last time
+        self.last_scanned_line_count = 0  # how many lines had to be tokenized last time
+
+        # scan of the last checked text, see scan_statements()
+        self._lines = None
+        self._continuation_lines = set()
+        self._statement_starts = []  # sorted
+
+    def check(self, text, known_names=()):
+        """
+        :param text: full script
+        :param known_names: names that exist at runtime already (namespace the script runs in)
+        :return: list of Diagnostic
+        """
+        with self._lock:
+            return self._check(text, set(known_names))
+
+    def _check(self, text, known_names):
+        lines = text.split("\n")
+        regions = split_regions(lines, self._update_scan(lines))
+
+        new_cache = dict()
+        region_results = []  # [(line offset, RegionResult)]
+        self.last_checked_region_count = 0
+
+        for start, end in regions:
+            region_text = "\n".join(lines[start:end])
+            result = self._cache.get(region_text) or new_cache.get(region_text)
+            if result is None:
+                result = analyse_region(region_text)
+                self.last_checked_region_count += 1
+            new_cache[region_text] = result
+            region_results.append((start, result))
+
+        self._cache = new_cache
+        return self._combine(region_results, known_names)
+
+    def _update_scan(self, lines):
+        """
+        Tokenize only the part of the script that changed since the last check
+
+        :return: continuation lines of the whole script
+        """
+        old_lines = self._lines
+        if old_lines is None:
+            continuation_lines, statement_starts, _ = scan_statements(lines)
+            self.last_scanned_line_count = len(lines)
+            self._store_scan(lines, continuation_lines, statement_starts)
+            return continuation_lines
+
+        # the lines that differ, between what's the same at the start and at the end
+        max_common = min(len(lines), len(old_lines))
+        prefix = 0
+        while prefix < max_common and lines[prefix] == old_lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < max_common - prefix and lines[-1 - suffix] == old_lines[-1 - suffix]:
+            suffix += 1
+        if prefix == len(lines) == len(old_lines):
+            self.last_scanned_line_count = 0
+            return self._continuation_lines
+
+        # start at the last statement before the edited line, nothing before it can change
+        old_starts = self._statement_starts
+        start_index = bisect.bisect_left(old_starts, prefix) - 1
+        start_line = old_starts[start_index] if start_index >= 0 else 0
+
+        # and stop at the first statement after it that started a statement last time as well,
+        # from there on it's the same text tokenized from the same state
+        line_shift = len(lines) - len(old_lines)
+        change_end = len(lines) - suffix
+        old_start_set = set(old_starts)
+        scanned_lines, scanned_starts, stop_line = scan_statements(
+            lines, start_line, lambda line: line >= change_end and line - line_shift in old_start_set)
+
+        continuation_lines = set(line for line in self._continuation_lines if line < start_line)
+        continuation_lines |= scanned_lines
+        statement_starts = set(old_starts[:max(start_index, 0)])
+        statement_starts |= scanned_starts
+        if stop_line is not None:
+            old_stop_line = stop_line - line_shift
+            continuation_lines.update(line + line_shift for line in self._continuation_lines if line > old_stop_line)
+            statement_starts.update(line + line_shift for line in old_starts[bisect.bisect_left(old_starts,
+                                                                                                old_stop_line):])
+        self.last_scanned_line_count = (stop_line if stop_line is not None else len(lines)) - start_line
+        self._store_scan(lines, continuation_lines, statement_starts)
+        return continuation_lines
+
+    def _store_scan(self, lines, continuation_lines, statement_starts):
+        self._lines = lines
+        self._continuation_lines = continuation_lines
+        self._statement_starts = sorted(statement_starts)
+
+    @staticmethod
+    def _combine(region_results, known_names):
+        diagnostics = []
+        module_bindings = set(known_names) | _builtin_names
+        all_loads = set()
+        star_import = False
+        for offset, result in region_results:
+            module_bindings |= result.bindings
+            all_loads |= result.loads
+            star_import |= result.star_import
+
+        for offset, result in region_results:
+            diagnostics.extend(error.offset(offset) for error in result.errors)
+
+            if not star_import:
+                for name, line, col in result.unresolved:
+                    if name not in module_bindings:
+                        diagnostics.append(Diagnostic(
+                            line + offset, col, len(name), "Undefined name '{}'".format(name), ERROR))
+
+            for name, line, col in result.imports:
+                if name not in all_loads:
+                    diagnostics.append(Diagnostic(
+                        line + offset, col, 0, "'{}' imported but unused".format(name), WARNING))
+
+        diagnostics.sort(key=lambda d: (d.line, d.col))
+        return diagnostics
@@ -0,0 +1,51 @@
+"""
+Smallest set of line ranges that turn one version of a script into another
+
+Used to apply a file that changed on disk to the editor as a few edits instead of replacing
+the whole text, so undo history, cursor and scroll position survive and only the changed
+lines get highlighted again.
+"""
+import difflib
+
+
+class LineChange(object):
+    def __init__(self, start, end, lines):
+        self.start = start  # first line of the old text that gets replaced, 0 based
+        self.end = end  # exclusive, same as start for a pure insert
+        self.lines = lines  # new lines that go in their place, empty for a pure delete
+
+    def __repr__(self):
+        return "LineChange({}-{} -> {} lines)".format(self.start, self.end, len(self.lines))
+
+
+def get_line_changes(old_lines, new_lines):
+    """
+    :param old_lines: text split on "\\n"
+    :param new_lines:
+    :return: list of LineChange in order of start line
+    """
+    # a reload usually changes a few lines somewhere in the middle, so strip what's equal at both
+    # ends before handing the rest to difflib, which is a lot slower on long inputs
+    prefix = 0
+    max_prefix = min(len(old_lines), len(new_lines))
+    while prefix < max_prefix and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+
+    suffix = 0
+    max_suffix = max_prefix - prefix
+    while suffix < max_suffix and old_lines[-1 - suffix] == new_lines[-1 - suffix]:
+        suffix += 1
+
+    old_middle = old_lines[prefix:len(old_lines) - suffix]
+    new_middle = new_lines[prefix:len(new_lines) - suffix]
+    if not old_middle and not new_middle:
+        return []
+
+    matcher = difflib.SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+    changes = []
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        changes.append(LineChange(prefix + old_start, prefix + old_end, new_middle[new_start:new_end]))
+    return changes
+
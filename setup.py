@@ -14,7 +14,7 @@ setup(name='live-script-editor',
           "Qt.py"
       ],
 
-      packages=find_packages(),
+      packages=find_packages(exclude=["tests", "tests.*"]),
 
       package_data={'': ['*.*']},
       include_package_data=True,
@@ -0,0 +1,176 @@
+import asyncio
+import socket
+import sys
+import time
+import unittest
+
+from live_script_editor import async_tasks
+from live_script_editor import namespaces
+
+
+class EventLoopDriverTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.errors = []
+        self.driver = async_tasks.EventLoopDriver(on_error=self.errors.append)
+        self.addCleanup(self.driver.close)
+
+    def run_until_idle(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while self.driver.has_work():
+            self.assertLess(time.monotonic(), deadline, "tasks still running")
+            self.driver.run_once()
+
+    def test_current_loop_restored(self):
+        previous_loop = asyncio.new_event_loop()
+        self.addCleanup(previous_loop.close)
+        asyncio.set_event_loop(previous_loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+
+        found_loops = []
+
+        async def find_loop():
+            found_loops.append(asyncio.get_event_loop())
+
+        self.assertIs(asyncio.get_event_loop(), previous_loop)  # creating the driver left it alone
+        with self.driver.activated():
+            # what a script run does: schedule on the current loop without waiting
+            asyncio.ensure_future(find_loop())
+            self.assertIs(asyncio.get_event_loop(), self.driver.loop)
+        self.assertIs(asyncio.get_event_loop(), previous_loop)
+
+        self.run_until_idle()
+        self.assertEqual(found_loops, [self.driver.loop])
+        self.assertIs(asyncio.get_event_loop(), previous_loop)
+
+        self.driver.close()
+        self.assertIs(asyncio.get_event_loop(), previous_loop)
+
+    def test_tasks(self):
+        async def sleep_then(result):
+            await asyncio.sleep(0.01)
+            return result
+
+        async def fail():
+            raise ValueError("nope")
+
+        with self.driver.started_from("tab 1"):
+            done_task = self.driver.loop.create_task(sleep_then(1))
+            failed_task = self.driver.loop.create_task(fail())
+        cancelled_task = self.driver.loop.create_task(sleep_then(2))
+        self.assertEqual(self.driver.get_info(done_task).origin, "tab 1")
+        self.assertEqual(self.driver.get_info(cancelled_task).origin, "")
+        self.assertEqual(async_tasks.get_task_state(done_task), async_tasks.RUNNING)
+
+        self.driver.run_once()
+        cancelled_task.cancel()
+        self.run_until_idle()
+
+        self.assertEqual(async_tasks.get_task_state(done_task), async_tasks.DONE)
+        self.assertEqual(async_tasks.get_task_state(failed_task), async_tasks.FAILED)
+        self.assertEqual(async_tasks.get_task_state(cancelled_task), async_tasks.CANCELLED)
+        self.assertEqual(len(self.errors), 1)
+        self.assertIn("ValueError: nope", self.errors[0])
+        self.assertEqual(set(self.driver.get_tasks()), {done_task, failed_task, cancelled_task})
+
+    def test_run_task_errors_not_reported(self):
+        async def fail():
+            raise ValueError("nope")
+
+        task = self.driver.create_run_task(fail())
+        self.run_until_idle()
+        self.assertIsInstance(task.exception(), ValueError)
+        self.assertEqual(self.errors, [])
+
+    def test_close_cancels(self):
+        async def forever():
+            await asyncio.sleep(1000)
+
+        task = self.driver.loop.create_task(forever())
+        self.driver.run_once()
+        self.driver.close()
+        self.assertTrue(task.cancelled())
+        self.assertTrue(self.driver.loop.is_closed())
+        self.assertFalse(self.driver.has_work())
+
+    def test_next_timeout(self):
+        self.assertIsNone(self.driver.get_next_timeout())
+        self.assertFalse(self.driver.is_due())
+
+        async def sleep():
+            await asyncio.sleep(1000)
+
+        task = self.driver.loop.create_task(sleep())
+        self.assertEqual(self.driver.get_next_timeout(), 0.0)  # the task's first step is ready
+        self.assertTrue(self.driver.is_due())
+
+        self.driver.run_once()
+        self.assertGreater(self.driver.get_next_timeout(), 900)
+        self.assertFalse(self.driver.is_due())
+
+        soon = self.driver.loop.call_later(0.5, lambda: None)
+        self.assertLessEqual(self.driver.get_next_timeout(), 0.5)
+        soon.cancel()
+        self.assertGreater(self.driver.get_next_timeout(), 900)  # cancelled timers don't count
+
+        task.cancel()
+        self.run_until_idle()
+        self.assertIsNone(self.driver.get_next_timeout())
+
+    def test_due_on_io(self):
+        reader, writer = socket.socketpair()
+        self.addCleanup(reader.close)
+        self.addCleanup(writer.close)
+        received = []
+        self.driver.loop.add_reader(reader.fileno(), lambda: received.append(reader.recv(10)))
+        self.addCleanup(self.driver.loop.remove_reader, reader.fileno())
+
+        self.assertIsNone(self.driver.get_next_timeout())
+        self.assertFalse(self.driver.is_due())
+        writer.send(b"x")
+        self.assertTrue(self.driver.is_due())
+        self.assertTrue(self.driver.is_due())  # looking doesn't take the event
+        self.driver.run_once()
+        self.assertEqual(received, [b"x"])
+        self.assertFalse(self.driver.is_due())
+
+
+@unittest.skipIf(sys.version_info < (3, 8), "top-level await needs python 3.8+")
+class TopLevelAwaitTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = async_tasks.EventLoopDriver()
+        self.addCleanup(self.driver.close)
+
+    def run_coroutine(self, coroutine):
+        # what the window does, minus the Qt event loop
+        task = self.driver.create_run_task(coroutine)
+        deadline = time.monotonic() + 5.0
+        while not task.done():
+            self.assertLess(time.monotonic(), deadline)
+            self.driver.run_once()
+        return task.result()
+
+    def test_top_level_await(self):
+        namespace = {}
+        interp = namespaces.ScriptInterpreter(namespace, coroutine_runner=self.run_coroutine)
+        self.assertTrue(interp.run("import asyncio\n"
+                                   "await asyncio.sleep(0.01)\n"
+                                   "loop = asyncio.get_event_loop()\n"
+                                   "background = asyncio.ensure_future(asyncio.sleep(0, 'later'))\n"))
+        self.assertIs(namespace["loop"], self.driver.loop)
+
+        while self.driver.has_work():
+            self.driver.run_once()
+        self.assertEqual(namespace["background"].result(), "later")
+
+    def test_top_level_await_raises(self):
+        interp = namespaces.ScriptInterpreter({}, coroutine_runner=self.run_coroutine)
+        interp.showtraceback = lambda: setattr(interp, "failed", True)  # keep it out of stderr
+        self.assertFalse(interp.run("import asyncio\n"
+                                    "await asyncio.sleep(0)\n"
+                                    "1 / 0\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from live_script_editor import batch_runner
+
+
+class BatchRunTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+    def create_files(self, names):
+        file_paths = []
+        for name in names:
+            file_path = os.path.join(self.temp_dir, name)
+            with open(file_path, "w") as fh:
+                fh.write(name)
+            file_paths.append(file_path)
+        return file_paths
+
+    def run_batch(self, script_text, file_paths, worker_count=2, **kwargs):
+        finished = threading.Event()
+        batch_run = batch_runner.BatchRun(script_text, file_paths, sys.executable, worker_count=worker_count,
+                                          on_finished=finished.set, **kwargs)
+        self.addCleanup(batch_run.shutdown)
+        batch_run.start()
+        self.assertTrue(finished.wait(30))
+        return batch_run
+
+    def test_collect_files(self):
+        self.create_files(["a.py", "b.txt"])
+        os.mkdir(os.path.join(self.temp_dir, "sub"))
+        self.create_files([os.path.join("sub", "c.py")])
+
+        file_names = [os.path.basename(p) for p in batch_runner.collect_files([self.temp_dir], "*.py")]
+        self.assertEqual(file_names, ["a.py", "c.py"])
+        file_names = [os.path.basename(p) for p in batch_runner.collect_files([self.temp_dir], "*.py", False)]
+        self.assertEqual(file_names, ["a.py"])
+
+    def test_results_and_failures(self):
+        file_paths = self.create_files(["good", "bad"])
+        script_text = "\n".join([
+            "content = open(batch_file_path).read()",
+            "if content == 'bad':",
+            "    raise ValueError(content)",
+            "batch_result = {'content': content}",
+        ])
+        batch_run = self.run_batch(script_text, file_paths)
+
+        good, bad = batch_run.items
+        self.assertEqual(good.status, batch_runner.DONE)
+        self.assertEqual(good.result, {"content": "good"})
+        self.assertEqual(bad.status, batch_runner.FAILED)
+        self.assertIn("ValueError: bad", bad.output)
+        self.assertEqual(batch_run.counts()[batch_runner.FAILED], 1)
+
+    def test_unreadable_result_fails_item(self):
+        file_paths = self.create_files(["a"])
+        # overwrite the result file once the bootstrap has written it, with something that isn't json
+        script_text = "\n".join([
+            "import atexit, os, sys",
+            "result_path = os.path.join(os.path.dirname(sys.argv[0]), 'result_0.json')",
+            "atexit.register(lambda: open(result_path, 'w').write('not json'))",
+        ])
+        batch_run = self.run_batch(script_text, file_paths)
+
+        item = batch_run.items[0]
+        self.assertEqual(item.status, batch_runner.FAILED)
+        self.assertIn("Failed to read batch_result", item.output)
+
+    def test_temp_dir_removed(self):
+        file_paths = self.create_files(["a", "b"])
+        batch_run = self.run_batch("batch_result = 1", file_paths)
+        self.assertIsNone(batch_run._temp_dir)
+
+        # retrying gets a new one
+        batch_run.items[0].status = batch_runner.FAILED
+        finished = threading.Event()
+        batch_run.on_finished = finished.set
+        batch_run.retry_failed()
+        self.assertTrue(finished.wait(30))
+        self.assertEqual(batch_run.items[0].status, batch_runner.DONE)
+        self.assertEqual(batch_run.items[0].attempts, 2)
+        self.assertIsNone(batch_run._temp_dir)
+
+    def test_total_duration_is_wall_clock(self):
+        file_paths = self.create_files(["a", "b", "c", "d"])
+        batch_run = self.run_batch("import time\ntime.sleep(0.3)", file_paths, worker_count=4)
+        item_durations = sum(item.duration for item in batch_run.items)
+        self.assertLess(batch_run.get_total_duration(), item_durations)
+
+        summary_path = os.path.join(self.temp_dir, "summary.json")
+        batch_run.write_summary(summary_path)
+        self.assertTrue(os.path.isfile(summary_path))
+
+
+    def test_summary_written_when_finished(self):
+        file_paths = self.create_files(["a"])
+        summary_dir = os.path.join(self.temp_dir, "summaries")
+        batch_run = self.run_batch("batch_result = 1", file_paths, name="Batch: tab 1", summary_dir=summary_dir)
+        self.assertEqual(os.path.dirname(batch_run.summary_path), summary_dir)
+        self.assertTrue(os.path.basename(batch_run.summary_path).startswith("Batch_tab_1_"))
+        with open(batch_run.summary_path) as fh:
+            self.assertEqual(json.load(fh)["items"][0]["result"], 1)
+
+        # a retry updates the same file
+        batch_run.items[0].status = batch_runner.FAILED
+        finished = threading.Event()
+        batch_run.on_finished = finished.set
+        batch_run.retry_failed()
+        self.assertTrue(finished.wait(30))
+        self.assertEqual(os.listdir(summary_dir), [os.path.basename(batch_run.summary_path)])
+        with open(batch_run.summary_path) as fh:
+            self.assertEqual(json.load(fh)["items"][0]["attempts"], 2)
+
+    def test_shutdown(self):
+        file_paths = self.create_files(["a", "b", "c"])
+        finished = threading.Event()
+        batch_run = batch_runner.BatchRun("import time\ntime.sleep(60)", file_paths, sys.executable,
+                                          worker_count=2, on_finished=finished.set)
+        batch_run.start()
+        deadline = time.time() + 30
+        while len(batch_run._processes) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        temp_dir = batch_run._temp_dir
+
+        batch_run.shutdown()
+        self.assertTrue(finished.wait(30))
+        self.assertEqual([item.status for item in batch_run.items], [batch_runner.CANCELLED] * 3)
+        self.assertFalse(os.path.exists(temp_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+
+from live_script_editor import cells
+
+try:
+    from Qt import QtWidgets
+except ImportError:
+    QtWidgets = None
+
+SCRIPT = "\n".join([
+    "import os",
+    "",
+    "# %% setup",
+    "data = load()",
+    "#%%process",
+    "result = process(data)",
+    "",
+])
+
+
+class SplitCellsTestCase(unittest.TestCase):
+
+    def test_split(self):
+        script_cells = cells.split_cells(SCRIPT)
+        self.assertEqual([(c.start_line, c.end_line) for c in script_cells], [(0, 2), (2, 4), (4, 7)])
+        self.assertEqual([c.title for c in script_cells], ["", "setup", "process"])
+        self.assertEqual([c.has_marker for c in script_cells], [False, True, True])
+        self.assertEqual(script_cells[1].text, "# %% setup\ndata = load()")
+
+    def test_blank_lines_before_first_marker(self):
+        script_cells = cells.split_cells("\n\n# %% first\nvalue = 1")
+        self.assertEqual(len(script_cells), 1)
+        self.assertEqual(cells.get_cell_at_line(script_cells, 0), script_cells[0])
+
+    def test_no_markers(self):
+        script_cells = cells.split_cells("value = 1\nother = 2")
+        self.assertEqual(len(script_cells), 1)
+        self.assertFalse(script_cells[0].has_marker)
+
+    def test_get_cell_at_line(self):
+        script_cells = cells.split_cells(SCRIPT)
+        self.assertEqual(cells.get_cell_at_line(script_cells, 3).title, "setup")
+        self.assertEqual(cells.get_cell_at_line(script_cells, 100).title, "process")
+        self.assertIsNone(cells.get_cell_at_line([], 0))
+
+
+class CellTrackerTestCase(unittest.TestCase):
+
+    def test_states(self):
+        tracker = cells.CellTracker()
+        setup, process = cells.split_cells(SCRIPT)[1:]
+        self.assertEqual(tracker.get_state(setup), (cells.NOT_RUN, None))
+
+        tracker.record(setup, True, 0.5)
+        tracker.record(process, False, 0.1)
+        self.assertEqual(tracker.get_state(setup)[0], cells.DONE)
+        self.assertEqual(tracker.get_state(process)[0], cells.FAILED)
+        self.assertEqual(tracker.get_dirty_cells([setup, process]), [process])
+
+        # trailing whitespace doesn't count as a change, an edit does
+        edited = cells.split_cells(SCRIPT.replace("load()", "load()  \n\n").replace("process(data)", "process(x)"))
+        self.assertEqual(tracker.get_state(edited[1])[0], cells.DONE)
+        state, run = tracker.get_state(edited[2])
+        self.assertEqual(state, cells.CHANGED)
+        self.assertEqual(run.duration, 0.1)
+
+        tracker.clear()
+        self.assertEqual(tracker.get_dirty_cells([setup, process]), [setup, process])
+
+    def test_moved_cell_stays_clean(self):
+        tracker = cells.CellTracker()
+        setup = cells.split_cells(SCRIPT)[1]
+        tracker.record(setup, True, 0.5)
+
+        moved = cells.split_cells("# %% other\nvalue = 1\n" + SCRIPT.split("\n", 2)[2])
+        moved_setup = [c for c in moved if c.title == "setup"][0]
+        self.assertFalse(tracker.is_dirty(moved_setup))
+
+
+class _FakeScript(object):
+    script_name = "script.py"
+
+    def __init__(self):
+        self.cell_tracker = cells.CellTracker()
+
+    def update_cells(self):
+        pass
+
+
+@unittest.skipIf(QtWidgets is None, "needs a Qt binding")
+class RunCellsTestCase(unittest.TestCase):
+
+    def run_cells(self, results):
+        from live_script_editor import live_script_editor_ui
+
+        class FakeWindow(object):
+            def __init__(self):
+                self.run_texts = []
+
+            def execute_script_text(self, text, active_script, first_line=0):
+                self.run_texts.append(text)
+                return results[len(self.run_texts) - 1]
+
+            def show_message(self, message):
+                pass
+
+        window = FakeWindow()
+        script = _FakeScript()
+        script_cells = cells.split_cells(SCRIPT)
+        live_script_editor_ui.LiveScriptEditorWindow.run_cells(window, script, script_cells)
+        return window, script, script_cells
+
+    def test_refused_run_is_not_recorded(self):
+        from live_script_editor import live_script_editor_ui
+
+        window, script, script_cells = self.run_cells([True, live_script_editor_ui._not_run, True])
+        self.assertEqual(len(window.run_texts), 2)  # stops, the rest can't run either
+        self.assertFalse(script.cell_tracker.is_dirty(script_cells[0]))
+        self.assertEqual(script.cell_tracker.get_state(script_cells[1]), (cells.NOT_RUN, None))
+
+    def test_failed_run_stops(self):
+        window, script, script_cells = self.run_cells([True, False, True])
+        self.assertEqual(len(window.run_texts), 2)
+        self.assertEqual(script.cell_tracker.get_state(script_cells[1])[0], cells.FAILED)
+
+
+if __name__ == "__main__":
+    unittest.main()
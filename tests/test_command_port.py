@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from live_script_editor import command_port
+
+
+class CommandPortTestCase(unittest.TestCase):
+
+    def start_server(self, executor=None):
+        server = command_port.CommandPortServer(("127.0.0.1", 0), namespace={"value": 1}, executor=executor,
+                                                token="secret").start()
+        self.addCleanup(server.stop)
+        client = command_port.CommandPortClient(server.address, timeout=5.0, token="secret")
+        self.addCleanup(client.close)
+        return client
+
+    def test_execute(self):
+        client = self.start_server()
+        output = []
+        reply = client.execute("print(value + 1)", on_output=lambda stream, text: output.append((stream, text)))
+        self.assertTrue(reply["ok"])
+        self.assertIn(("stdout", "2\n"), output)
+
+    def test_complete(self):
+        client = self.start_server()
+        self.assertIn("value", client.complete("val"))
+        self.assertIn("bit_length", client.complete("value.", timeout=1.0))
+
+    def test_executor_error_replies(self):
+        def executor(func):
+            raise RuntimeError("host is busy")
+
+        client = self.start_server(executor=executor)
+        reply = client.execute("print(value)")
+        self.assertFalse(reply["ok"])
+        self.assertEqual(reply["error"], "RuntimeError: host is busy")
+
+        # the connection is still usable afterwards
+        self.assertTrue(client.is_connected())
+        self.assertTrue(client.request({"type": "ping"})["ok"])
+
+    def test_pool_complete_timeout(self):
+        client = self.start_server()
+        pool = command_port.ConnectionPool(client.address, token="secret")
+        self.addCleanup(pool.close)
+        self.assertIn("value", pool.complete("va", timeout=1.0))
+
+    def test_wrong_token(self):
+        client = self.start_server()
+        other_client = command_port.CommandPortClient(client.address, timeout=5.0, token="guess")
+        self.addCleanup(other_client.close)
+        with self.assertRaises(command_port.CommandPortError):
+            other_client.execute("value = 2")
+        self.assertFalse(other_client.is_connected())
+
+        client.execute("print(value)", on_output=lambda stream, text: self.assertEqual(text, "1\n"))
+
+    def test_unix_socket_missing(self):
+        with mock.patch.object(command_port, "socket", mock.Mock(spec=["create_connection"])):
+            with self.assertRaises(command_port.CommandPortError):
+                command_port.CommandPortClient("/tmp/no_such_socket", token="secret").connect()
+
+
+class TokenTestCase(unittest.TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        token_path = os.path.join(temp_dir, "config", "command_port_token")
+        patcher = mock.patch.object(command_port, "token_file_path", token_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        environ_patcher = mock.patch.dict(os.environ)
+        environ_patcher.start()
+        self.addCleanup(environ_patcher.stop)
+        os.environ.pop(command_port.token_env_var, None)
+
+    def test_token_file(self):
+        token = command_port.get_default_token()
+        self.assertEqual(len(token), 64)
+        self.assertEqual(command_port.get_default_token(), token)  # read back, not made again
+        if os.name == "posix":
+            self.assertEqual(os.stat(command_port.token_file_path).st_mode & 0o777, 0o600)
+
+    def test_environment(self):
+        os.environ[command_port.token_env_var] = "from env"
+        self.assertEqual(command_port.get_default_token(), "from env")
+        self.assertFalse(os.path.exists(command_port.token_file_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
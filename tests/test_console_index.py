@@ -0,0 +1,65 @@
+import re
+import unittest
+
+from live_script_editor import console_index
+
+
+class ConsoleLineIndexTestCase(unittest.TestCase):
+
+    def create_index(self):
+        line_index = console_index.ConsoleLineIndex()
+        line_index.add("before", console_index.OUTPUT)
+        line_index.start_run()
+        line_index.add("print('a')", console_index.INPUT)
+        line_index.add("a\nb", console_index.OUTPUT)
+        line_index.start_run()
+        line_index.add("raise ValueError", console_index.INPUT)
+        line_index.add("ValueError", console_index.ERROR)
+        return line_index
+
+    def test_filter_streams_and_runs(self):
+        line_index = self.create_index()
+        self.assertEqual(list(line_index.filter()), list(range(6)))
+        self.assertEqual(list(line_index.filter(streams=[console_index.ERROR])), [5])
+        self.assertEqual(list(line_index.filter(streams=[console_index.OUTPUT, console_index.ERROR])), [0, 2, 3, 5])
+        self.assertEqual(list(line_index.filter(run_id=1)), [1, 2, 3])
+        self.assertEqual(line_index.get_run_id(4), 2)
+
+    def test_filter_pattern(self):
+        line_index = self.create_index()
+        pattern = re.compile("error", re.IGNORECASE)
+        self.assertEqual(list(line_index.filter(pattern=pattern)), [4, 5])
+        self.assertEqual(list(line_index.filter(streams=[console_index.INPUT], pattern=pattern)), [4])
+
+        # new lines only get searched once, the earlier matches are remembered
+        line_index.add("another error", console_index.OUTPUT)
+        self.assertEqual(list(line_index.filter(pattern=pattern)), [4, 5, 6])
+
+    def test_filter_new_lines(self):
+        line_index = self.create_index()
+        pattern = re.compile("error", re.IGNORECASE)
+        filtered_line_count = len(line_index)
+        line_index.add("no match\nerror again", console_index.ERROR)
+
+        self.assertEqual(list(line_index.filter(start_line=filtered_line_count)), [6, 7])
+        self.assertEqual(list(line_index.filter(pattern=pattern, start_line=filtered_line_count)), [7])
+        self.assertEqual(list(line_index.filter(streams=[console_index.ERROR], start_line=filtered_line_count)),
+                         [6, 7])
+        self.assertEqual(list(line_index.filter(run_id=1, start_line=filtered_line_count)), [])
+
+    def test_clear(self):
+        line_index = self.create_index()
+        generation = line_index.generation
+        line_index.clear()
+        self.assertGreater(line_index.generation, generation)
+        self.assertEqual(len(line_index), 0)
+        self.assertEqual(line_index.current_run_id, 0)
+
+    def test_empty_run_is_reused(self):
+        line_index = console_index.ConsoleLineIndex()
+        self.assertEqual(line_index.start_run(), 1)
+        self.assertEqual(line_index.start_run(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
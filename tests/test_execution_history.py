@@ -0,0 +1,110 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from live_script_editor import execution_history
+
+
+class ExecutionHistoryTestCase(unittest.TestCase):
+
+    def create_history(self, batch_interval=0.01):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.db_path = os.path.join(temp_dir, "history.db")
+        history = execution_history.ExecutionHistory(self.db_path, batch_interval)
+        self.addCleanup(history.close)
+        return history
+
+    def test_search(self):
+        history = self.create_history()
+        history.record("import os\nprint(os.getcwd())", tab_name="paths", duration=0.1)
+        history.record("raise ValueError", tab_name="errors", success=False)
+        history.flush()
+
+        self.assertEqual([e.tab_name for e in history.search()], ["errors", "paths"])
+        self.assertEqual([e.tab_name for e in history.search("getc")], ["paths"])
+        self.assertEqual([e.tab_name for e in history.search("err")], ["errors"])
+        self.assertEqual(history.search("os getcwd")[0].first_line, "import os")
+        self.assertFalse(history.search("errors")[0].success)
+        self.assertEqual(history.search("nothing"), [])
+        self.assertEqual(history.count(), 2)
+
+    def test_search_includes_unwritten_runs(self):
+        history = self.create_history(batch_interval=5)  # nothing gets written during the test
+        history.record("print('written')", tab_name="first")
+        history.record("print('pending')", tab_name="second")
+
+        entries = history.search()
+        self.assertEqual([e.tab_name for e in entries], ["second", "first"])
+        self.assertIsNone(entries[0].id)
+        self.assertEqual([e.tab_name for e in history.search("pend")], ["second"])
+        self.assertEqual([e.tab_name for e in history.search("ending")], [] if history.has_fts else ["second"])
+        self.assertEqual(len(history.search(limit=1)), 1)
+        self.assertEqual(history.count(), 2)
+
+    def test_pending_runs_are_not_listed_twice(self):
+        history = self.create_history()
+        for i in range(20):
+            history.record("value = {}".format(i))
+            self.assertLessEqual(len(history.search("value")), i + 1)
+        history.flush()
+        entries = history.search("value")
+        self.assertEqual(len(entries), 20)
+        self.assertTrue(all(e.id is not None for e in entries))
+
+    def test_search_does_not_wait_for_the_writer(self):
+        history = self.create_history()
+        history.record("print('written')", tab_name="first")
+        history.flush()
+
+        # another process holding the write lock keeps the writer thread stuck in its commit
+        blocker = sqlite3.connect(self.db_path, timeout=0)
+        self.addCleanup(blocker.close)
+        blocker.execute("BEGIN IMMEDIATE")
+        history.record("print('stuck')", tab_name="second")
+        time.sleep(0.1)
+
+        start_time = time.perf_counter()
+        self.assertEqual([e.tab_name for e in history.search()], ["second", "first"])
+        self.assertEqual(history.count(), 2)
+        self.assertLess(time.perf_counter() - start_time, 0.5)
+
+        blocker.rollback()
+        history.flush()
+        self.assertEqual([e.id is None for e in history.search()], [False, False])
+
+    def test_no_duplicates_while_writing(self):
+        history = self.create_history(batch_interval=0)
+        recorded = threading.Event()
+
+        def record():
+            for i in range(300):
+                history.record("value = {}".format(i))
+            recorded.set()
+
+        thread = threading.Thread(target=record)
+        thread.start()
+        while not recorded.is_set():
+            codes = [entry.code for entry in history.search("value", limit=1000)]
+            self.assertEqual(len(codes), len(set(codes)))
+        thread.join()
+        history.flush()
+        self.assertEqual(len(history.search("value", limit=1000)), 300)
+
+    def test_clear(self):
+        history = self.create_history()
+        history.record("print(1)")
+        history.clear()
+        self.assertEqual(history.search(), [])
+
+    def test_build_fts_query(self):
+        self.assertEqual(execution_history.build_fts_query("os.path join"), '"os"* "path"* "join"*')
+        self.assertEqual(execution_history.build_fts_query("  "), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import sys
+import time
+import unittest
+
+try:
+    from Qt import QtCore, QtWidgets
+except ImportError:
+    QtWidgets = None
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        QtWidgets.QApplication.processEvents(QtCore.QEventLoop.AllEvents, 50)
+    return condition()
+
+
+@unittest.skipIf(QtWidgets is None, "needs a Qt binding")
+class ExternalRunOutputTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+    def create_run_widget(self, script_text):
+        from live_script_editor import external_runner
+        from live_script_editor import live_script_editor_ui
+
+        run = external_runner.ExternalScriptRun(script_text=script_text, python_executable=sys.executable)
+        run_widget = live_script_editor_ui.ExternalRunOutputUI(run, source=("tab", 1))
+        run_widget.dock_widget = QtWidgets.QDockWidget()
+        run_widget.dock_widget.setWidget(run_widget)
+        self.addCleanup(run_widget.dock_widget.deleteLater)
+
+        exit_codes = []
+        run.finished.connect(lambda exit_code, duration: exit_codes.append(exit_code))
+        return run_widget, exit_codes
+
+    def test_rerun_button_keeps_script_text(self):
+        run_widget, exit_codes = self.create_run_widget("print('from the tab')")
+        run_widget.run.start()
+        self.assertTrue(wait_for(lambda: len(exit_codes) == 1))
+
+        run_widget.rerun_button.click()  # clicked(checked) must not end up as the script text
+        self.assertTrue(wait_for(lambda: len(exit_codes) == 2))
+        self.assertEqual(exit_codes, [0, 0])
+        self.assertEqual(run_widget.run.script_text, "print('from the tab')")
+        self.assertIn("from the tab", run_widget.output.toPlainText())
+
+    def test_rerun_with_new_text(self):
+        run_widget, exit_codes = self.create_run_widget("print('first')")
+        run_widget.rerun("print('second')")
+        self.assertTrue(wait_for(lambda: len(exit_codes) == 1))
+        self.assertIn("second", run_widget.output.toPlainText())
+
+
+
+@unittest.skipIf(QtWidgets is None, "needs a Qt binding")
+class ExternalScriptRunTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+    def test_no_output_lost(self):
+        from live_script_editor import external_runner
+
+        run = external_runner.ExternalScriptRun(
+            script_text="for i in range(5000):\n    print(i)\nraise ValueError('at the end')",
+            python_executable=sys.executable)
+        run.max_pending_lines = 100
+        run.max_lines_per_flush = 50
+        received = {"stdout": [], "stderr": []}
+        run.lines_received.connect(lambda stream, lines: received[stream].extend(lines))
+        exit_codes = []
+        run.finished.connect(lambda exit_code, duration: exit_codes.append(exit_code))
+
+        run.start()
+        self.assertTrue(wait_for(lambda: exit_codes, timeout=60.0))
+        self.assertEqual(exit_codes, [1])
+        self.assertEqual(received["stdout"], [str(i) for i in range(5000)])
+        self.assertIn("ValueError: at the end", received["stderr"])
+
+    def test_set_script_path(self):
+        from live_script_editor import external_runner
+
+        run = external_runner.ExternalScriptRun(script_text="")
+        self.assertEqual(run.name, "Python")
+        run.set_script_path("/scripts/saved_as.py")
+        self.assertEqual(run.name, "saved_as.py")
+
+
+if __name__ == "__main__":
+    unittest.main()
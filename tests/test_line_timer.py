@@ -0,0 +1,62 @@
+import linecache
+import sys
+import unittest
+
+from live_script_editor import line_timer
+
+
+def time_source(source, file_name="<line timer test>"):
+    timer = line_timer.LineTimer(file_name)
+    namespace = dict()
+    with timer.running():
+        exec(compile(source, file_name, "exec"), namespace)
+    return timer.timings
+
+
+class LineTimerTestCase(unittest.TestCase):
+
+    def test_hits(self):
+        timings = time_source("\n".join([
+            "total = 0",
+            "for i in range(10):",
+            "    total += i",
+        ]))
+        self.assertEqual(timings.hits[1], 1)
+        self.assertEqual(timings.hits[3], 10)
+        self.assertGreater(timings.duration, 0)
+        self.assertIn("hottest is line", str(timings))
+
+    def test_time_goes_to_the_calling_line(self):
+        timings = time_source("\n".join([
+            "import time",
+            "def wait():",
+            "    time.sleep(0.05)",
+            "wait()",
+            "time.sleep(0.02)",
+        ]))
+        # the sleep inside wait() counts towards line 3, not again towards the call on line 4
+        self.assertGreaterEqual(timings.times[3], 0.04)
+        self.assertLess(timings.times[4], 0.04)
+        self.assertGreaterEqual(timings.times[5], 0.015)
+        self.assertLessEqual(sum(timings.times.values()), timings.duration)
+
+    def test_exception(self):
+        timer = line_timer.LineTimer("<line timer exception>")
+        previous_trace = sys.gettrace()
+        with self.assertRaises(ValueError):
+            with timer.running():
+                exec(compile("def fail():\n    raise ValueError\nfail()", "<line timer exception>", "exec"), {})
+        self.assertEqual(timer.timings.hits[2], 1)
+        self.assertIs(sys.gettrace(), previous_trace)
+
+    def test_other_code_is_not_timed(self):
+        timings = time_source("import json\njson.dumps({'a': [1, 2, 3]})")
+        self.assertEqual(set(timings.hits), {1, 2})
+
+    def test_register_source(self):
+        line_timer.register_source("<registered>", "first\nsecond")
+        self.assertEqual(linecache.getline("<registered>", 2), "second\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
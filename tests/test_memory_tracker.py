@@ -0,0 +1,67 @@
+import unittest
+
+from live_script_editor import memory_tracker
+from live_script_editor import namespaces
+
+
+class MemoryTrackerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = memory_tracker.MemoryTracker(top_count=50)
+        self.tracker.set_enabled(True)
+        self.addCleanup(self.tracker.set_enabled, False)
+        self.namespace = namespaces.ScriptNamespace("memory")
+
+    def run_script(self, label, source, file_name=None):
+        with self.tracker.measure(label, source, self.namespace.globals, file_name) as report:
+            self.assertTrue(self.namespace.interp.run(source, file_name))
+        return report
+
+    def get_allocation(self, report, file_name, line_number):
+        for allocation in report.allocations:
+            if allocation.file_path == file_name and allocation.line_number == line_number:
+                return allocation
+        self.fail("No allocation at {}:{} in {}".format(file_name, line_number, report))
+
+    def test_measure(self):
+        report = self.run_script("first", "import collections\nkept = [collections.OrderedDict() for _ in range(5000)]")
+        self.assertEqual(report.new_variables, ["collections", "kept"])
+        self.assertIn("collections.OrderedDict", [growth.type_name for growth in report.type_growth])
+        self.assertGreater(report.traced_growth, 0)
+
+        allocation = self.get_allocation(report, "<string>", 2)
+        self.assertTrue(allocation.source_line.startswith("kept = "))
+
+    def test_compare_keeps_the_source_of_every_run(self):
+        self.run_script("first", "first = [bytearray(100) for _ in range(2000)]\nunrelated = 1")
+        self.run_script("second", "second_value = 1\nsecond = [bytearray(100) for _ in range(2000)]")
+
+        report = self.tracker.compare(2)
+        self.assertTrue(self.get_allocation(report, "<string>", 1).source_line.startswith("first = "))
+        self.assertTrue(self.get_allocation(report, "<string>", 2).source_line.startswith("second = "))
+        self.assertEqual(report.new_variables, ["first", "second", "second_value", "unrelated"])
+
+    def test_tabs_are_kept_apart(self):
+        # the second tab grows more at the same line, the first one's line still shows its own source
+        self.run_script("first", "first = [bytearray(100) for _ in range(2000)]", "<tab 1: first.py>")
+        self.run_script("second", "second = [bytearray(100) for _ in range(4000)]", "<tab 2: second.py>")
+
+        report = self.tracker.compare(2)
+        self.assertTrue(self.get_allocation(report, "<tab 1: first.py>", 1).source_line.startswith("first = "))
+        self.assertTrue(self.get_allocation(report, "<tab 2: second.py>", 1).source_line.startswith("second = "))
+
+    def test_line_timing_file_name(self):
+        file_name = "<line timing: script.py>"
+        report = self.run_script("timed", "timed = [bytearray(100) for _ in range(2000)]\n", file_name)
+        self.assertTrue(self.get_allocation(report, file_name, 1).source_line.startswith("timed = "))
+
+    def test_disabled(self):
+        self.tracker.set_enabled(False)
+        with self.tracker.measure("off", "value = 1") as report:
+            pass
+        self.assertIsNone(report)
+        self.assertIsNone(self.tracker.compare(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from live_script_editor import module_reloader
+
+
+class ModuleReloaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_path)
+        sys.path.insert(0, self.root_path)
+        self.addCleanup(sys.path.remove, self.root_path)
+        self.addCleanup(self.remove_modules)
+        importlib.invalidate_caches()
+
+    def remove_modules(self):
+        for module_name in ["reload_base", "reload_user", "reload_other"]:
+            sys.modules.pop(module_name, None)
+
+    def write_module(self, module_name, text, mtime_offset=0):
+        file_path = os.path.join(self.root_path, module_name + ".py")
+        with open(file_path, "w") as fh:
+            fh.write(text)
+        # file systems with coarse mtimes would miss an edit made right after the import
+        stat = os.stat(file_path)
+        os.utime(file_path, (stat.st_atime, stat.st_mtime + mtime_offset))
+        return file_path
+
+    def test_reload_with_dependents(self):
+        self.write_module("reload_base", "VALUE = 1\n")
+        self.write_module("reload_user", "import reload_base\nVALUE = reload_base.VALUE\n")
+        self.write_module("reload_other", "VALUE = 1\n")
+        import reload_user
+        import reload_other  # noqa
+
+        reloader = module_reloader.ModuleReloader(self.root_path)
+        self.assertEqual(reloader.reload_changed().reloaded, [])
+
+        self.write_module("reload_base", "VALUE = 2\n", mtime_offset=10)
+        report = reloader.reload_changed()
+        self.assertEqual(report.changed, ["reload_base"])
+        self.assertEqual(report.reloaded, ["reload_base", "reload_user"])
+        self.assertEqual(sys.modules["reload_user"].VALUE, 2)
+
+        self.assertEqual(reloader.reload_changed().reloaded, [])
+
+    def test_first_edit_after_import(self):
+        reloader = module_reloader.ModuleReloader(self.root_path)
+        reloader.reload_changed()
+
+        # imported by a run, edited before the next check
+        self.write_module("reload_base", "VALUE = 1\n")
+        import reload_base  # noqa
+        reloader.record_new_modules()
+        self.write_module("reload_base", "VALUE = 2\n", mtime_offset=10)
+
+        report = reloader.reload_changed()
+        self.assertEqual(report.reloaded, ["reload_base"])
+        self.assertEqual(sys.modules["reload_base"].VALUE, 2)
+
+    def test_failed_reload(self):
+        self.write_module("reload_base", "VALUE = 1\n")
+        import reload_base  # noqa
+        reloader = module_reloader.ModuleReloader(self.root_path)
+        reloader.reload_changed()
+
+        self.write_module("reload_base", "VALUE = (\n", mtime_offset=10)
+        report = reloader.reload_changed()
+        self.assertEqual([name for name, exception in report.failed], ["reload_base"])
+        self.assertIn("Failed to reload reload_base", str(report))
+
+    def test_topological_order(self):
+        self.assertEqual(module_reloader.topological_order({"a": {"b"}, "b": set()}), ["b", "a"])
+        self.assertIsNone(module_reloader.topological_order({"a": {"b"}, "b": {"a"}}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import io
+import unittest
+from contextlib import redirect_stderr
+
+from live_script_editor import namespaces
+
+
+class ScriptInterpreterTestCase(unittest.TestCase):
+
+    def test_run_reports_failure(self):
+        interpreter = namespaces.ScriptInterpreter(dict())
+        with redirect_stderr(io.StringIO()) as stderr:
+            self.assertTrue(interpreter.run("a = 1\nb = a + 1"))
+            self.assertFalse(interpreter.run("a = 1\nraise ValueError('boom')"))
+            self.assertTrue(interpreter.run("c = 3"))
+        self.assertIn("ValueError: boom", stderr.getvalue())
+        self.assertEqual(interpreter.locals["b"], 2)
+
+    def test_syntax_error(self):
+        interpreter = namespaces.ScriptInterpreter(dict())
+        with redirect_stderr(io.StringIO()) as stderr:
+            self.assertFalse(interpreter.run("a = (\nb = 1"))
+        self.assertIn("SyntaxError", stderr.getvalue())
+
+
+class NamespaceManagerTestCase(unittest.TestCase):
+
+    def test_scopes(self):
+        manager = namespaces.NamespaceManager()
+        self.assertIs(manager.get_namespace(namespaces.SHARED), manager.shared)
+
+        tab_namespace = manager.get_namespace(namespaces.TAB, tab_key=1, tab_name="first")
+        self.assertIs(manager.get_namespace(namespaces.TAB, tab_key=1), tab_namespace)
+        self.assertIsNot(manager.get_namespace(namespaces.TAB, tab_key=2), tab_namespace)
+
+        session = manager.get_namespace(namespaces.SESSION, session_name="rig")
+        self.assertIs(manager.get_namespace(namespaces.SESSION, session_name="rig"), session)
+        self.assertEqual(len(manager.all_namespaces()), 4)
+
+    def test_namespaces_are_isolated(self):
+        manager = namespaces.NamespaceManager()
+        tab_namespace = manager.get_tab_namespace(1)
+        tab_namespace.interp.run("value = 1\nother = 2")
+        self.assertNotIn("value", manager.shared.globals)
+        self.assertEqual(tab_namespace.user_variables(), {"value": 1, "other": 2})
+
+    def test_release_tab_resets(self):
+        manager = namespaces.NamespaceManager()
+        tab_namespace = manager.get_tab_namespace(1)
+        tab_namespace.globals["value"] = [1, 2, 3]
+        manager.release_tab(1)
+        self.assertEqual(tab_namespace.user_variables(), {})
+        self.assertEqual(tab_namespace.globals["__name__"], "__main__")
+        self.assertNotIn(1, manager.tab_namespaces)
+
+    def test_memory_usage(self):
+        namespace = namespaces.ScriptNamespace("test")
+        namespace.globals.update(data=[list(range(100)) for _ in range(10)], module=namespaces)
+        usage = namespace.get_memory_usage()
+        self.assertEqual(usage.variable_count, 2)
+        self.assertGreater(usage.object_count, 10)
+        self.assertFalse(usage.truncated)
+
+        usage = namespace.get_memory_usage(object_limit=5)
+        self.assertTrue(usage.truncated)
+        self.assertEqual(usage.object_count, 5)
+
+    def test_format_size(self):
+        self.assertEqual(namespaces.format_size(512), "512.0B")
+        self.assertEqual(namespaces.format_size(2048), "2.0KB")
+        self.assertEqual(namespaces.format_size(3 * 1024 ** 3), "3.0GB")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from live_script_editor import output_capture
+
+
+class OutputCaptureTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.output = []
+        self.wakeups = []
+        self.capture = output_capture.OutputCapture(lambda stream, text: self.output.append((stream, text)),
+                                                    wakeup=lambda: self.wakeups.append(True))
+
+    def test_owner_thread_writes_right_away(self):
+        with self.capture.capturing():
+            sys.stdout.write("first\n")
+            sys.stderr.write("error\n")
+            self.assertEqual(self.output, [("stdout", "first\n"), ("stderr", "error\n")])
+        self.assertFalse(self.capture.installed)
+        self.assertEqual(self.wakeups, [])
+
+    def test_other_threads_queue_up(self):
+        with self.capture.capturing():
+            thread = threading.Thread(target=lambda: [print("from thread", i) for i in range(3)])
+            thread.start()
+            thread.join()
+            self.assertEqual(self.output, [])
+            self.assertEqual(len(self.wakeups), 1)  # one wakeup until the next drain
+
+            self.capture.drain()
+        self.assertEqual(self.output, [("stdout", "from thread 0\nfrom thread 1\nfrom thread 2\n")])
+
+    def test_nested_install(self):
+        original_stdout = sys.stdout
+        self.capture.install()
+        with self.capture.capturing():
+            pass
+        self.assertTrue(self.capture.installed)
+        self.capture.uninstall()
+        self.assertIs(sys.stdout, original_stdout)
+
+
+@unittest.skipIf(sys.platform == "win32", "uses pass_fds")
+class FdRedirectTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.output = []
+        self.capture = output_capture.OutputCapture(lambda stream, text: self.output.append(text))
+
+        # a file stands in for the console the fd pointed at
+        target_file = tempfile.TemporaryFile()
+        self.addCleanup(target_file.close)
+        self.target_file = target_file
+        self.fd = target_file.fileno()
+
+    def read_target(self):
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        return os.read(self.fd, 65536)
+
+    def wait_for_output(self, text, timeout=5.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.capture.drain()
+            if text in "".join(self.output):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_redirect(self):
+        fd_redirect = output_capture.FdRedirect(self.capture, self.fd, "stdout")
+        fd_redirect.start()
+        os.write(self.fd, b"captured\n")
+        fd_redirect.stop()
+
+        self.assertTrue(self.wait_for_output("captured\n"))
+        self.assertEqual(self.read_target(), b"captured\n")  # tee
+
+        os.write(self.fd, b"after\n")
+        self.assertEqual(self.read_target(), b"captured\nafter\n")
+
+    def test_child_holding_the_pipe(self):
+        fd_redirect = output_capture.FdRedirect(self.capture, self.fd, "stdout")
+        fd_redirect.start()
+        child = subprocess.Popen(
+            [sys.executable, "-c", "import os, sys, time; time.sleep(0.5); os.write({}, b'late\\n')".format(self.fd)],
+            pass_fds=(self.fd,))
+        self.addCleanup(child.wait)
+
+        start_time = time.perf_counter()
+        fd_redirect.stop()
+        self.assertLess(time.perf_counter() - start_time, 0.5)
+
+        # whatever gets the fd number that was the saved duplicate must not get the child's output
+        with tempfile.TemporaryFile() as other_file:
+            self.assertEqual(child.wait(10), 0)
+            self.assertTrue(self.wait_for_output("late\n"))
+            fd_redirect._thread.join(5)
+            self.assertFalse(fd_redirect._thread.is_alive())
+            other_file.seek(0)
+            self.assertEqual(other_file.read(), b"")
+        self.assertEqual(self.read_target(), b"late\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import collections
+import os
+import shutil
+import tempfile
+import unittest
+
+from live_script_editor import result_renderer
+
+
+class ResultPagerTestCase(unittest.TestCase):
+
+    def render(self, value, **kwargs):
+        output = []
+        renderer = result_renderer.ResultRenderer(output.append, **kwargs)
+        renderer.render(value)
+        return renderer, output
+
+    def test_small_results_keep_their_repr(self):
+        point_type = collections.namedtuple("Point", "x y")
+        values = [
+            point_type(1, 2),
+            collections.Counter("aab"),
+            collections.OrderedDict(a=1),
+            collections.defaultdict(list, a=[1]),
+            collections.deque([1, 2], maxlen=3),
+            collections.deque([1, 2]),
+            [1, (2,), {"a": None}],
+            (1,),
+            frozenset([1]),
+            "text",
+        ]
+        for value in values:
+            renderer, output = self.render(value)
+            self.assertEqual(output, [repr(value)])
+            self.assertFalse(renderer.last_pager.has_more())
+
+    def test_large_list_is_paged(self):
+        value = list(range(100000))
+        renderer, output = self.render(value, max_chars=1000)
+        self.assertTrue(output[0].startswith("# list len=100000\n[0, 1, 2"))
+        self.assertIn("items shown", output[0])
+
+        pager = renderer.last_pager
+        while renderer.show_more():
+            pass
+        self.assertEqual(pager.shown_items, len(value))
+        self.assertTrue(output[-1].endswith("99999]"))
+
+    def test_nested_items_get_cut(self):
+        value = [list(range(1000))] * 3
+        renderer, output = self.render(value)
+        self.assertEqual(len(output), 1)
+        self.assertIn("...", output[0])
+        self.assertLess(len(output[0]), 4000)
+
+    def test_large_repr_is_deferred(self):
+        value = collections.Counter(range(1000))
+        renderer, output = self.render(value, max_repr_length=100)
+        self.assertNotIn("0: 1", output[0])
+        self.assertIn("not built yet", output[0])
+
+        self.assertTrue(renderer.show_more())
+        self.assertTrue(output[-1].startswith("Counter({0: 1"))
+
+    def test_changed_between_pages(self):
+        value = {i: i for i in range(1000)}
+        renderer, output = self.render(value, max_chars=100)
+        value["new"] = 1
+        self.assertTrue(renderer.show_more())
+        self.assertIn("dict changed while being shown", output[-1])
+        self.assertFalse(renderer.show_more())
+
+    def test_long_string_is_sliced(self):
+        value = "ab'" * 1000
+        renderer, output = self.render(value, max_chars=1000)
+        self.assertTrue(output[0].startswith("# str len=3000\n"))
+        while renderer.show_more():
+            pass
+        pages = [output[0].split("\n")[1]] + [text.split("\n")[0] for text in output[1:]]
+        self.assertEqual(len(pages), 3)
+        self.assertEqual("".join(eval(page) for page in pages), value)
+
+    def test_slow_repr_is_deferred(self):
+        class SlowRepr(object):
+            calls = 0
+
+            def __repr__(self):
+                SlowRepr.calls += 1
+                return "slow"
+
+        self.addCleanup(result_renderer._slow_repr_types.pop, SlowRepr, None)
+        result_renderer._slow_repr_types[SlowRepr] = 2.0  # as if it took that long last time
+        renderer, output = self.render(SlowRepr())
+        self.assertIn("repr took 2.0s last time", output[0])
+        self.assertEqual(SlowRepr.calls, 0)
+
+        self.assertTrue(renderer.show_more())
+        self.assertEqual(output[-1], "slow")
+        self.assertNotIn(SlowRepr, result_renderer._slow_repr_types)  # fast this time
+
+    def test_array_repr_is_deferred_by_shape(self):
+        class Array(object):
+            shape = (1000, 1000)
+
+            def __len__(self):
+                return 1000
+
+        renderer, output = self.render(Array(), max_repr_length=100000)
+        self.assertIn("repr of 1000000 items not built yet", output[0])
+
+    def test_write_to_file(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        file_path = os.path.join(temp_dir, "result.txt")
+
+        pager = result_renderer.ResultPager({"a": 1, "b": [2]})
+        pager.write_to_file(file_path)
+        with open(file_path) as fh:
+            self.assertEqual(eval(fh.read()), {"a": 1, "b": [2]})
+
+    def test_summarize(self):
+        self.assertEqual(result_renderer.summarize([1, 2]), "list len=2")
+        self.assertEqual(result_renderer.summarize(collections.Counter()), "collections.Counter len=0")
+
+
+if __name__ == "__main__":
+    unittest.main()
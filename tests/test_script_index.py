@@ -0,0 +1,174 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from live_script_editor import script_index
+
+try:
+    from Qt import QtWidgets
+except ImportError:
+    QtWidgets = None
+
+
+class ScriptIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_path, True)
+        self.cache_path = os.path.join(tempfile.mkdtemp(), "cache", "index.json")
+        self.addCleanup(shutil.rmtree, os.path.dirname(os.path.dirname(self.cache_path)), True)
+
+        self.write_file("top.py")
+        self.write_file("notes.txt")
+        self.write_file("tools/rig/build_rig.py")
+        self.write_file("tools/anim/bake.py")
+
+    def write_file(self, relative_path):
+        path = os.path.join(self.root_path, relative_path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as fp:
+            fp.write("")
+
+    def make_index(self, **kwargs):
+        index = script_index.ScriptIndex(self.root_path, cache_path=self.cache_path, **kwargs)
+        self.addCleanup(index.close)
+        return index
+
+    def wait(self, index, timeout=10.0):
+        deadline = time.time() + timeout
+        while index.is_busy:
+            self.assertLess(time.time(), deadline, "index still busy")
+            time.sleep(0.01)
+
+    def path(self, relative_path):
+        return script_index.join_path(script_index.normalize_path(self.root_path), relative_path)
+
+    def test_refresh(self):
+        listed_paths = []
+        index = self.make_index(on_listing=listed_paths.append)
+        index.refresh()
+        self.wait(index)
+
+        root_listing = index.get_listing(index.root_path)
+        self.assertEqual(root_listing.entries, [("tools", True), ("notes.txt", False), ("top.py", False)])
+        self.assertEqual(index.get_listing(self.path("tools")).folder_names, ["anim", "rig"])
+        self.assertEqual(sorted(listed_paths), sorted([index.root_path, self.path("tools"),
+                                                       self.path("tools/anim"), self.path("tools/rig")]))
+        self.assertTrue(index.dirty)
+
+        # nothing changed, nothing reported
+        del listed_paths[:]
+        index.refresh()
+        self.wait(index)
+        self.assertEqual(listed_paths, [])
+
+    def test_search(self):
+        index = self.make_index()
+        index.refresh()
+        self.wait(index)
+
+        self.assertEqual(index.search(""), [self.path("notes.txt"), self.path("tools/anim/bake.py"),
+                                            self.path("tools/rig/build_rig.py"), self.path("top.py")])
+        patterns = script_index.compile_patterns("*.py; *.pyw")
+        self.assertEqual(index.search("", patterns), [self.path("tools/anim/bake.py"),
+                                                      self.path("tools/rig/build_rig.py"), self.path("top.py")])
+        self.assertEqual(index.search("RIG build", patterns), [self.path("tools/rig/build_rig.py")])
+        self.assertEqual(index.search("tools", patterns, limit=1), [self.path("tools/anim/bake.py")])
+        self.assertEqual(index.search("missing"), [])
+
+    def test_cache(self):
+        index = self.make_index()
+        self.assertFalse(index.load_cache())
+        index.refresh()
+        self.wait(index)
+        index.save_cache()
+        self.assertFalse(index.dirty)
+
+        loaded_index = self.make_index()
+        self.assertTrue(loaded_index.load_cache())
+        self.assertEqual(loaded_index.search(""), index.search(""))
+        self.assertEqual(loaded_index.get_listing(self.path("tools")).entries,
+                         index.get_listing(self.path("tools")).entries)
+
+        other_index = script_index.ScriptIndex(os.path.join(self.root_path, "tools"), cache_path=self.cache_path)
+        self.addCleanup(other_index.close)
+        self.assertFalse(other_index.load_cache())  # cache of another root
+
+    def test_removed_folder(self):
+        index = self.make_index()
+        index.refresh()
+        self.wait(index)
+
+        shutil.rmtree(os.path.join(self.root_path, "tools"))
+        index.refresh(recursive=False)
+        self.wait(index)
+        self.assertIsNone(index.get_listing(self.path("tools")))
+        self.assertIsNone(index.get_listing(self.path("tools/rig")))
+        self.assertEqual(index.search(""), [self.path("notes.txt"), self.path("top.py")])
+
+    def test_close(self):
+        index = self.make_index()
+        index.close()
+        index.refresh()
+        self.assertFalse(index.is_busy)
+        self.assertIsNone(index.get_listing(index.root_path))
+
+
+
+@unittest.skipIf(QtWidgets is None, "needs a Qt binding")
+class ScriptTreeModelTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+    def setUp(self):
+        from live_script_editor import live_script_editor_ui
+
+        root_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root_path, True)
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, True)
+        for relative_path in ("top.py", "tools/rig/build_rig.py", "tools/anim/bake.py"):
+            path = os.path.join(root_path, relative_path)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, "w") as fp:
+                fp.write("")
+
+        self.model = live_script_editor_ui.ScriptTreeModel(cache_dir)
+        self.addCleanup(self.model.close)
+        self.model.set_root_path(root_path)
+        deadline = time.time() + 10.0
+        while self.model.script_index.is_busy:
+            self.assertLess(time.time(), deadline, "index still busy")
+            time.sleep(0.01)
+        self.model.rebuild()
+
+    def path(self, relative_path):
+        return self.model.script_index.root_path.rstrip("/") + "/" + relative_path
+
+    def test_index_for_path(self):
+        index = self.model.index_for_path(self.path("tools/anim/bake.py"))
+        self.assertTrue(index.isValid())
+        self.assertEqual(self.model.filePath(index), self.path("tools/anim/bake.py"))
+        self.assertEqual(self.model.filePath(index.parent()), self.path("tools/anim"))
+        self.assertFalse(self.model.index_for_path(self.path("tools/missing.py")).isValid())
+
+    def test_index_for_path_while_filtering(self):
+        self.model.set_filter_text("bake")
+        index = self.model.index_for_path(self.path("tools/anim/bake.py"))
+        self.assertTrue(index.isValid())
+        self.assertEqual(self.model.filePath(index), self.path("tools/anim/bake.py"))
+        self.assertFalse(index.parent().isValid())  # a row of the flat list the view shows
+        self.assertEqual(self.model.index(index.row(), 0), index)
+
+        self.assertFalse(self.model.index_for_path(self.path("top.py")).isValid())  # filtered out
+        self.assertFalse(self.model.index_for_path(self.path("tools/anim")).isValid())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from Qt import QtGui, QtWidgets
+except ImportError:
+    QtWidgets = None
+
+
+@unittest.skipIf(QtWidgets is None, "needs a Qt binding")
+class ScriptTabDockTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+    def setUp(self):
+        from live_script_editor import live_script_editor_ui
+
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.file_path = os.path.join(temp_dir, "script.py")
+        with open(self.file_path, "w") as fh:
+            fh.write("value = 1\n")
+
+        self.completer = live_script_editor_ui.PythonObjectCompleter()
+        self.dock = live_script_editor_ui.ScriptTabDock(self.file_path, completer=self.completer)
+        self.addCleanup(self.dock.deleteLater)
+
+    def test_editor_is_built_on_demand(self):
+        self.assertIsNone(self.dock.editor)
+        editor = self.dock.materialize()
+        self.assertIs(self.dock.materialize(), editor)
+        self.assertEqual(editor.toPlainText(), "value = 1\n")
+        self.assertEqual(self.dock.windowTitle(), "script.py")
+        self.assertEqual(editor.tab_key, self.dock.tab_key)
+
+    def test_release_keeps_unsaved_text(self):
+        editor = self.dock.materialize()
+        editor.moveCursor(QtGui.QTextCursor.End)
+        editor.insertPlainText("other = 2\n")
+        self.assertTrue(editor.has_unsaved_changes())
+
+        self.dock.release()
+        self.assertIsNone(self.dock.editor)
+        self.assertEqual(self.dock.text, "value = 1\nother = 2\n")
+
+        editor = self.dock.materialize()
+        self.assertEqual(editor.toPlainText(), "value = 1\nother = 2\n")
+        self.assertTrue(editor.has_unsaved_changes())
+
+    def test_release_reads_saved_files_again(self):
+        self.dock.materialize()
+        self.dock.release()
+        self.assertIsNone(self.dock.text)
+
+        with open(self.file_path, "w") as fh:
+            fh.write("value = 2\n")
+        self.assertEqual(self.dock.materialize().toPlainText(), "value = 2\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
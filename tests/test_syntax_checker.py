@@ -0,0 +1,126 @@
+import random
+import sys
+import unittest
+
+from live_script_editor import syntax_checker
+
+
+def messages(diagnostics):
+    return [(d.line, d.message) for d in diagnostics]
+
+
+class SplitRegionsTestCase(unittest.TestCase):
+
+    def test_regions(self):
+        lines = [
+            "import os",
+            "@decorator",
+            "def func():",
+            "    pass",
+            "if os:",
+            "    pass",
+            "else:",
+            "    pass",
+        ]
+        self.assertEqual(syntax_checker.split_regions(lines), [(0, 1), (1, 4), (4, 8)])
+
+    def test_statements_are_not_cut(self):
+        lines = [
+            "value = (1,",
+            "2)",
+            "text = '''",
+            "not_a_region = 1",
+            "'''",
+            "total = 1 + \\",
+            "2",
+        ]
+        self.assertEqual(syntax_checker.split_regions(lines), [(0, 2), (2, 5), (5, 7)])
+
+    def test_unclosed_bracket_does_not_swallow_the_rest(self):
+        lines = ["value = (", "other = 1", "def func():", "    pass"]
+        self.assertEqual(syntax_checker.split_regions(lines), [(0, 1), (1, 2), (2, 4)])
+
+
+class SyntaxCheckerTestCase(unittest.TestCase):
+
+    def test_undefined_and_unused(self):
+        checker = syntax_checker.SyntaxChecker()
+        diagnostics = checker.check("import os\nimport sys\nprint(sys.path, missing, known)", known_names=["known"])
+        self.assertEqual(messages(diagnostics), [
+            (0, "'os' imported but unused"),
+            (2, "Undefined name 'missing'"),
+        ])
+
+    def test_unclosed_bracket(self):
+        checker = syntax_checker.SyntaxChecker()
+        diagnostics = checker.check("value = (\nother = 1\ndef func():\n    return missing\n")
+        self.assertEqual([d.line for d in diagnostics], [0, 3])
+        self.assertEqual(diagnostics[0].severity, syntax_checker.ERROR)
+        self.assertIn("Undefined name 'missing'", diagnostics[1].message)
+
+    def test_unclosed_bracket_is_checked_once(self):
+        functions = "".join("def func_{0}(a):\n    return [a,\n            a]\n\n".format(i) for i in range(200))
+        text = "value = (\n" + functions
+
+        checker = syntax_checker.SyntaxChecker()
+        checker.check(text)
+        self.assertEqual(checker.last_checked_region_count, 201)
+        self.assertEqual(len(checker._cache), 201)
+
+        # only the edited region gets analysed again
+        checker.check(text.replace("func_5(", "func_five("))
+        self.assertEqual(checker.last_checked_region_count, 1)
+
+    def test_only_the_edit_is_tokenized(self):
+        functions = "".join("def func_{0}(a):\n    return [a,\n            a]\n\n".format(i) for i in range(200))
+        checker = syntax_checker.SyntaxChecker()
+        checker.check(functions)
+        self.assertEqual(checker.last_scanned_line_count, 801)
+
+        checker.check(functions.replace("func_100(a):\n    return [a,", "func_100(a):\n    return [a, a,"))
+        self.assertLess(checker.last_scanned_line_count, 10)
+        checker.check(functions.replace("func_100(a):\n    return [a,", "func_100(a):\n    return [a,\n\n"))
+        self.assertLess(checker.last_scanned_line_count, 10)
+
+    def test_incremental_scan_matches_full_scan(self):
+        pieces = ["x = 1", "y = (", ")", "]", "  z", "def f():", "    return [1,", "    2]", "s = , ",
+                  "a = 1 + \\", "", "# comment", "@decorator", "class C:", "    pass", "    else:", "\tq"]
+        rng = random.Random(0)
+        for _ in range(300):
+            lines = [rng.choice(pieces) for _ in range(rng.randint(0, 30))]
+            checker = syntax_checker.SyntaxChecker()
+            checker.check("\n".join(lines))
+            for _ in range(5):
+                for _ in range(rng.randint(1, 3)):
+                    i = rng.randint(0, len(lines))
+                    if rng.random() < 0.4 or not lines:
+                        lines.insert(i, rng.choice(pieces))
+                    elif rng.random() < 0.5:
+                        del lines[min(i, len(lines) - 1)]
+                    else:
+                        lines[min(i, len(lines) - 1)] = rng.choice(pieces)
+                continuation_lines = checker._update_scan(list(lines))
+                expected_lines, expected_starts, _ = syntax_checker.scan_statements(lines)
+                self.assertEqual(continuation_lines, expected_lines, lines)
+                self.assertEqual(checker._statement_starts, sorted(expected_starts), lines)
+
+    def test_compile_errors(self):
+        checker = syntax_checker.SyntaxChecker()
+        text = "\n".join([
+            "return 1",
+            "for item in []:",
+            "    pass",
+            "break",
+            "def func():",
+            "    await item",
+        ])
+        self.assertEqual([d.line for d in checker.check(text)], [0, 3, 5])
+
+    @unittest.skipIf(sys.version_info < (3, 8), "top level await needs python 3.8")
+    def test_top_level_await(self):
+        checker = syntax_checker.SyntaxChecker()
+        self.assertEqual(checker.check("import asyncio\nawait asyncio.sleep(0)"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
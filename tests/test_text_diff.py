@@ -0,0 +1,57 @@
+import random
+import unittest
+
+from live_script_editor import text_diff
+
+
+def apply_changes(old_lines, changes):
+    lines = list(old_lines)
+    for change in reversed(changes):
+        lines[change.start:change.end] = change.lines
+    return lines
+
+
+class GetLineChangesTestCase(unittest.TestCase):
+
+    def get_changes(self, old_lines, new_lines):
+        changes = text_diff.get_line_changes(old_lines, new_lines)
+        self.assertEqual(apply_changes(old_lines, changes), new_lines)
+        return [(change.start, change.end, change.lines) for change in changes]
+
+    def test_identical(self):
+        self.assertEqual(self.get_changes(["a", "b"], ["a", "b"]), [])
+        self.assertEqual(self.get_changes([], []), [])
+
+    def test_insert(self):
+        self.assertEqual(self.get_changes(["a", "c"], ["a", "b", "c"]), [(1, 1, ["b"])])
+        self.assertEqual(self.get_changes(["a"], ["a", "b"]), [(1, 1, ["b"])])
+        self.assertEqual(self.get_changes([], ["a"]), [(0, 0, ["a"])])
+
+    def test_delete(self):
+        self.assertEqual(self.get_changes(["a", "b", "c"], ["a", "c"]), [(1, 2, [])])
+        self.assertEqual(self.get_changes(["a", "b"], ["b"]), [(0, 1, [])])
+
+    def test_replace(self):
+        self.assertEqual(self.get_changes(["a", "b", "c"], ["a", "x", "c"]), [(1, 2, ["x"])])
+
+    def test_prefix_and_suffix_trimmed(self):
+        # a repeated line at the edit must not be matched past the common prefix
+        self.assertEqual(self.get_changes(["a", "a", "a"], ["a", "a", "a", "a"]), [(3, 3, ["a"])])
+        old_lines = ["line {}".format(i) for i in range(1000)]
+        new_lines = old_lines[:500] + ["new"] + old_lines[500:]
+        self.assertEqual(self.get_changes(old_lines, new_lines), [(500, 500, ["new"])])
+
+    def test_several_changes(self):
+        changes = self.get_changes(["a", "b", "c", "d", "e"], ["a", "x", "c", "e", "f"])
+        self.assertEqual(changes, [(1, 2, ["x"]), (3, 4, []), (5, 5, ["f"])])
+
+    def test_random_edits(self):
+        rng = random.Random(1)
+        for _ in range(200):
+            old_lines = [rng.choice("abc") for _ in range(rng.randint(0, 10))]
+            new_lines = [rng.choice("abc") for _ in range(rng.randint(0, 10))]
+            self.get_changes(old_lines, new_lines)
+
+
+if __name__ == "__main__":
+    unittest.main()